@@ -0,0 +1,64 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from app import database, models  # noqa: F401 — модели регистрируют таблицы в Base.metadata
+from app.migrations import backfill_progress
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = database.Base.metadata
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Служебная таблица backfill-ов создаётся по требованию и не входит в модели
+    return not (type_ == "table" and name == backfill_progress.name)
+
+
+def run_migrations_offline() -> None:
+    """Генерация SQL без подключения: alembic upgrade head --sql"""
+    url = database.SQLALCHEMY_DATABASE_URL
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+        render_as_batch=url.startswith("sqlite"),
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        # SQLite не умеет большую часть ALTER TABLE — Alembic пересоздаёт таблицу
+        render_as_batch=connection.dialect.name == "sqlite",
+        transaction_per_migration=True,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # Соединение можно передать снаружи (тесты), иначе — движок приложения с его PRAGMA и пулом
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+        return
+    with database.engine.connect() as connection:
+        do_run_migrations(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,94 @@
+"""initial schema
+
+Таблицы и индексы моделей. На базах, созданных до Alembic, существующие
+таблицы и индексы пропускаются (if_not_exists), недостающие индексы создаются.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migrations import deduplicate_board_titles_query
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(), nullable=True),
+        sa.Column("hashed_password", sa.String(), nullable=True),
+        sa.Column("avatar_url", sa.String(), nullable=True),
+        sa.Column("role", sa.String(), nullable=True),
+        sa.Column("closed_tasks_count", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_users_id", "users", ["id"], if_not_exists=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True, if_not_exists=True)
+
+    op.create_table(
+        "boards",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        if_not_exists=True,
+    )
+    # op.execute, а не соединение: работает и в alembic upgrade --sql
+    op.execute(deduplicate_board_titles_query())
+    op.create_index("ix_boards_id", "boards", ["id"], if_not_exists=True)
+    op.create_index("ix_boards_title", "boards", ["title"], unique=True, if_not_exists=True)
+
+    op.create_table(
+        "tasks",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("priority", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("pdf_path", sa.String(), nullable=True),
+        sa.Column("updated_at", sa.String(), nullable=True),
+        sa.Column("creator_id", sa.Integer(), nullable=True),
+        sa.Column("responsible_id", sa.Integer(), nullable=True),
+        sa.Column("board_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["board_id"], ["boards.id"]),
+        sa.ForeignKeyConstraint(["creator_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["responsible_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_tasks_id", "tasks", ["id"], if_not_exists=True)
+    op.create_index("ix_tasks_status", "tasks", ["status"], if_not_exists=True)
+    op.create_index("ix_tasks_creator_id", "tasks", ["creator_id"], if_not_exists=True)
+    op.create_index("ix_tasks_board_id_status", "tasks", ["board_id", "status"], if_not_exists=True)
+    op.create_index("ix_tasks_responsible_id_status", "tasks", ["responsible_id", "status"], if_not_exists=True)
+
+    op.create_table(
+        "board_users",
+        sa.Column("board_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["board_id"], ["boards.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("board_id", "user_id"),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("board_users")
+    op.drop_table("tasks")
+    op.drop_table("boards")
+    op.drop_table("users")
@@ -0,0 +1,50 @@
+"""row versions for conditional GET
+
+Счётчик version (растёт при каждом UPDATE) у users, tasks и boards и
+updated_at у users и boards — источники ETag и Last-Modified.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ("users", "tasks", "boards")
+
+
+def add_missing_column(table: str, column: sa.Column) -> None:
+    # SQLite не умеет ADD COLUMN IF NOT EXISTS, а база могла быть создана create_all с новыми моделями.
+    # Без подключения (--sql) проверить нечего: скрипт рассчитан на базу в состоянии 0001
+    if not context.is_offline_mode():
+        existing = {info["name"] for info in sa.inspect(op.get_bind()).get_columns(table)}
+        if column.name in existing:
+            return
+    op.add_column(table, column)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in VERSIONED_TABLES:
+        add_missing_column(table, sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    for table in ("users", "boards"):
+        add_missing_column(table, sa.Column("updated_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("users", "boards"):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("updated_at")
+    for table in VERSIONED_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("version")
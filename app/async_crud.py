@@ -0,0 +1,32 @@
+"""Асинхронные версии чтений из crud для горячих маршрутов (AsyncSession)"""
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, models, schemas, serialization
+
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
+
+
+async def get_tasks_page(db: AsyncSession, limit: int = crud.DEFAULT_PAGE_SIZE,
+                         cursor: Optional[int] = None, **filters):
+    limit = max(1, min(limit, crud.MAX_PAGE_SIZE))
+    tasks = (await db.scalars(crud.tasks_page_query(limit + 1, cursor, **filters))).all()
+    return crud.page_with_cursor(tasks, limit)
+
+
+async def get_task_rows_page(db: AsyncSession, limit: int = crud.DEFAULT_PAGE_SIZE,
+                             cursor: Optional[int] = None, **filters):
+    """Как get_tasks_page, но строки только с колонками TaskOut"""
+    limit = max(1, min(limit, crud.MAX_PAGE_SIZE))
+    query = serialization.rows_query(crud.tasks_page_query(limit + 1, cursor, **filters), schemas.TaskOut,
+                                     models.Task.version)
+    rows = (await db.execute(query)).all()
+    return crud.page_with_cursor(rows, limit)
+
+
+async def get_board(db: AsyncSession, board_id: int):
+    return await db.get(models.Board, board_id)
+
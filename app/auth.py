@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from typing import Optional
 
 from fastapi import Depends, HTTPException, Query
@@ -5,25 +6,108 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timedelta
-from . import models, database
+from . import models, database, config, metrics
+from .cache import TTLCache
+from .workers import BoundedProcessPool
 
 SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+TOKEN_CACHE_SIZE = 10_000
+TOKEN_CACHE_TTL_SECONDS = 60
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=config.BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 
-def verify_password(plain_password, hashed_password):
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Лёгкий снимок пользователя, который кладётся в кэш токенов"""
+    id: int
+    username: str
+    role: Optional[str] = None
+    avatar_url: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: models.User):
+        return cls(id=user.id, username=user.username, role=user.role, avatar_url=user.avatar_url)
+
+
+class TokenCache:
+    """Кэш проверенных токенов: token -> UserSnapshot.
+
+    Запись живёт не дольше TTL и не дольше exp самого токена.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE, ttl: float = TOKEN_CACHE_TTL_SECONDS):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def get(self, token: str) -> Optional[UserSnapshot]:
+        return self._cache.get(token)
+
+    def put(self, token: str, user: UserSnapshot, expires_at: Optional[float] = None):
+        self._cache.set(token, user, expires_at=expires_at)
+
+    def invalidate_user(self, user_id: int) -> int:
+        return self._cache.discard_where(lambda token, user: user.id == user_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+token_cache = TokenCache()
+
+
+def _verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def get_password_hash(password):
+def _get_password_hash(password):
     return pwd_context.hash(password)
 
 
+def verify_password(plain_password, hashed_password):
+    with metrics.password_hash_duration.labels("verify", "inline").time():
+        return _verify_password(plain_password, hashed_password)
+
+
+def get_password_hash(password):
+    with metrics.password_hash_duration.labels("hash", "inline").time():
+        return _get_password_hash(password)
+
+
+password_pool = BoundedProcessPool(
+    "passwords",
+    max_workers=config.PASSWORD_POOL_WORKERS,
+    max_pending=config.PASSWORD_POOL_MAX_PENDING,
+)
+
+
+# Время в пуле меряется в этом процессе (с ожиданием в очереди): метрики дочерних процессов не видны
+async def verify_password_async(plain_password, hashed_password):
+    with metrics.password_hash_duration.labels("verify", "pool").time():
+        return await password_pool.run(_verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    with metrics.password_hash_duration.labels("hash", "pool").time():
+        return await password_pool.run(_get_password_hash, password)
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     to_encode["exp"] = datetime.now() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -41,9 +125,20 @@ def authenticate_user(db: Session, username: str, password: str):
     return user
 
 
+async def authenticate_user_async(db: Session, username: str, password: str):
+    user = await run_in_threadpool(get_user, db, username)
+    if not user or not await verify_password_async(password, user.hashed_password):
+        return False
+    return user
+
+
 def get_current_user(token: str = Depends(oauth2_scheme),
                      local_kw: Optional[str] = Query(None),
                      db: Session = Depends(database.get_db)):
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     credentials_exception = HTTPException(status_code=401, detail="Invalid credentials")
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -55,5 +150,8 @@ def get_current_user(token: str = Depends(oauth2_scheme),
     user = get_user(db, username)
     if user is None:
         raise credentials_exception
-    return user
+
+    snapshot = UserSnapshot.from_user(user)
+    token_cache.put(token, snapshot, expires_at=payload.get("exp"))
+    return snapshot
 
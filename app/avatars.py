@@ -0,0 +1,82 @@
+"""Обработка аватаров: проверка, варианты размеров в пуле процессов, запись на диск.
+
+На одну загрузку создаются файлы <ключ>_<size>.<ext> для всех размеров из
+helpers.avatar_validation.AVATAR_SIZES в JPEG и WebP, они хранятся в
+storage.BlobStore как один blob. avatar_url указывает на самый большой JPEG,
+остальные варианты находятся по тому же ключу.
+"""
+import os
+import re
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from starlette import status
+from starlette.concurrency import run_in_threadpool
+
+from helpers.avatar_validation import AVATAR_SIZES, ImageProcessingError, process_image_variants
+from . import config, storage
+from .workers import BoundedProcessPool
+
+AVATAR_URL_PREFIX = "/static/avatars/"
+
+image_pool = BoundedProcessPool(
+    "images",
+    max_workers=config.IMAGE_POOL_WORKERS,
+    max_pending=config.IMAGE_POOL_MAX_PENDING,
+)
+
+
+async def make_variants(image_data: bytes) -> Dict[str, bytes]:
+    try:
+        return await image_pool.run(process_image_variants, image_data)
+    except ImageProcessingError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Error processing image")
+
+
+def avatar_url(store: storage.BlobStore, key: str) -> str:
+    return f"{AVATAR_URL_PREFIX}{store.relative_path(key, f'_{max(AVATAR_SIZES)}.jpg')}"
+
+
+# Аватары, сохранённые до хранилища, лежат в корне каталога аватаров:
+#   user_<id>_<время><ext> — исходный маршрут, avatar_url — абсолютный путь к каталогу;
+#   user_<id>_<время>_<размер>.<ext> — варианты размеров, avatar_url под AVATAR_URL_PREFIX
+LEGACY_NAME = re.compile(r"(user_\d+_\d+)(_\d+)?(\.\w+)?")
+
+
+def delete_legacy_avatar(directory: str, avatar_url: str):
+    """Удаляет файлы аватара, сохранённого до хранилища; чужие URL не трогает"""
+    name = avatar_url.replace("\\", "/").rsplit("/", 1)[-1]
+    match = LEGACY_NAME.fullmatch(name)
+    if not match:
+        return
+    base, size, _ = match.groups()
+    if size is None:
+        storage.remove_quietly(os.path.join(directory, name))
+        return
+    for variant in os.listdir(directory):
+        if variant.startswith(base + "_"):
+            storage.remove_quietly(os.path.join(directory, variant))
+
+
+def release_avatar(store: storage.BlobStore, avatar_url: Optional[str]):
+    """Снимает ссылку с аватара по его avatar_url"""
+    if not avatar_url:
+        return
+    key = storage.key_of(avatar_url) if avatar_url.startswith(AVATAR_URL_PREFIX) else None
+    if key:
+        store.release(key)
+    else:
+        delete_legacy_avatar(store.root, avatar_url)
+
+
+async def save_avatar(store: storage.BlobStore, image_data: bytes) -> str:
+    """Сохраняет все варианты с одной ссылкой на них, возвращает avatar_url.
+
+    Ключ — хэш исходного файла: если такой файл уже загружали, варианты не
+    пересчитываются, добавляется только ссылка.
+    """
+    key = storage.hash_bytes(image_data)
+    if not await run_in_threadpool(store.acquire, key):
+        variants = await make_variants(image_data)
+        await run_in_threadpool(store.put, key, {f"_{name}": data for name, data in variants.items()})
+    return avatar_url(store, key)
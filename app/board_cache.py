@@ -0,0 +1,111 @@
+"""Кэш ответов GET /boards/{id} и GET /boards/{id}/tasks.
+
+Хранится готовое тело вместе с ETag/Last-Modified, поэтому попадание не
+обращается к базе и не сериализует ответ. Записи сбрасываются после коммита
+транзакций, которые меняют доску или её задачи: crud вызывает invalidate_*.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import orjson
+from fastapi import Response
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import cache, config, database
+
+backend = cache.create_backend(
+    config.BOARD_CACHE_BACKEND,
+    maxsize=config.BOARD_CACHE_SIZE,
+    ttl=config.BOARD_CACHE_TTL,
+    redis_url=config.REDIS_URL,
+    prefix="board-cache:",
+)
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    headers: dict
+    body: bytes
+
+    def to_bytes(self) -> bytes:
+        # Тело — компактный JSON без переводов строк, поэтому разделитель однозначен
+        return orjson.dumps(self.headers) + b"\n" + self.body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CachedResponse":
+        headers, body = data.split(b"\n", 1)
+        return cls(orjson.loads(headers), body)
+
+    def response(self) -> Response:
+        return Response(self.body, media_type="application/json", headers=self.headers)
+
+
+def board_key(board_id: int) -> str:
+    return f"board:{board_id}"
+
+
+def tasks_key(board_id: int) -> str:
+    return f"board:{board_id}:tasks"
+
+
+# Поколение ключа растёт при каждой инвалидации. Чтение, начатое до инвалидации,
+# не кладёт в кэш устаревший ответ (в пределах процесса; между процессами — TTL)
+_generations: dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def generation(key: str) -> int:
+    return _generations.get(key, 0)
+
+
+def get(key: str) -> Optional[CachedResponse]:
+    data = backend.get(key)
+    return CachedResponse.from_bytes(data) if data is not None else None
+
+
+def put(key: str, cached: CachedResponse, seen_generation: int):
+    if generation(key) == seen_generation:
+        backend.set(key, cached.to_bytes())
+
+
+async def aget(key: str) -> Optional[CachedResponse]:
+    if backend.blocking:
+        return await run_in_threadpool(get, key)
+    return get(key)
+
+
+async def aput(key: str, cached: CachedResponse, seen_generation: int):
+    if backend.blocking:
+        await run_in_threadpool(put, key, cached, seen_generation)
+    else:
+        put(key, cached, seen_generation)
+
+
+def invalidate(*keys: str):
+    with _lock:
+        for key in keys:
+            _generations[key] = _generations.get(key, 0) + 1
+    backend.delete(*keys)
+
+
+def invalidate_board(db: Session, board_id: int, with_tasks: bool = False):
+    keys = [board_key(board_id)] + ([tasks_key(board_id)] if with_tasks else [])
+    database.on_commit(db, lambda: invalidate(*keys))
+
+
+def invalidate_board_tasks(db: Session, *board_ids: Optional[int]):
+    keys = [tasks_key(board_id) for board_id in set(board_ids) if board_id is not None]
+    if keys:
+        database.on_commit(db, lambda: invalidate(*keys))
+
+
+def clear():
+    with _lock:
+        _generations.clear()
+    backend.clear()
+
+
+def stats() -> dict:
+    return backend.stats()
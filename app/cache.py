@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Потокобезопасный LRU-кэш с временем жизни записей.
+
+    Каждая запись живёт не дольше ``ttl`` секунд (или до своего ``expires_at``),
+    при переполнении вытесняется давно не использованная запись.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING or item[0] <= now:
+                if item is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        """Сохраняет значение; ``expires_at`` — абсолютный момент по time.time()"""
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+            if ttl <= 0:
+                return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Удаляет все записи, для которых predicate(key, value) истинен"""
+        with self._lock:
+            keys = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# --- Бэкенды для кэшей ответов: значения — bytes, ключи — строки ---
+
+class LocalBackend:
+    """В памяти процесса (TTLCache); бэкенд по умолчанию"""
+    blocking = False
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: bytes):
+        self._cache.set(key, value)
+
+    def delete(self, *keys: str):
+        for key in keys:
+            self._cache.pop(key)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class RedisBackend:
+    """Redis или совместимый сервер (Valkey, KeyDB, Dragonfly).
+
+    Общий для всех процессов приложения. hits/misses считаются в этом процессе.
+    """
+    blocking = True
+
+    def __init__(self, url: str, ttl: float, prefix: str, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self._client = client
+        self.ttl_ms = int(ttl * 1000)
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes):
+        self._client.set(self.prefix + key, value, px=self.ttl_ms)
+
+    def delete(self, *keys: str):
+        if keys:
+            self._client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class NullBackend:
+    """Кэш выключен: всё промахи"""
+    blocking = False
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: bytes):
+        pass
+
+    def delete(self, *keys: str):
+        pass
+
+    def clear(self):
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {"size": 0, "hits": 0, "misses": self.misses, "hit_rate": 0.0}
+
+
+def create_backend(name: str, maxsize: int, ttl: float, redis_url: str, prefix: str):
+    if name == "local":
+        return LocalBackend(maxsize, ttl)
+    if name == "redis":
+        return RedisBackend(redis_url, ttl, prefix)
+    if name == "none":
+        return NullBackend()
+    raise ValueError(f"Unknown cache backend: {name}")
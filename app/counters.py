@@ -0,0 +1,207 @@
+"""Денормализованные счётчики задач пользователя: статистика за O(1) без COUNT(*).
+
+Строка user_task_counters — (user_id, name, value). Имена:
+    created, created.status.<status>, created.priority.<priority>   — задачи, где пользователь автор
+    assigned, assigned.status.<status>, assigned.priority.<priority> — где он ответственный
+
+crud меняет счётчики в той же транзакции, что и задачи: вклад задачи до и после
+изменения вычитается и прибавляется одним upsert (INSERT ... ON CONFLICT DO
+UPDATE SET value = value + delta), поэтому параллельные запросы не теряют
+приращения. reconcile пересчитывает счётчики из tasks пачками пользователей и
+возвращает расхождения.
+
+    python -m app.counters [--batch-size 500] [--dry-run]
+"""
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from . import models
+
+ROLES = {"created": "creator_id", "assigned": "responsible_id"}
+DIMENSIONS = ("status", "priority")
+
+counters = models.UserTaskCounter.__table__
+tasks = models.Task.__table__
+
+
+class TaskCounts(NamedTuple):
+    """Поля задачи, от которых зависят счётчики"""
+    creator_id: Optional[int]
+    responsible_id: Optional[int]
+    status: Optional[str]
+    priority: Optional[str]
+
+
+def task_counts(task) -> TaskCounts:
+    """TaskCounts из ORM-объекта, строки или dict"""
+    get = task.get if isinstance(task, dict) else lambda name: getattr(task, name)
+    return TaskCounts(*(get(name) for name in TaskCounts._fields))
+
+
+def contributions(counts: TaskCounts, sign: int = 1, into: Optional[Counter] = None) -> Counter:
+    """Вклад одной задачи: {(user_id, имя счётчика): ±1}"""
+    into = Counter() if into is None else into
+    for role, field in ROLES.items():
+        user_id = getattr(counts, field)
+        if user_id is None:
+            continue
+        into[(user_id, role)] += sign
+        for dimension in DIMENSIONS:
+            value = getattr(counts, dimension)
+            if value is not None:
+                into[(user_id, f"{role}.{dimension}.{value}")] += sign
+    return into
+
+
+@lru_cache()
+def upsert(dialect_name: str):
+    """INSERT ... ON CONFLICT DO UPDATE: один объект на диалект, иначе компилируется на каждый вызов"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(counters)
+    return stmt.on_conflict_do_update(
+        index_elements=[counters.c.user_id, counters.c.name],
+        set_={"value": counters.c.value + stmt.excluded.value},
+    )
+
+
+def dialect_name(db) -> str:
+    return (db.get_bind() if isinstance(db, Session) else db).dialect.name
+
+
+def apply(db, deltas: Counter):
+    """Прибавляет deltas одним executemany. db — Session или Connection"""
+    # Постоянный порядок строк: параллельные транзакции на Postgres не ждут друг друга по кругу
+    rows = [{"user_id": user_id, "name": name, "value": value}
+            for (user_id, name), value in sorted(deltas.items()) if value]
+    if rows:
+        db.execute(upsert(dialect_name(db)), rows)
+
+
+def task_changed(db, before: Optional[TaskCounts], after: Optional[TaskCounts]):
+    """Создание (before=None), изменение или удаление (after=None) одной задачи"""
+    if before == after:
+        return
+    deltas = Counter()
+    if before is not None:
+        contributions(before, -1, deltas)
+    if after is not None:
+        contributions(after, 1, deltas)
+    apply(db, deltas)
+
+
+def tasks_changed(db, before: Iterable[TaskCounts] = (), after: Iterable[TaskCounts] = ()):
+    """То же для пачки задач одним upsert"""
+    deltas = Counter()
+    for counts in before:
+        contributions(counts, -1, deltas)
+    for counts in after:
+        contributions(counts, 1, deltas)
+    apply(db, deltas)
+
+
+def select_task_counts(*where):
+    return select(tasks.c.creator_id, tasks.c.responsible_id, tasks.c.status, tasks.c.priority).where(*where)
+
+
+def get_user_counters(db, user_id: int) -> Dict[str, int]:
+    rows = db.execute(select(counters.c.name, counters.c.value).where(counters.c.user_id == user_id))
+    return dict(rows.all())
+
+
+def user_stats(closed_tasks_count: Optional[int], values: Dict[str, int]) -> dict:
+    """Ответ /users/{id}/stats из строк счётчиков"""
+    stats = {"closed_tasks_count": closed_tasks_count or 0}
+    for role in ROLES:
+        stats[role] = {"total": values.get(role, 0)}
+        for dimension in DIMENSIONS:
+            prefix = f"{role}.{dimension}."
+            stats[role][f"by_{dimension}"] = {name[len(prefix):]: value for name, value in values.items()
+                                               if name.startswith(prefix) and value}
+    return stats
+
+
+# --- Сверка ---
+def expected_counters(connection: Connection, user_ids: list) -> Counter:
+    """Счётчики пользователей user_ids, пересчитанные из tasks (два GROUP BY)"""
+    expected = Counter()
+    for role, field in ROLES.items():
+        column = tasks.c[field]
+        rows = connection.execute(
+            select(column, tasks.c.status, tasks.c.priority, func.count())
+            .where(column.in_(user_ids))
+            .group_by(column, tasks.c.status, tasks.c.priority)
+        )
+        for user_id, status, priority, count in rows:
+            counts = TaskCounts(**{"creator_id": None, "responsible_id": None, field: user_id},
+                                status=status, priority=priority)
+            for key, value in contributions(counts).items():
+                expected[key] += value * count
+    return expected
+
+
+class Drift(NamedTuple):
+    user_id: int
+    name: str
+    stored: int
+    expected: int
+
+
+def reconcile_batch(connection: Connection, user_ids: list, fix: bool = True) -> list:
+    """Сравнивает счётчики пачки пользователей с tasks и исправляет расхождения"""
+    # На Postgres строки счётчиков блокируются до пересчёта: параллельный upsert
+    # дождётся коммита и прибавит свою дельту к исправленному значению
+    stored = dict(((user_id, name), value) for user_id, name, value in connection.execute(
+        select(counters.c.user_id, counters.c.name, counters.c.value)
+        .where(counters.c.user_id.in_(user_ids))
+        .with_for_update()
+    ))
+    expected = expected_counters(connection, user_ids)
+    drift = [Drift(user_id, name, stored.get((user_id, name), 0), expected.get((user_id, name), 0))
+             for user_id, name in sorted(stored.keys() | expected.keys())
+             if stored.get((user_id, name), 0) != expected.get((user_id, name), 0)]
+    if fix and drift:
+        apply(connection, Counter({(item.user_id, item.name): item.expected - item.stored for item in drift}))
+        # Нулевые строки не нужны: отсутствующий счётчик читается как 0
+        connection.execute(delete(counters).where(counters.c.user_id.in_(user_ids), counters.c.value == 0))
+    return drift
+
+
+def reconcile(engine: Engine, batch_size: int = 500, fix: bool = True) -> list:
+    """Сверяет счётчики всех пользователей, по транзакции на пачку; возвращает расхождения"""
+    users = models.User.__table__
+    drift = []
+    last_id = None
+    while True:
+        with engine.begin() as connection:
+            query = select(users.c.id).order_by(users.c.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(users.c.id > last_id)
+            user_ids = connection.execute(query).scalars().all()
+            if not user_ids:
+                break
+            drift += reconcile_batch(connection, user_ids, fix)
+        last_id = user_ids[-1]
+    return drift
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .database import engine
+
+    parser = argparse.ArgumentParser(description="Сверить счётчики задач пользователей с таблицей tasks")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="только показать расхождения")
+    args = parser.parse_args()
+    found = reconcile(engine, args.batch_size, fix=not args.dry_run)
+    for item in found:
+        print(f"user {item.user_id} {item.name}: stored {item.stored}, expected {item.expected}")
+    print(f"{len(found)} counters {'differ' if args.dry_run else 'fixed'}")
@@ -1,6 +1,15 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Optional
+from sqlalchemy import delete, exists, func, insert, select, update
 from sqlalchemy.orm import Session
-from . import models, schemas, auth
+from . import models, schemas, auth, board_cache, counters, database, events, serialization
+
+# Мутации только делают flush: транзакция одна на запрос и коммитится в database.get_db.
+# Всё, что меняет creator_id, responsible_id, status или priority задач, обновляет
+# counters в той же транзакции. Изменения отдельных задач публикуются в ленту
+# events.broker после коммита (пакетные /tasks/bulk — нет)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
 
 
 def update_fields(instance, data: Dict[str, Any]):
@@ -9,30 +18,46 @@ def update_fields(instance, data: Dict[str, Any]):
             setattr(instance, key, value)
 
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed = auth.get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    hashed = hashed_password or auth.get_password_hash(user.password)
     db_user = models.User(username=user.username, hashed_password=hashed)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    db.flush()
     return db_user
 
 
 def get_user(db: Session, user_id: int):
-    return db.query(models.User).get(user_id)
+    return db.get(models.User, user_id)
 
 
 def get_all_users(db: Session):
     return db.query(models.User).all()
 
 
+def users_query():
+    return select(models.User).order_by(models.User.id)
+
+
+def get_user_rows(db: Session):
+    """Пользователи как строки с колонками UserOut (быстрый путь сериализации)"""
+    return db.execute(serialization.rows_query(users_query(), schemas.UserOut, models.User.version)).all()
+
+
+def get_user_stats(db: Session, user_id: int):
+    """Статистика задач пользователя из счётчиков, без COUNT(*) по tasks"""
+    user = get_user(db, user_id)
+    if not user:
+        return None
+    return {"user_id": user_id, **counters.user_stats(user.closed_tasks_count, counters.get_user_counters(db, user_id))}
+
+
 def update_user(db: Session, user_id: int, update_data: dict):
     user = get_user(db, user_id)
     if not user:
         return None
     update_fields(user, update_data)
-    db.commit()
-    db.refresh(user)
+    db.flush()
+    database.on_commit(db, lambda: auth.token_cache.invalidate_user(user_id))
     return user
 
 
@@ -40,42 +65,169 @@ def delete_user(db: Session, user_id: int):
     user = get_user(db, user_id)
     if not user:
         return False
+    # Явно, а не только ON DELETE CASCADE: на SQLite он работает лишь с PRAGMA foreign_keys
+    db.execute(delete(models.UserTaskCounter).where(models.UserTaskCounter.user_id == user_id))
     db.delete(user)
-    db.commit()
+    db.flush()
+    database.on_commit(db, lambda: auth.token_cache.invalidate_user(user_id))
     return True
 
 
-def update_user_avatar(db: Session, user_id: int, avatar_url: str):
-    return update_user(db, user_id, {"avatar_url": avatar_url})
+def swap_value(db: Session, column, row_id: int, value):
+    """Записывает value в колонку строки по id; возвращает (нашлась ли строка, прежнее значение).
+
+    UPDATE проходит, только если значение не поменялось с момента чтения, иначе
+    чтение повторяется: параллельные замены не получат одно прежнее значение на двоих.
+    """
+    model = column.class_
+    while True:
+        row = db.execute(select(column).where(model.id == row_id)).first()
+        if row is None:
+            return False, None
+        result = db.execute(
+            update(model).where(model.id == row_id, column.is_not_distinct_from(row[0])).values({column.key: value}),
+            execution_options={"synchronize_session": False},
+        )
+        if result.rowcount:
+            return True, row[0]
+
+
+def update_user_avatar(db: Session, user_id: int, avatar_url: Optional[str]):
+    """Меняет avatar_url; возвращает (пользователь, прежний avatar_url) или (None, None)"""
+    found, previous = swap_value(db, models.User.avatar_url, user_id, avatar_url)
+    if not found:
+        return None, None
+    database.on_commit(db, lambda: auth.token_cache.invalidate_user(user_id))
+    return db.get(models.User, user_id, populate_existing=True), previous
 
 
 def create_task(db: Session, task: schemas.TaskCreate, current_user: models.User):
     db_task = models.Task(**task.model_dump(), creator_id=current_user.id)
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    db.flush()
+    counters.task_changed(db, None, counters.task_counts(db_task))
+    events.task_event(db, "task.created", db_task, db_task.board_id)
     return db_task
 
 
+def create_tasks_bulk(db: Session, rows: list[Dict[str, Any]]) -> list[int]:
+    """Вставляет задачи одним executemany, возвращает id в порядке rows.
+
+    sort_by_parameter_order на SQLite откатывает insertmanyvalues к INSERT на
+    каждую строку, поэтому порядок восстанавливаем сами: внутри одного INSERT
+    автоинкремент раздаёт id по порядку строк VALUES, меняться может только
+    порядок строк в RETURNING.
+    """
+    stmt = insert(models.Task).returning(models.Task.id)
+    ids = sorted(db.scalars(stmt, rows).all())
+    counters.tasks_changed(db, after=[counters.task_counts(row) for row in rows])
+    return ids
+
+
+def update_tasks_bulk(db: Session, rows: list[Dict[str, Any]]):
+    """UPDATE по первичному ключу одним executemany; в каждой строке обязателен id"""
+    if rows:
+        ids = {row["id"] for row in rows}
+        before = {row.id: row for row in db.execute(
+            counters.select_task_counts(models.Task.id.in_(ids)).add_columns(models.Task.id))}
+        db.execute(update(models.Task), rows)
+        after = dict(before)
+        for row in rows:
+            if row["id"] in after:
+                after[row["id"]] = counters.task_counts({**after[row["id"]]._asdict(), **row})
+        counters.tasks_changed(db, map(counters.task_counts, before.values()),
+                               map(counters.task_counts, after.values()))
+        board_ids = db.scalars(select(models.Task.board_id).distinct().where(models.Task.id.in_(ids)))
+        board_cache.invalidate_board_tasks(db, *board_ids)
+
+
+def get_task_creators(db: Session, task_ids: Iterable[int]) -> Dict[int, int]:
+    """{id задачи: creator_id} одним запросом"""
+    rows = db.execute(select(models.Task.id, models.Task.creator_id).where(models.Task.id.in_(set(task_ids))))
+    return dict(rows.all())
+
+
+def get_existing_user_ids(db: Session, user_ids: Iterable[int]) -> set[int]:
+    return set(db.scalars(select(models.User.id).where(models.User.id.in_(set(user_ids)))))
+
+
 def get_task(db: Session, task_id: int):
-    return db.query(models.Task).get(task_id)
+    return db.get(models.Task, task_id)
 
 
 def get_all_tasks(db: Session):
     return db.query(models.Task).all()
 
 
+def tasks_query(status: Optional[str] = None,
+                priority: Optional[str] = None,
+                creator_id: Optional[int] = None,
+                responsible_id: Optional[int] = None,
+                board_id: Optional[int] = None):
+    """select задач с фильтрами в SQL, упорядоченный по id"""
+    query = select(models.Task)
+    filters = {
+        "status": status,
+        "priority": priority,
+        "creator_id": creator_id,
+        "responsible_id": responsible_id,
+        "board_id": board_id,
+    }
+    for column, value in filters.items():
+        if value is not None:
+            query = query.where(getattr(models.Task, column) == value)
+    return query.order_by(models.Task.id)
+
+
+def tasks_page_query(limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[int] = None, **filters):
+    """Keyset-запрос страницы задач: фильтры и курсор выполняются в SQL.
+
+    Курсор — id последней задачи предыдущей страницы. id растёт вместе с
+    created_at, поэтому сортировка по первичному ключу даёт порядок создания
+    и не требует сортировки всей таблицы.
+    """
+    query = tasks_query(**filters)
+    if cursor is not None:
+        query = query.where(models.Task.id > cursor)
+    return query.limit(limit)
+
+
+def get_tasks_page(db: Session, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[int] = None, **filters):
+    """Возвращает (задачи, курсор следующей страницы или None)"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    # Берём на одну строку больше, чтобы узнать, есть ли следующая страница
+    tasks = db.scalars(tasks_page_query(limit + 1, cursor, **filters)).all()
+    return page_with_cursor(tasks, limit)
+
+
+def page_with_cursor(tasks, limit: int):
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        return tasks, tasks[-1].id
+    return tasks, None
+
+
 def get_tasks(db: Session, current_user: models.User):
     return db.query(models.Task).filter_by(creator_id=current_user.id).all()
 
 
-def update_task(db: Session, task_id: int, fields_to_update: Dict[str, Any]):
+def get_task_rows(db: Session, **filters):
+    """Задачи как строки с колонками TaskOut (быстрый путь сериализации)"""
+    return db.execute(serialization.rows_query(tasks_query(**filters), schemas.TaskOut, models.Task.version)).all()
+
+
+def update_task(db: Session, task_id: int, fields_to_update: Dict[str, Any], event: str = "task.updated"):
     task = get_task(db, task_id)
     if not task:
         return None
+    # Задача видна в списке своей доски; при переносе меняются списки обеих досок
+    old_board_id = task.board_id
+    before = counters.task_counts(task)
     update_fields(task, fields_to_update)
-    db.commit()
-    db.refresh(task)
+    db.flush()
+    counters.task_changed(db, before, counters.task_counts(task))
+    board_cache.invalidate_board_tasks(db, old_board_id, task.board_id)
+    events.task_event(db, event, task, task.board_id, old_board_id)
     return task
 
 
@@ -83,31 +235,52 @@ def delete_task(db: Session, task_id: int):
     task = get_task(db, task_id)
     if task:
         db.delete(task)
-        db.commit()
+        db.flush()
+        counters.task_changed(db, counters.task_counts(task), None)
+        board_cache.invalidate_board_tasks(db, task.board_id)
+        events.task_event(db, "task.deleted", task, None, task.board_id)
 
 
 def assign_responsible(db: Session, task_id: int, user_id: int):
-    return update_task(db, task_id, {"responsible_id": user_id})
+    return update_task(db, task_id, {"responsible_id": user_id}, event="task.assigned")
 
 
-def update_task_pdf(db: Session, task_id: int, pdf_path: str):
-    return update_task(db, task_id, {"pdf_path": pdf_path})
+def close_task(db: Session, task_id: int, user_id: int):
+    """Статус Done и +1 к closed_tasks_count закрывшего; None, если задачи или пользователя нет"""
+    task, user = get_task(db, task_id), get_user(db, user_id)
+    if not task or not user:
+        return None
+    update_task(db, task_id, {"status": "Done"}, event="task.closed")
+    # Приращение в SQL: параллельные закрытия не теряют друг друга
+    user.closed_tasks_count = func.coalesce(models.User.closed_tasks_count, 0) + 1
+    db.flush()
+    return task
+
+
+def update_task_pdf(db: Session, task_id: int, pdf_path: Optional[str]):
+    """Меняет pdf_path; возвращает (задача, прежний pdf_path) или (None, None)"""
+    found, previous = swap_value(db, models.Task.pdf_path, task_id, pdf_path)
+    if not found:
+        return None, None
+    task = db.get(models.Task, task_id, populate_existing=True)
+    board_cache.invalidate_board_tasks(db, task.board_id)
+    events.task_event(db, "task.updated", task, task.board_id, task.board_id)
+    return task, previous
 
 
 def remove_task_pdf(db: Session, task_id: int):
-    return update_task(db, task_id, {"pdf_path": None})
+    return update_task_pdf(db, task_id, None)
 
 
 def create_board(db: Session, board: schemas.BoardBase):
     db_board = models.Board(title=board.title)
     db.add(db_board)
-    db.commit()
-    db.refresh(db_board)
+    db.flush()
     return db_board
 
 
 def get_board(db: Session, board_id: int):
-    return db.query(models.Board).get(board_id)
+    return db.get(models.Board, board_id)
 
 
 def get_board_by_name(db: Session, name: str):
@@ -119,54 +292,83 @@ def update_board(db: Session, board_id: int, data: dict):
     if not board:
         return None
     update_fields(board, data)
-    db.commit()
-    db.refresh(board)
+    db.flush()
+    board_cache.invalidate_board(db, board_id)
     return board
 
 
 def delete_board(db: Session, board_id: int):
     board = get_board(db, board_id)
-    if board:
-        db.delete(board)
-        db.commit()
+    if not board:
+        return False
+    # Задачи доски удаляются каскадом (delete-orphan) — их вклад в счётчики тоже
+    counters.tasks_changed(db, before=map(counters.task_counts, db.execute(
+        counters.select_task_counts(models.Task.board_id == board_id))))
+    db.delete(board)
+    db.flush()
+    board_cache.invalidate_board(db, board_id, with_tasks=True)
+    return True
+
+
+def is_user_in_board(db: Session, board_id: int, user_id: int) -> bool:
+    # Проверка по первичному ключу board_users, без загрузки board.users
+    return db.query(exists().where(
+        models.BoardUser.board_id == board_id,
+        models.BoardUser.user_id == user_id,
+    )).scalar()
+
+
+def is_task_in_board(db: Session, board_id: int, task_id: int) -> bool:
+    return db.query(exists().where(
+        models.Task.id == task_id,
+        models.Task.board_id == board_id,
+    )).scalar()
+
+
+def get_board_task_rows(db: Session, board_id: int):
+    """Задачи доски как строки TaskOut; None, если доски нет"""
+    if get_board(db, board_id) is None:
+        return None
+    return get_task_rows(db, board_id=board_id)
 
 
 def add_user_to_board(db: Session, board_id: int, user_id: int):
     board, user = get_board(db, board_id), get_user(db, user_id)
-    if board and user and user not in board.users:
-        board.users.append(user)
-        db.commit()
-        db.refresh(board)
+    if board and user and not is_user_in_board(db, board_id, user_id):
+        db.add(models.BoardUser(board_id=board_id, user_id=user_id))
+        db.flush()
         return board
     return None
 
 
 def remove_user_from_board(db: Session, board_id: int, user_id: int):
-    board, user = get_board(db, board_id), get_user(db, user_id)
-    if board and user and user in board.users:
-        board.users.remove(user)
-        db.commit()
-        db.refresh(board)
-        return board
-    return None
+    board = get_board(db, board_id)
+    if not board:
+        return None
+    removed = db.query(models.BoardUser).filter_by(board_id=board_id, user_id=user_id).delete()
+    if not removed:
+        return None
+    return board
 
 
 def add_task_to_board(db: Session, board_id: int, task_id: int):
     board, task = get_board(db, board_id), get_task(db, task_id)
-    if board and task and task not in board.tasks:
-        board.tasks.append(task)
-        db.commit()
-        db.refresh(board)
+    if board and task and task.board_id != board_id:
+        previous_board_id = task.board_id
+        board_cache.invalidate_board_tasks(db, previous_board_id, board_id)
+        task.board_id = board_id
+        db.flush()
+        events.task_event(db, "task.board_added", task, board_id, previous_board_id)
         return board
     return None
 
 
 def remove_task_from_board(db: Session, board_id: int, task_id: int):
     board, task = get_board(db, board_id), get_task(db, task_id)
-    if board and task and task in board.tasks:
-        board.tasks.remove(task)
-        db.commit()
-        db.refresh(board)
+    if board and task and task.board_id == board_id:
+        task.board_id = None
+        db.flush()
+        board_cache.invalidate_board_tasks(db, board_id)
+        events.task_event(db, "task.board_removed", task, None, board_id)
         return board
     return None
-
@@ -1,16 +1,139 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool, SingletonThreadPool
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./task_management_system.db"
+from . import config
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+
+# Асинхронные драйверы для тех же баз
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def queue_pool_options() -> dict:
+    return {
+        "poolclass": QueuePool,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+    }
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def sqlite_pool_options(pool: str) -> dict:
+    if pool == "null":
+        return {"poolclass": NullPool}
+    if pool == "singleton":
+        return {"poolclass": SingletonThreadPool}
+    if pool == "queue":
+        return queue_pool_options()
+    raise ValueError(f"Unknown SQLITE_POOL: {pool}")
+
+
+def create_sqlite_engine(url: str, pool: str = config.SQLITE_POOL, pragmas: dict = config.SQLITE_PRAGMAS):
+    engine = create_engine(url, connect_args={"check_same_thread": False}, **sqlite_pool_options(pool))
+    if pragmas:
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            apply_sqlite_pragmas(dbapi_connection, pragmas)
+    return engine
+
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    """Движок для любого бэкенда: SQLite настраивается PRAGMA, остальные — пулом из config"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return create_sqlite_engine(url)
+    return create_engine(
+        url,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        **queue_pool_options(),
+    )
+
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS[parsed.get_backend_name()]).render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str = SQLALCHEMY_DATABASE_URL, **kwargs):
+    """Асинхронный движок для той же базы, что и синхронный create_db_engine"""
+    is_sqlite = make_url(url).get_backend_name() == "sqlite"
+    if "poolclass" not in kwargs:
+        kwargs.update(queue_pool_options(), poolclass=AsyncAdaptedQueuePool)
+        if not is_sqlite:
+            kwargs.update(pool_pre_ping=config.DB_POOL_PRE_PING, pool_recycle=config.DB_POOL_RECYCLE)
+    async_engine = create_async_engine(async_database_url(url), **kwargs)
+    if is_sqlite and config.SQLITE_PRAGMAS:
+        @event.listens_for(async_engine.sync_engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            apply_sqlite_pragmas(dbapi_connection, config.SQLITE_PRAGMAS)
+    return async_engine
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+def on_commit(db: Session, callback):
+    """Выполнить callback после успешного коммита транзакции сессии (сброс кэшей и т.п.)"""
+    db.info.setdefault("after_commit", []).append(callback)
+
+
+def on_rollback(db: Session, callback):
+    """Выполнить callback, если транзакция сессии откатится (освободить уже сохранённые файлы и т.п.)"""
+    db.info.setdefault("after_rollback", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def run_after_commit_callbacks(session):
+    session.info.pop("after_rollback", None)
+    for callback in session.info.pop("after_commit", []):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def run_after_rollback_callbacks(session):
+    session.info.pop("after_commit", None)
+    for callback in session.info.pop("after_rollback", []):
+        callback()
+
+
 def get_db():
+    """Unit of work на запрос: crud делает только flush, коммит один раз в конце запроса"""
     db = SessionLocal()
     try:
         yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
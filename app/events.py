@@ -0,0 +1,328 @@
+"""Лента изменений задач: брокер в процессе, отдача по SSE и WebSocket.
+
+crud после изменения задачи вызывает task_event: снимок задачи берётся сразу,
+а публикуется он после коммита (database.on_commit). Публикация из потока
+threadpool передаётся в event loop одним call_soon_threadsafe на событие; там
+событие получает номер, попадает в кольцевой буфер последних BUFFER_SIZE
+событий и раскладывается по очередям подписчиков. Тело события (строка SSE и
+сообщение WebSocket) кодируется один раз на событие, не на подписчика.
+
+Подписка — на все задачи или на доски (событие переноса задачи приходит
+подписчикам обеих досок). Простаивающий подписчик — объект со __slots__ и одна
+задача, ждущая отключения клиента; таймеров на подписчика нет, heartbeat для
+всех шлёт одна задача брокера.
+
+Медленный клиент: очередь подписчика ограничена QUEUE_SIZE событиями, при
+переполнении поток закрывается. Клиент переподключается с Last-Event-ID и
+получает пропущенное из буфера; если из буфера оно уже вытеснено (или сервер
+перезапущен) — событие reset, после которого списки задач нужно перечитать.
+
+Номера событий свои у каждого процесса: при нескольких воркерах клиент должен
+переподключаться к тому же процессу.
+"""
+import asyncio
+import os
+from collections import deque
+from typing import Iterable, Optional
+
+import orjson
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from . import config, database, schemas, serialization
+
+
+def task_snapshot(task) -> dict:
+    """Задача в том же виде, что в списках GET /tasks"""
+    fields = schemas.TaskOut.model_fields
+    return serialization.to_dicts([tuple(getattr(task, name) for name in fields)], schemas.TaskOut)[0]
+
+
+class Event:
+    __slots__ = ("seq", "board_ids", "sse", "text")
+
+    def __init__(self, event_id: str, seq: int, board_ids: frozenset, kind: str, data: bytes):
+        self.seq = seq
+        self.board_ids = board_ids
+        self.sse = b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode(), kind.encode(), data)
+        self.text = ('{"id":"%s",' % event_id) + data[1:].decode()
+
+
+class Subscription:
+    __slots__ = ("broker", "boards", "queue", "waiter", "closed", "overflowed", "heartbeat")
+
+    def __init__(self, broker: "Broker", boards: Optional[frozenset]):
+        self.broker = broker
+        self.boards = boards
+        self.queue = deque()
+        self.waiter: Optional[asyncio.Future] = None
+        self.closed = False
+        self.overflowed = False
+        self.heartbeat = False
+
+    def _wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def push(self, event: Event):
+        if self.closed:
+            return
+        if len(self.queue) >= self.broker.queue_size:
+            # Клиент не успевает читать: закрываем поток, он догонит по Last-Event-ID
+            self.overflowed = True
+            self.queue.clear()
+            self.close()
+            return
+        self.queue.append(event)
+        self._wake()
+
+    def beat(self):
+        self.heartbeat = True
+        self._wake()
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    async def get(self) -> Optional[list]:
+        """Накопившиеся события; [] — пора послать heartbeat, None — поток закрыт"""
+        if not self.queue and not self.closed and not self.heartbeat:
+            self.waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self.waiter
+            finally:
+                self.waiter = None
+        if self.closed:
+            return None
+        self.heartbeat = False
+        events = list(self.queue)
+        self.queue.clear()
+        return events
+
+
+class Broker:
+    def __init__(self, buffer_size: int = config.EVENTS_BUFFER_SIZE, queue_size: int = config.EVENTS_QUEUE_SIZE,
+                 heartbeat_interval: int = config.EVENTS_HEARTBEAT_INTERVAL):
+        self.queue_size = queue_size
+        self.heartbeat_interval = heartbeat_interval
+        # Эпоха в id события отличает номера этого процесса от номеров до перезапуска
+        self.epoch = os.urandom(4).hex()
+        self.seq = 0
+        self.buffer = deque(maxlen=buffer_size)
+        self.everyone: set[Subscription] = set()
+        self.by_board: dict[int, set[Subscription]] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.heartbeat_task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self.loop is not None and not self.loop.is_closed()
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def start(self):
+        """Привязка к event loop приложения (lifespan)"""
+        self.loop = asyncio.get_running_loop()
+        if self.heartbeat_interval > 0:
+            self.heartbeat_task = self.loop.create_task(self._heartbeat_loop())
+
+    def stop(self):
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
+            self.heartbeat_task = None
+        for subscription in list(self.subscriptions()):
+            subscription.close()
+        self.loop = None
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            for subscription in self.subscriptions():
+                subscription.beat()
+
+    def subscriptions(self) -> Iterable[Subscription]:
+        yield from self.everyone
+        seen = set()
+        for subscribers in self.by_board.values():
+            for subscription in subscribers:
+                if subscription not in seen:
+                    seen.add(subscription)
+                    yield subscription
+
+    def publish(self, board_ids: frozenset, payload: dict):
+        """Из любого потока; события до start() и после stop() не сохраняются"""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        # Кодирование — в потоке публикации, в event loop только нумерация и раскладка
+        loop.call_soon_threadsafe(self._dispatch, board_ids, payload["type"], orjson.dumps(payload))
+
+    def _dispatch(self, board_ids: frozenset, kind: str, data: bytes):
+        self.seq += 1
+        event = Event(self.event_id(self.seq), self.seq, board_ids, kind, data)
+        self.buffer.append(event)
+        self.published += 1
+        # push не меняет множества подписчиков: отписка — только в unsubscribe
+        for subscription in self.everyone:
+            subscription.push(event)
+        targets = [self.by_board.get(board_id, ()) for board_id in board_ids]
+        if len(targets) > 1:
+            targets = [set().union(*targets)]
+        for subscribers in targets:
+            for subscription in subscribers:
+                subscription.push(event)
+
+    def subscribe(self, boards: Optional[Iterable[int]] = None,
+                  last_event_id: Optional[str] = None) -> tuple[Subscription, bool]:
+        """Подписка из event loop. Возвращает (подписка, reset): reset — пропущенное не восстановить.
+
+        Пропущенные после last_event_id события сразу кладутся в очередь подписки.
+        """
+        if not self.running:
+            self.start()
+        boards = frozenset(boards) if boards else None
+        subscription = Subscription(self, boards)
+        reset = False
+        if last_event_id:
+            reset = True
+            epoch, _, seq = last_event_id.partition("-")
+            if epoch == self.epoch and seq.isdigit():
+                seq = int(seq)
+                oldest = self.buffer[0].seq if self.buffer else self.seq + 1
+                if oldest <= seq + 1:
+                    reset = False
+                    missed = [event for event in self.buffer if event.seq > seq
+                              and (boards is None or event.board_ids & boards)]
+                    # Пропущено больше, чем помещается в очередь — проще перечитать списки
+                    if len(missed) > self.queue_size:
+                        reset = True
+                    else:
+                        subscription.queue.extend(missed)
+        if boards is None:
+            self.everyone.add(subscription)
+        else:
+            for board_id in boards:
+                self.by_board.setdefault(board_id, set()).add(subscription)
+        return subscription, reset
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        if subscription.overflowed:
+            self.dropped += 1
+        if subscription.boards is None:
+            self.everyone.discard(subscription)
+            return
+        for board_id in subscription.boards:
+            subscribers = self.by_board.get(board_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.by_board[board_id]
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.everyone) + len(set().union(*self.by_board.values())),
+            "boards": len(self.by_board),
+            "seq": self.seq,
+            "buffered": len(self.buffer),
+            "published": self.published,
+            "dropped_slow": self.dropped,
+        }
+
+
+broker = Broker()
+
+
+def task_event(db, kind: str, task, board_id: Optional[int] = None, previous_board_id: Optional[int] = None):
+    """Событие о задаче после коммита транзакции db.
+
+    task=None — задача удалена. board_id — доска задачи после изменения,
+    previous_board_id — до него (при переносе событие получат обе доски).
+    """
+    if not broker.running:
+        return
+    payload = {"type": kind, "task_id": task.id, "board_id": board_id}
+    if previous_board_id != board_id:
+        payload["previous_board_id"] = previous_board_id
+    payload["task"] = task_snapshot(task) if kind != "task.deleted" else None
+    board_ids = frozenset(board for board in (board_id, previous_board_id) if board is not None)
+    database.on_commit(db, lambda: broker.publish(board_ids, payload))
+
+
+def reset_message(broker: Broker) -> dict:
+    return {"type": "reset", "id": broker.event_id(broker.seq)}
+
+
+async def watch_disconnect(receive: Receive, subscription: Subscription, disconnect: str):
+    """Ждёт отключения клиента и закрывает подписку (одна задача на подключение)"""
+    try:
+        while (await receive())["type"] != disconnect:
+            pass
+    finally:
+        subscription.close()
+
+
+class EventStreamResponse(Response):
+    """text/event-stream из подписки.
+
+    Без StreamingResponse: тот на ASGI < 2.4 держит на ответ группу из двух
+    задач, здесь — одна задача на отслеживание отключения.
+    """
+    media_type = "text/event-stream"
+
+    def __init__(self, subscription: Subscription, reset: bool = False):
+        # Как у StreamingResponse: без тела, значит и без Content-Length
+        self.status_code = 200
+        self.background = None
+        self.init_headers({"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        self.subscription = subscription
+        self.reset = reset
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        subscription = self.subscription
+        broker = subscription.broker
+        watcher = asyncio.ensure_future(watch_disconnect(receive, subscription, "http.disconnect"))
+        try:
+            await send({"type": "http.response.start", "status": 200, "headers": self.raw_headers})
+            # retry — через сколько мс EventSource переподключится после закрытия потока
+            first = b"retry: 1000\n\n"
+            if self.reset:
+                first += b"event: reset\ndata: %s\n\n" % orjson.dumps(reset_message(broker))
+            await send({"type": "http.response.body", "body": first, "more_body": True})
+            while True:
+                events = await subscription.get()
+                if events is None:
+                    break
+                body = b"".join(event.sse for event in events) if events else b": heartbeat\n\n"
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+            if not watcher.done():
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            watcher.cancel()
+            broker.unsubscribe(subscription)
+
+
+async def stream_to_websocket(websocket, subscription: Subscription, reset: bool = False):
+    """Сообщения WebSocket из подписки: JSON события, {"type": "heartbeat"} и {"type": "reset"}"""
+    broker = subscription.broker
+    watcher = asyncio.ensure_future(watch_disconnect(websocket.receive, subscription, "websocket.disconnect"))
+    try:
+        if reset:
+            await websocket.send_text(orjson.dumps(reset_message(broker)).decode())
+        while True:
+            events = await subscription.get()
+            if events is None:
+                break
+            if not events:
+                await websocket.send_text('{"type":"heartbeat"}')
+            for event in events:
+                await websocket.send_text(event.text)
+        if not watcher.done():
+            # 1013 Try Again Later: клиент отстал, переподключиться с last_event_id
+            await websocket.close(code=1013 if subscription.overflowed else 1000)
+    finally:
+        watcher.cancel()
+        broker.unsubscribe(subscription)
@@ -0,0 +1,43 @@
+"""Потоковый экспорт таблиц: NDJSON или JSON-массив, отдаваемый по частям.
+
+Строки (только колонки схемы) читаются серверным курсором (yield_per) и
+сериализуются orjson порциями, поэтому память не зависит от размера таблицы. Генератор открывает свою
+сессию: сессия из Depends(get_async_db) закрывается раньше, чем начнётся
+отправка тела ответа.
+"""
+import orjson
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from . import config, database, serialization
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+async def export_rows(query, schema: type[BaseModel], fmt: str, chunk_size: int):
+    async with database.AsyncSessionLocal() as db:
+        query = serialization.rows_query(query, schema).execution_options(yield_per=chunk_size)
+        result = await db.stream(query)
+        if fmt == "json":
+            yield b"["
+        separator = b""
+        async for rows in result.partitions():
+            items = [orjson.dumps(item) for item in serialization.to_dicts(rows, schema)]
+            if fmt == "ndjson":
+                yield b"\n".join(items) + b"\n"
+            else:
+                yield separator + b",".join(items)
+                separator = b","
+        if fmt == "json":
+            yield b"]"
+
+
+def export_response(query, schema: type[BaseModel], fmt: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        export_rows(query, schema, fmt, config.EXPORT_CHUNK_SIZE),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
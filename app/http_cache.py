@@ -0,0 +1,83 @@
+"""Условные GET: сильные ETag и Last-Modified по версиям строк.
+
+ETag строится из (id, version, ...) — version растёт при каждом UPDATE строки
+(models.version_column), поэтому свежесть проверяется без сериализации ответа.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Union
+
+from fastapi import Request, Response
+
+Timestamp = Union[datetime, str, None]
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def to_datetime(value: Timestamp) -> Optional[datetime]:
+    # tasks.updated_at хранится строкой
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value is None:
+        return None
+    # Наивные значения пишутся через datetime.now(), то есть в локальном времени сервера
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def row_validators(kind: str, row) -> tuple[str, Optional[datetime]]:
+    """ETag и Last-Modified одной строки (ORM-объекта) с колонками version и updated_at"""
+    # updated_at в ETag отличает новую строку, получившую id удалённой
+    return make_etag(kind, row.id, row.version, str(row.updated_at)), to_datetime(row.updated_at)
+
+
+def rows_etag(*parts, rows) -> str:
+    """ETag списка: по (id, version) каждой строки и части запроса в parts.
+
+    Last-Modified у списков нет: строка, ушедшая из выборки (удалена, сменила
+    статус или доску), не меняет максимальный updated_at оставшихся.
+    """
+    return make_etag(*parts, [(row.id, row.version) for row in rows])
+
+
+def cache_headers(etag: str, modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if modified is not None:
+        headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+    return headers
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    # Для GET сравнение слабое: W/"x" совпадает с "x"
+    if header.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in header.split(","))
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+
+def is_fresh(request: Request, etag: str, modified: Optional[datetime] = None) -> bool:
+    """Есть ли у клиента актуальная копия. If-None-Match важнее If-Modified-Since (RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return since.tzinfo is not None and modified <= since
+    return False
+
+
+def headers_fresh(request: Request, headers: dict) -> bool:
+    """is_fresh по уже готовым заголовкам ответа (например, из кэша)"""
+    modified = headers.get("Last-Modified")
+    return is_fresh(request, headers["ETag"], parsedate_to_datetime(modified) if modified else None)
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
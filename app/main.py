@@ -1,17 +1,32 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Depends
 from requests import Session
 from starlette.middleware.cors import CORSMiddleware
-from starlette.staticfiles import StaticFiles
 
-from . import models, database, routes, schemas
+from . import (models, database, routes, schemas, auth, avatars, board_cache, config, events, media, metrics,
+               profiling, storage)
 from .database import Base, engine, SessionLocal
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    gc_task = None
+    if config.STORAGE_GC_INTERVAL > 0:
+        gc_task = asyncio.create_task(storage.gc_loop(
+            (routes.avatar_store, routes.pdf_store), config.STORAGE_GC_INTERVAL, config.STORAGE_GC_MIN_AGE))
+    events.broker.start()
+    yield
+    events.broker.stop()
+    if gc_task is not None:
+        gc_task.cancel()
+    auth.password_pool.shutdown()
+    avatars.image_pool.shutdown()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,10 +36,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-static_dir = "static"
-if os.path.exists(static_dir):
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
-else:
-    print(f"Warning: Static files directory '{static_dir}' not found")
+# Тот же каталог, куда пишет routes (app/static), независимо от рабочего каталога
+static_dir = os.path.join(routes.BASE_DIR, "static")
+app.mount("/static", media.MediaFiles(directory=static_dir, accel_redirect=config.MEDIA_ACCEL_REDIRECT),
+          name="static")
+
+app.include_router(routes.router)
+
+
+def collect_stats():
+    """Кэши, пул bcrypt и лента изменений — в gauge перед выдачей /metrics"""
+    for name, stats in (("boards", board_cache.stats()), ("tokens", auth.token_cache.stats())):
+        if stats["size"] is not None:
+            metrics.cache_entries.labels(name).set(stats["size"])
+        metrics.cache_hits.labels(name).set(stats["hits"])
+        metrics.cache_misses.labels(name).set(stats["misses"])
+    metrics.password_pool_pending.set(auth.password_pool.pending)
+    feed = events.broker.stats()
+    metrics.events_subscribers.set(feed["subscribers"])
+    metrics.events_published.labels().set(feed["published"])
+    metrics.events_dropped.labels().set(feed["dropped_slow"])
+
+
+if config.METRICS_ENABLED:
+    metrics.instrument_sqlalchemy()
+    # Добавлен последним — внешний слой: время запроса включает CORS и обработку ошибок
+    app.add_middleware(metrics.MetricsMiddleware)
+    app.add_route("/metrics", metrics.metrics_endpoint, include_in_schema=False)
+    metrics.REGISTRY.on_scrape(collect_stats)
 
-app.include_router(routes.router)
\ No newline at end of file
+if config.PROFILING_ENABLED:
+    # Снаружи метрик: время профилирования не попадает в гистограммы запросов
+    profiling.install(app)
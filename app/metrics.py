@@ -0,0 +1,405 @@
+"""Метрики приложения в текстовом формате Prometheus (GET /metrics).
+
+Реестр свой, без prometheus_client: счётчики, gauge и гистограммы с метками,
+значения в памяти процесса (при нескольких воркерах у каждого свои, Prometheus
+собирает их по отдельности).
+
+MetricsMiddleware — ASGI-middleware без BaseHTTPMiddleware: на запрос два
+perf_counter, обёртка send ради статуса и одна запись в гистограмму. Маршрут
+берётся из scope после роутинга (шаблон пути, а не сам путь), поэтому число
+рядов не растёт от id в URL; запросы мимо маршрутов попадают в <unmatched>.
+
+SQL считается событиями before/after_cursor_execute на всех Engine, в том
+числе sync_engine асинхронного движка. Число запросов на HTTP-запрос
+набирается в объекте из contextvar: threadpool Starlette копирует контекст,
+так что синхронные обработчики пишут в тот же объект.
+
+Значения, которые дешевле прочитать, чем поддерживать (размеры кэшей,
+подписчики ленты), обновляются при выдаче /metrics функциями из on_scrape.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы гистограмм, секунды
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+PASSWORD_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STATEMENTS_PER_REQUEST_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+UNMATCHED = "<unmatched>"
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Value:
+    """Значение счётчика или gauge для одного набора меток; только для одного потока (event loop)"""
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class LockedValue(Value):
+    """То же для записи из нескольких потоков"""
+    __slots__ = ()
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self.lock:
+            self.value -= amount
+
+
+class HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "lock")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        # Последняя ячейка — значения больше верхней границы (+Inf)
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self) -> "Timer":
+        return Timer(self)
+
+
+class LockedHistogramValue(HistogramValue):
+    __slots__ = ()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: HistogramValue):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class Metric:
+    """Метрика с метками. thread_safe=False — пишется только из event loop, без блокировки
+    (with lock — около половины стоимости записи)"""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 registry: Optional["Registry"] = None, thread_safe: bool = True):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.thread_safe = thread_safe
+        self.children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        return LockedValue() if self.thread_safe else Value()
+
+    def labels(self, *values):
+        # Ключ — и сами значения, и их строки: labels("GET", route, 200) без str() на каждый вызов
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self.children.setdefault(tuple(str(value) for value in values), self._new_child())
+                self.children[values] = child
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def samples(self):
+        """(суффикс имени, метки, значение) для выдачи"""
+        seen = set()
+        for values, child in list(self.children.items()):
+            if id(child) in seen:
+                continue
+            seen.add(id(child))
+            yield "", format_labels(self.labelnames, values), child.value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{self.name}{suffix}{labels} {format_value(value)}" for suffix, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: tuple = LATENCY_BUCKETS, registry: Optional["Registry"] = None, thread_safe: bool = True):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry, thread_safe)
+
+    def _new_child(self):
+        return LockedHistogramValue(self.buckets) if self.thread_safe else HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self) -> Timer:
+        return self._default().time()
+
+    def samples(self):
+        seen = set()
+        for values, child in list(self.children.items()):
+            if id(child) in seen:
+                continue
+            seen.add(id(child))
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", format_labels(self.labelnames, values, f'le="{format_value(float(bound))}"'), \
+                    cumulative
+            yield "_sum", format_labels(self.labelnames, values), total
+            yield "_count", format_labels(self.labelnames, values), cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        self.collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Metric):
+        if any(existing.name == metric.name for existing in self.metrics):
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics.append(metric)
+
+    def on_scrape(self, collector: Callable[[], None]):
+        """collector вызывается перед каждой выдачей и обновляет gauge"""
+        self.collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# HTTP-метрики пишет только MetricsMiddleware в event loop
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests being processed (including open streams)", thread_safe=False)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response body is sent",
+    ("method", "route", "status"), thread_safe=False)
+http_request_statements = Histogram(
+    "http_request_db_statements", "SQL statements executed per HTTP request",
+    ("method", "route"), buckets=STATEMENTS_PER_REQUEST_BUCKETS, thread_safe=False)
+http_request_db_duration = Histogram(
+    "http_request_db_seconds", "Total SQL execution time per HTTP request", ("method", "route"), thread_safe=False)
+db_statement_duration = Histogram(
+    "db_statement_duration_seconds", "SQL statement execution time", ("operation",), buckets=STATEMENT_BUCKETS)
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds", "bcrypt hash/verify time; for the process pool including queue wait",
+    ("operation", "mode"), buckets=PASSWORD_BUCKETS)
+
+# Обновляются в on_scrape
+cache_entries = Gauge("cache_entries", "Entries in in-process caches", ("cache",))
+cache_hits = Counter("cache_hits_total", "Cache hits since start or last clear", ("cache",))
+cache_misses = Counter("cache_misses_total", "Cache misses since start or last clear", ("cache",))
+password_pool_pending = Gauge("password_pool_pending", "bcrypt operations running or queued in the process pool")
+events_subscribers = Gauge("events_subscribers", "Open task event streams")
+events_published = Counter("events_published_total", "Task events published")
+events_dropped = Counter("events_dropped_slow_total", "Event streams closed because the client fell behind")
+
+
+# --- HTTP ---
+
+class RequestStats:
+    """SQL одного HTTP-запроса; пишется из event loop и из потоков threadpool"""
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "metrics_request", default=None)
+
+
+def route_label(scope: Scope, root_path: str) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mount (например, /static) сам маршрут в scope не кладёт, но дописывает свой префикс в root_path
+    mounted = scope.get("root_path", "")
+    if mounted != root_path:
+        return mounted[len(root_path):] + "/{path}"
+    return UNMATCHED
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.in_flight = http_requests_in_flight.labels()
+        # (method, route, status) -> ряды трёх гистограмм: один поиск в словаре на запрос
+        self.series: dict[tuple, tuple] = {}
+
+    def _series(self, method: str, route: str, status: int) -> tuple:
+        key = (method, route, status)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = (http_request_duration.labels(method, route, status),
+                                         http_request_statements.labels(method, route),
+                                         http_request_db_duration.labels(method, route))
+        return series
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        root_path = scope.get("root_path", "")
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        self.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight.dec()
+            current_request.reset(token)
+            duration, statements, db_seconds = self._series(scope["method"], route_label(scope, root_path), status)
+            duration.observe(elapsed)
+            statements.observe(stats.statements)
+            db_seconds.observe(stats.db_seconds)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+# --- SQL ---
+
+OPERATIONS = {"SELECT": "select", "INSERT": "insert", "UPDATE": "update", "DELETE": "delete"}
+# Текст SQL -> ряд гистограммы. Тексты берутся из кэша компиляции SQLAlchemy, их немного;
+# строки сверх предела (сырой SQL с литералами) разбираются каждый раз
+STATEMENT_CACHE_SIZE = 1000
+statement_series: dict[str, HistogramValue] = {}
+
+
+def statement_histogram(statement: str) -> HistogramValue:
+    series = statement_series.get(statement)
+    if series is None:
+        series = db_statement_duration.labels(OPERATIONS.get(statement.lstrip()[:6].upper(), "other"))
+        if len(statement_series) < STATEMENT_CACHE_SIZE:
+            statement_series[statement] = series
+    return series
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Без контекста исполнения (служебные запросы диалекта) время не меряется
+    if context is not None:
+        context.metrics_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None:
+        return
+    elapsed = time.perf_counter() - context.metrics_started
+    statement_histogram(statement).observe(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_sqlalchemy():
+    """Слушатели на классе Engine: все движки процесса, включая созданные позже"""
+    if not event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+
+
+def uninstrument_sqlalchemy():
+    if event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+        event.remove(Engine, "after_cursor_execute", after_cursor_execute)
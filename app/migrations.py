@@ -0,0 +1,129 @@
+"""Миграции для уже существующих баз.
+
+    python -m app.migrations   # создать недостающие индексы
+
+Схема ведётся в Alembic (alembic/versions), здесь — вспомогательные функции для ревизий.
+"""
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, cast, column, func, insert, select, table, update
+from sqlalchemy.engine import Engine
+
+from .database import engine as default_engine
+# Base из models, а не из database: так таблицы моделей уже зарегистрированы в metadata
+from .models import Base
+
+
+def deduplicate_board_titles_query():
+    """UPDATE, переименовывающий доски с повторяющимся title в "title (id)"; первая доска сохраняет имя"""
+    # Только нужные колонки: ревизия 0001 выполняется до появления version/updated_at
+    boards = table("boards", column("id", Integer), column("title", String))
+    first_ids = (
+        select(func.min(boards.c.id))
+        .group_by(boards.c.title)
+        .scalar_subquery()
+    )
+    return (
+        update(boards)
+        .where(boards.c.id.not_in(first_ids))
+        .values(title=boards.c.title + " (" + cast(boards.c.id, String) + ")")
+    )
+
+
+def deduplicate_board_titles(connection) -> int:
+    return connection.execute(deduplicate_board_titles_query()).rowcount
+
+
+def create_missing_indexes(engine: Engine = default_engine) -> tuple[int, list]:
+    """Создаёт индексы из моделей, которых ещё нет в базе.
+
+    Возвращает число переименованных досок-дубликатов и имена созданных индексов.
+    """
+    created = []
+    with engine.begin() as connection:
+        # Уникальный индекс на boards.title не создастся, пока есть дубликаты
+        renamed = deduplicate_board_titles(connection)
+        for table in Base.metadata.sorted_tables:
+            existing = {index["name"] for index in connection.dialect.get_indexes(connection, table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    index.create(connection)
+                    created.append(index.name)
+    return renamed, created
+
+
+# Прогресс пакетных backfill-ов: после перезапуска продолжаем с last_id
+backfill_metadata = MetaData()
+backfill_progress = Table(
+    "backfill_progress",
+    backfill_metadata,
+    Column("name", String, primary_key=True),
+    Column("last_id", Integer, nullable=False),
+    Column("rows_done", Integer, nullable=False),
+)
+
+
+def backfill_in_batches(engine: Engine,
+                        name: str,
+                        table: Table,
+                        values: Optional[dict] = None,
+                        apply: Optional[Callable] = None,
+                        where=None,
+                        batch_size: int = 1000,
+                        pause: float = 0.0) -> int:
+    """Пакетный, возобновляемый backfill по первичному ключу.
+
+    Каждая пачка из batch_size строк обновляется в своей транзакции вместе с
+    записью прогресса, поэтому блокировка записи SQLite держится только на
+    время одной пачки, а прерванный backfill продолжается с места остановки.
+    Строки меняются либо UPDATE ... SET values, либо вызовом apply(connection, ids).
+    pause — пауза между пачками, чтобы пропустить запросы приложения.
+    Возвращает число строк, обработанных этим запуском.
+    """
+    if (values is None) == (apply is None):
+        raise ValueError("Pass exactly one of values or apply")
+    pk = table.primary_key.columns.values()[0]
+    backfill_progress.create(engine, checkfirst=True)
+
+    with engine.connect() as connection:
+        last_id = connection.execute(
+            select(backfill_progress.c.last_id).where(backfill_progress.c.name == name)
+        ).scalar()
+
+    processed = 0
+    while True:
+        with engine.begin() as connection:
+            query = select(pk).order_by(pk).limit(batch_size)
+            if last_id is not None:
+                query = query.where(pk > last_id)
+            if where is not None:
+                query = query.where(where)
+            ids = connection.execute(query).scalars().all()
+            if not ids:
+                break
+
+            if apply is not None:
+                apply(connection, ids)
+            else:
+                connection.execute(update(table).where(pk.in_(ids)).values(values))
+
+            if last_id is None:
+                connection.execute(insert(backfill_progress).values(
+                    name=name, last_id=ids[-1], rows_done=len(ids)))
+            else:
+                connection.execute(update(backfill_progress).where(backfill_progress.c.name == name).values(
+                    last_id=ids[-1], rows_done=backfill_progress.c.rows_done + len(ids)))
+            last_id = ids[-1]
+        processed += len(ids)
+        if pause:
+            time.sleep(pause)
+    return processed
+
+
+if __name__ == "__main__":
+    renamed, created = create_missing_indexes()
+    if renamed:
+        print(f"Warning: renamed {renamed} boards with duplicate titles")
+    for name in created:
+        print(f"created index {name}")
@@ -1,11 +1,20 @@
 from typing import Optional
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, literal_column
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
 
 
+def version_column():
+    # Любой UPDATE строки (ORM, bulk, Core) увеличивает версию в самом SQL; по ней строится ETag
+    return Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version") + 1)
+
+
+def now_string():
+    return str(datetime.now())
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -15,6 +24,8 @@ class User(Base):
     avatar_url = Column(String, nullable=True)
     role = Column(String, default='user')
     closed_tasks_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, nullable=True, default=datetime.now, onupdate=datetime.now)
+    version = version_column()
 
     created_tasks = relationship("Task", back_populates="creator", foreign_keys="Task.creator_id")
     responsible_tasks = relationship("Task", back_populates="responsible", foreign_keys="Task.responsible_id")
@@ -28,12 +39,15 @@ class Task(Base):
     title = Column(String)
     description = Column(String)
     priority = Column(String)
-    status = Column(String)
-    created_at = Column(DateTime, default=datetime.now())
+    status = Column(String, index=True)
+    created_at = Column(DateTime, default=datetime.now)
     pdf_path = Column(String, nullable=True)
-    updated_at = Column(String, nullable=True)
+    # Строка, как исторически; при любом UPDATE проставляется текущее время
+    updated_at = Column(String, nullable=True, onupdate=now_string)
+    version = version_column()
 
-    creator_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    creator_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    # responsible_id и board_id индексируются составными индексами ниже (левый префикс)
     responsible_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     board_id = Column(Integer, ForeignKey("boards.id"), nullable=True)
 
@@ -41,17 +55,33 @@ class Task(Base):
     responsible = relationship("User", back_populates="responsible_tasks", foreign_keys=[responsible_id])
     board = relationship("Board", back_populates="tasks")
 
+    __table_args__ = (
+        Index("ix_tasks_board_id_status", "board_id", "status"),
+        Index("ix_tasks_responsible_id_status", "responsible_id", "status"),
+    )
+
 
 class Board(Base):
     __tablename__ = "boards"
 
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, nullable=False)
+    title = Column(String, nullable=False, unique=True, index=True)
+    updated_at = Column(DateTime, nullable=True, default=datetime.now, onupdate=datetime.now)
+    version = version_column()
 
     tasks = relationship("Task", back_populates="board", cascade="all, delete-orphan")
     users = relationship("User", secondary="board_users", back_populates="boards")
 
 
+class UserTaskCounter(Base):
+    """Счётчики задач пользователя по имени (app/counters.py); нет строки — значит 0"""
+    __tablename__ = "user_task_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
 class BoardUser(Base):
     __tablename__ = "board_users"
 
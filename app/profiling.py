@@ -0,0 +1,326 @@
+"""Профилирование отдельных запросов FastAPI-приложения в collapsed stacks.
+
+Включается PROFILING_ENABLED=1; без него install() не вызывается, и ни
+middleware, ни маршрутов /admin/profiles в приложении нет. Профилируется запрос
+с заголовком X-Profile: <PROFILING_TOKEN> или случайная доля
+PROFILING_SAMPLE_RATE запросов, одновременно — не больше одного.
+
+Режимы:
+- sample — отдельный поток раз в PROFILING_INTERVAL_MS снимает стеки всех
+  потоков (sys._current_frames), простаивающие отбрасываются. Видны и
+  синхронные обработчики в threadpool. Снимок — за всё время запроса, так что
+  под нагрузкой в него попадают и соседние запросы.
+- cprofile — cProfile в потоке event loop: точные вызовы асинхронного кода и
+  сериализации, но не threadpool. Стеки восстанавливаются из графа
+  вызывающий -> вызываемый приближённо (см. cprofile_stacks).
+
+Снимок — файл <id>-<метод>-<маршрут>-<статус>-<мс>ms-<режим>.collapsed в
+PROFILING_DIR: строки «кадр;кадр;... число» (образцы или микросекунды) для
+flamegraph.pl и speedscope. Сверх PROFILING_MAX_FILES старые файлы удаляются.
+bcrypt в пуле процессов не виден ни в одном режиме.
+"""
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse
+from starlette import status
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import auth, config, metrics
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+MODES = ("sample", "cprofile")
+SUFFIX = ".collapsed"
+PROFILE_ID = re.compile(r"^\d{8}T\d{9}-\d+-\d+$")
+FILE_NAME = re.compile(r"^(?P<id>\d{8}T\d{9}-\d+-\d+)-(?P<method>[A-Z]+)-(?P<route>\w*)-(?P<status>\d+)-"
+                       r"(?P<duration_ms>\d+)ms-(?P<mode>sample|cprofile)\.collapsed$")
+
+# Листовые кадры потоков, которые ждут работы: такие образцы не пишутся
+IDLE_FRAMES = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"),
+               ("threading.py", "_wait_for_tstate_lock")}
+# Глубина пути над вызывающим в режиме cprofile
+MAX_DEPTH = 200
+
+
+def short_path(filename: str) -> str:
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if filename.startswith(root + os.sep):
+        return os.path.relpath(filename, root)
+    return os.path.basename(filename)
+
+
+class StackSampler:
+    """Поток, считающий стеки всех остальных потоков"""
+
+    def __init__(self, interval: float, max_seconds: float):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.labels: dict = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def _label(self, code) -> str:
+        label = self.labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = self.labels[code] = f"{name} ({short_path(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)).replace(";", ":"))
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            self.sample()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+def cprofile_stacks(profile: cProfile.Profile) -> Counter:
+    """Collapsed stacks из статистики cProfile, значения — собственное время в мкс.
+
+    cProfile хранит не стеки, а рёбра вызывающий -> вызываемый. Собственное
+    время функции делится по её вызывающим точно (оно есть на рёбрах), а путь
+    выше вызывающего идёт по самому тяжёлому (по совокупному времени) вызывающему.
+    Корней может не быть: профиль включается посреди стека event loop, где
+    функции вызывают друг друга по кругу.
+    """
+    stats = pstats.Stats(profile).stats
+
+    def label(func) -> str:
+        filename, line, name = func
+        if filename == "~":
+            return name.replace(";", ":")
+        return f"{name} ({short_path(filename)}:{line})"
+
+    paths: dict = {}
+
+    def path_to(func) -> str:
+        """Путь от корня до func; пути всех функций по дороге запоминаются"""
+        chain, seen = [], set()
+        current = func
+        while current is not None and current not in paths and current not in seen and len(chain) < MAX_DEPTH:
+            seen.add(current)
+            chain.append(current)
+            callers = stats[current][4] if current in stats else {}
+            current = max(callers, key=lambda caller: callers[caller][3]) if callers else None
+        prefix = paths.get(current)
+        for node in reversed(chain):
+            prefix = paths[node] = label(node) if prefix is None else f"{prefix};{label(node)}"
+        return paths[func]
+
+    stacks: Counter = Counter()
+    for func, (_, _, own, _, callers) in stats.items():
+        if not callers:
+            if round(own * 1e6):
+                stacks[label(func)] += round(own * 1e6)
+            continue
+        for caller, (_, _, edge_own, _) in callers.items():
+            if round(edge_own * 1e6):
+                stacks[f"{path_to(caller)};{label(func)}"] += round(edge_own * 1e6)
+    return stacks
+
+
+class Profiler:
+    def __init__(self, directory: str = config.PROFILING_DIR or DEFAULT_DIR, mode: str = config.PROFILING_MODE,
+                 sample_rate: float = config.PROFILING_SAMPLE_RATE, token: str = config.PROFILING_TOKEN,
+                 interval_ms: int = config.PROFILING_INTERVAL_MS, max_files: int = config.PROFILING_MAX_FILES,
+                 max_seconds: int = config.PROFILING_MAX_SECONDS):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}, expected one of {MODES}")
+        self.directory = directory
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.token = token.encode()
+        self.interval = interval_ms / 1000
+        self.max_files = max_files
+        self.max_seconds = max_seconds
+        self.seq = 0
+        # Один снимок за раз: cProfile на поток один, а сэмплер и так видит весь процесс
+        self._busy = threading.Lock()
+
+    def requested_mode(self, scope: Scope) -> Optional[str]:
+        """Режим для запроса или None — запрос не профилируется"""
+        mode = self.mode
+        header = None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                header = value
+            elif name == b"x-profile-mode" and value.decode("latin-1") in MODES:
+                mode = value.decode("latin-1")
+        if header is not None and self.token and hmac.compare_digest(header, self.token):
+            return mode
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    def next_id(self) -> str:
+        """Время до миллисекунд, pid и номер: уникален между воркерами и сортируется по времени"""
+        now = time.time()
+        self.seq += 1
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(now))
+        return f"{stamp}{int(now * 1000) % 1000:03d}-{os.getpid()}-{self.seq}"
+
+    def save(self, profile_id: str, method: str, route: str, status_code: int, duration: float, mode: str,
+             stacks: Counter) -> str:
+        """Пишет снимок и удаляет самые старые сверх max_files; возвращает имя файла"""
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r"\W+", "_", route).strip("_")
+        name = f"{profile_id}-{method}-{slug}-{status_code}-{round(duration * 1000)}ms-{mode}{SUFFIX}"
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", "w") as file:
+            file.writelines(f"{stack} {value}\n" for stack, value in stacks.most_common())
+        os.replace(path + ".tmp", path)
+        for old in self.captures()[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, old["name"]))
+            except FileNotFoundError:
+                # Уже удалил другой воркер
+                pass
+        return name
+
+    def captures(self) -> list[dict]:
+        """Снимки, новые первыми"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        profiles = []
+        for name in names:
+            match = FILE_NAME.match(name)
+            if match is None:
+                continue
+            profile = match.groupdict()
+            profile.update(name=name, status=int(profile["status"]), duration_ms=int(profile["duration_ms"]),
+                           size=os.path.getsize(os.path.join(self.directory, name)))
+            profiles.append(profile)
+        # id начинается с времени до миллисекунд; при совпадении — по порядковому номеру
+        profiles.sort(key=lambda profile: (profile["id"].split("-")[0], int(profile["id"].rsplit("-", 1)[1])),
+                      reverse=True)
+        return profiles
+
+    def find(self, profile_id: str) -> Optional[str]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        for profile in self.captures():
+            if profile["id"] == profile_id:
+                return os.path.join(self.directory, profile["name"])
+        return None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler = self.profiler
+        mode = profiler.requested_mode(scope) if scope["type"] == "http" else None
+        if mode is None or not profiler._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = profiler.next_id()
+        status_code = 500
+        root_path = scope.get("root_path", "")
+
+        async def send_with_id(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        try:
+            started = time.perf_counter()
+            if mode == "cprofile":
+                profile = cProfile.Profile()
+                profile.enable()
+                try:
+                    await self.app(scope, receive, send_with_id)
+                finally:
+                    profile.disable()
+                duration = time.perf_counter() - started
+                stacks = await run_in_threadpool(cprofile_stacks, profile)
+            else:
+                sampler = StackSampler(profiler.interval, profiler.max_seconds)
+                sampler.start()
+                try:
+                    await self.app(scope, receive, send_with_id)
+                finally:
+                    stacks = sampler.stop()
+                duration = time.perf_counter() - started
+            await run_in_threadpool(profiler.save, profile_id, scope["method"],
+                                    metrics.route_label(scope, root_path), status_code, duration, mode, stacks)
+        finally:
+            profiler._busy.release()
+
+
+# --- Админка снимков ---
+
+def require_admin(current_user=Depends(auth.get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Только для администратора")
+    return current_user
+
+
+router = APIRouter(prefix="/admin/profiles", dependencies=[Depends(require_admin)], include_in_schema=False)
+
+
+@router.get("")
+def list_profiles(request: Request):
+    """Снимки профилировщика, новые первыми"""
+    return request.app.state.profiler.captures()
+
+
+@router.get("/{profile_id}")
+def download_profile(profile_id: str, request: Request):
+    path = request.app.state.profiler.find(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=os.path.basename(path))
+
+
+def install(app: FastAPI, profiler: Optional[Profiler] = None) -> Profiler:
+    """Middleware и /admin/profiles; вызывается только при PROFILING_ENABLED"""
+    profiler = profiler or Profiler()
+    app.state.profiler = profiler
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    app.include_router(router)
+    return profiler
@@ -1,14 +1,17 @@
 import os
-import shutil
-from datetime import datetime
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Body, Depends, UploadFile, File, HTTPException, Query, Request, Response, WebSocket
+from fastapi.responses import JSONResponse, RedirectResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from starlette import status
+from starlette.concurrency import run_in_threadpool
 
-from . import crud, models, schemas, auth, database
-from .auth import get_password_hash
+from helpers.avatar_validation import validate_image
+from . import (async_crud, auth, avatars, board_cache, config, crud, database, events, export, http_cache, models,
+               schemas, serialization, storage, uploads)
 from .schemas import TaskUpdate, AssignResponsibleRequest
 
 router = APIRouter()
@@ -16,40 +19,45 @@ router = APIRouter()
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # папка с файлом кода
 AVATAR_DIR = os.path.join(BASE_DIR, "static", "avatars")
 PDF_DIR = os.path.join(BASE_DIR, "static", "pdfs")
+PDF_URL_PREFIX = "/static/pdfs/"
 
-os.makedirs(AVATAR_DIR, exist_ok=True)
-os.makedirs(PDF_DIR, exist_ok=True)
+# Счётчики ссылок лежат вне static, чтобы не раздаваться как файлы
+STORAGE_INDEX_DIR = os.path.join(BASE_DIR, "storage")
 
-MAX_FILE_SIZE = 5 * 1024 * 1024
+avatar_store = storage.BlobStore(AVATAR_DIR, os.path.join(STORAGE_INDEX_DIR, "avatars.db"))
+pdf_store = storage.BlobStore(PDF_DIR, os.path.join(STORAGE_INDEX_DIR, "pdfs.db"))
+
+MAX_FILE_SIZE = config.PDF_MAX_SIZE
 
 
 @router.post("/admin/create", response_model=schemas.UserOut)
-def create_admin_user(
+async def create_admin_user(
     user_data: schemas.UserCreate,
     db: Session = Depends(database.get_db),
 ):
-    db_user = auth.get_user(db, user_data.username)
+    # Синхронная сессия — в пул потоков, чтобы SQL не блокировал цикл событий
+    db_user = await run_in_threadpool(auth.get_user, db, user_data.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already exists")
 
     new_user = models.User(
         username=user_data.username,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await auth.get_password_hash_async(user_data.password),
         role="admin"
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(db.flush)
     return new_user
 
 
 @router.post("/users/register", response_model=schemas.UserOut)
-def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    db_user = auth.get_user(db, user.username)
+async def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+    db_user = await run_in_threadpool(auth.get_user, db, user.username)
     if db_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Username already exists")
 
-    created_user = crud.create_user(db, user)
+    hashed_password = await auth.get_password_hash_async(user.password)
+    created_user = await run_in_threadpool(crud.create_user, db, user, hashed_password)
 
     if not created_user:
         raise HTTPException(
@@ -60,8 +68,8 @@ def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(login_data: schemas.LoginInput, db: Session = Depends(database.get_db)):
-    user = auth.authenticate_user(db, login_data.username, login_data.password)
+async def login(login_data: schemas.LoginInput, db: Session = Depends(database.get_db)):
+    user = await auth.authenticate_user_async(db, login_data.username, login_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     token = auth.create_access_token(data={"sub": user.username})
@@ -75,15 +83,160 @@ def create_task(task: schemas.TaskCreate,
     return crud.create_task(db, task, current_user)
 
 
+def check_bulk_size(items: list):
+    if len(items) > config.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Too many items, maximum is {config.BULK_MAX_ITEMS}")
+
+
+def bulk_error(index: int, error: str, task_id: Optional[int] = None):
+    return schemas.BulkItemResult(index=index, id=task_id, status="error", error=error)
+
+
+def validate_bulk_items(items: list, schema, start: int, results: list):
+    """Валидирует элементы по одному: ошибка в одном не отменяет остальные"""
+    valid = []
+    for index, item in enumerate(items, start):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            results.append(bulk_error(index, error))
+    return valid
+
+
+def drop_unknown_responsible(db: Session, valid: list, results: list):
+    responsible_ids = {task.responsible_id for _, task in valid if task.responsible_id is not None}
+    if not responsible_ids:
+        return valid
+    existing = crud.get_existing_user_ids(db, responsible_ids)
+    kept = []
+    for index, task in valid:
+        if task.responsible_id is not None and task.responsible_id not in existing:
+            results.append(bulk_error(index, "Responsible user not found", getattr(task, "id", None)))
+        else:
+            kept.append((index, task))
+    return kept
+
+
+@router.post("/tasks/bulk", response_model=list[schemas.BulkItemResult])
+def create_tasks_bulk(items: list[Any] = Body(...),
+                      current_user=Depends(auth.get_current_user),
+                      db: Session = Depends(database.get_db)):
+    """Создаёт задачи пачками; результат по каждому элементу в порядке запроса"""
+    check_bulk_size(items)
+    results = []
+    for start in range(0, len(items), config.BULK_BATCH_SIZE):
+        batch = items[start:start + config.BULK_BATCH_SIZE]
+        valid = validate_bulk_items(batch, schemas.TaskCreate, start, results)
+        valid = drop_unknown_responsible(db, valid, results)
+        if not valid:
+            continue
+        rows = [dict(task.model_dump(), creator_id=current_user.id) for _, task in valid]
+        ids = crud.create_tasks_bulk(db, rows)
+        results += [schemas.BulkItemResult(index=index, id=task_id, status="created")
+                    for (index, _), task_id in zip(valid, ids)]
+    return sorted(results, key=lambda result: result.index)
+
+
+@router.patch("/tasks/bulk", response_model=list[schemas.BulkItemResult])
+def update_tasks_bulk(items: list[Any] = Body(...),
+                      current_user=Depends(auth.get_current_user),
+                      db: Session = Depends(database.get_db)):
+    """Обновляет задачи пачками; обновлять можно только свои задачи, как в PATCH /tasks/{id}"""
+    check_bulk_size(items)
+    results = []
+    for start in range(0, len(items), config.BULK_BATCH_SIZE):
+        batch = items[start:start + config.BULK_BATCH_SIZE]
+        valid = validate_bulk_items(batch, schemas.TaskBulkUpdate, start, results)
+        creators = crud.get_task_creators(db, [task.id for _, task in valid])
+        owned = []
+        for index, task in valid:
+            if task.id not in creators:
+                results.append(bulk_error(index, "Task not found", task.id))
+            elif creators[task.id] != current_user.id:
+                results.append(bulk_error(index, "Not authorized to update this task", task.id))
+            else:
+                owned.append((index, task))
+        owned = drop_unknown_responsible(db, owned, results)
+        crud.update_tasks_bulk(db, [task.model_dump(exclude_unset=True) | {"id": task.id}
+                                    for _, task in owned
+                                    if task.model_fields_set - {"id"}])
+        results += [schemas.BulkItemResult(index=index, id=task.id, status="updated") for index, task in owned]
+    return sorted(results, key=lambda result: result.index)
+
+
 @router.get("/tasks_by_user_id", response_model=list[schemas.TaskOut])
 def read_tasks(current_user=Depends(auth.get_current_user),
                db: Session = Depends(database.get_db)):
-    return crud.get_tasks(db, current_user)
+    return serialization.rows_response(crud.get_task_rows(db, creator_id=current_user.id), schemas.TaskOut)
 
 
 @router.get("/tasks", response_model=list[schemas.TaskOut])
-def read_tasks(db: Session = Depends(database.get_db)):
-    return crud.get_all_tasks(db)
+async def read_tasks(request: Request,
+                     limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+                     cursor: Optional[int] = Query(None, ge=0, description="id последней задачи предыдущей страницы"),
+                     task_status: Optional[str] = Query(None, alias="status"),
+                     priority: Optional[str] = None,
+                     creator_id: Optional[int] = None,
+                     responsible_id: Optional[int] = None,
+                     board_id: Optional[int] = None,
+                     db: AsyncSession = Depends(database.get_async_db)):
+    rows, next_cursor = await async_crud.get_task_rows_page(
+        db, limit, cursor,
+        status=task_status,
+        priority=priority,
+        creator_id=creator_id,
+        responsible_id=responsible_id,
+        board_id=board_id,
+    )
+    etag = http_cache.rows_etag("tasks", next_cursor, rows=rows)
+    headers = http_cache.cache_headers(etag)
+    if http_cache.is_fresh(request, etag):
+        return http_cache.not_modified(headers)
+    # Курсор следующей страницы отдаём в заголовках, тело остаётся списком задач
+    if next_cursor is not None:
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        headers["X-Next-Cursor"] = str(next_cursor)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return serialization.rows_response(rows, schemas.TaskOut, headers)
+
+
+@router.get("/tasks/export")
+def export_tasks(export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|json)$"),
+                 task_status: Optional[str] = Query(None, alias="status"),
+                 priority: Optional[str] = None,
+                 creator_id: Optional[int] = None,
+                 responsible_id: Optional[int] = None,
+                 board_id: Optional[int] = None):
+    """Все задачи потоком (NDJSON или JSON-массив), без сборки списка в памяти"""
+    query = crud.tasks_query(
+        status=task_status,
+        priority=priority,
+        creator_id=creator_id,
+        responsible_id=responsible_id,
+        board_id=board_id,
+    )
+    return export.export_response(query, schemas.TaskOut, export_format, "tasks")
+
+
+@router.get("/tasks/events")
+async def task_events(request: Request,
+                      board_id: Optional[list[int]] = Query(None, description="доски; без параметра — все задачи"),
+                      last_event_id: Optional[str] = Query(None, description="вместо заголовка Last-Event-ID")):
+    """Лента изменений задач (Server-Sent Events) вместо опроса GET /tasks и GET /boards/{id}/tasks"""
+    subscription, reset = events.broker.subscribe(board_id, request.headers.get("last-event-id") or last_event_id)
+    return events.EventStreamResponse(subscription, reset)
+
+
+@router.websocket("/tasks/events/ws")
+async def task_events_ws(websocket: WebSocket,
+                         board_id: Optional[list[int]] = Query(None),
+                         last_event_id: Optional[str] = Query(None)):
+    """Та же лента по WebSocket: сообщение — JSON события с полем id"""
+    await websocket.accept()
+    subscription, reset = events.broker.subscribe(board_id, last_event_id)
+    await events.stream_to_websocket(websocket, subscription, reset)
 
 
 @router.put("/tasks/{task_id}/assign", response_model=schemas.TaskOut)
@@ -183,7 +336,8 @@ def add_user(board_id: int, data: schemas.BoardUserModify,
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
 
-    if board.creator_id != current_user.id:
+    # Владельца у доски нет: добавлять могут её участники и администраторы
+    if current_user.role != "admin" and not crud.is_user_in_board(db, board_id, current_user.id):
         raise HTTPException(status_code=403, detail="User can not update board")
 
     # Проверяем, что пользователь существует
@@ -192,7 +346,7 @@ def add_user(board_id: int, data: schemas.BoardUserModify,
         raise HTTPException(status_code=404, detail="User not found")
 
     # Проверяем, что пользователь уже не добавлен в доску
-    if user_to_add in board.users:
+    if crud.is_user_in_board(db, board_id, user_to_add.id):
         raise HTTPException(status_code=400, detail="User already in board")
 
     board = crud.add_user_to_board(db, board_id, data.user_id)
@@ -210,9 +364,6 @@ def remove_user(board_id: int, data: schemas.BoardUserModify,
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
 
-    if board.creator_id != current_user.id:
-        raise HTTPException(status_code=403, detail="User can not remove other user")
-
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -225,7 +376,7 @@ def remove_user(board_id: int, data: schemas.BoardUserModify,
         raise HTTPException(status_code=404, detail="User not found")
 
     # Проверяем, что пользователь действительно в доске
-    if user_to_remove not in board.users:
+    if not crud.is_user_in_board(db, board_id, user_to_remove.id):
         raise HTTPException(status_code=400, detail="User not in board")
 
     board = crud.remove_user_from_board(db, board_id, data.user_id)
@@ -247,11 +398,21 @@ def create_board(board_data: schemas.BoardBase,
 
 
 @router.get("/boards/{board_id}", response_model=schemas.BoardOut)
-def read_board(board_id: int, db: Session = Depends(database.get_db)):
-    board = crud.get_board(db, board_id)
-    if not board:
-        raise HTTPException(status_code=404, detail="Board not found")
-    return board
+async def read_board(board_id: int, request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    key = board_cache.board_key(board_id)
+    cached = await board_cache.aget(key)
+    if cached is None:
+        seen_generation = board_cache.generation(key)
+        board = await async_crud.get_board(db, board_id)
+        if not board:
+            raise HTTPException(status_code=404, detail="Board not found")
+        etag, modified = http_cache.row_validators("board", board)
+        body = schemas.BoardOut.model_validate(board).model_dump_json().encode()
+        cached = board_cache.CachedResponse(http_cache.cache_headers(etag, modified), body)
+        await board_cache.aput(key, cached, seen_generation)
+    if http_cache.headers_fresh(request, cached.headers):
+        return http_cache.not_modified(cached.headers)
+    return cached.response()
 
 
 @router.post("/boards/{board_id}/tasks/add")
@@ -269,7 +430,7 @@ def add_task(board_id: int, data: schemas.TaskToBoard,
         raise HTTPException(status_code=404, detail="Task not found")
 
     # Проверяем, что задача уже не в доске
-    if task in board.tasks:
+    if crud.is_task_in_board(db, board_id, task.id):
         raise HTTPException(status_code=400, detail="Task already in board")
 
     board = crud.add_task_to_board(db, board_id, data.task_id)
@@ -293,7 +454,7 @@ def remove_task(board_id: int, data: schemas.TaskToBoard,
         raise HTTPException(status_code=404, detail="Task not found")
 
     # Проверяем, что задача действительно в доске
-    if task not in board.tasks:
+    if not crud.is_task_in_board(db, board_id, task.id):
         raise HTTPException(status_code=400, detail="Task not in board")
 
     board = crud.remove_task_from_board(db, board_id, data.task_id)
@@ -303,11 +464,27 @@ def remove_task(board_id: int, data: schemas.TaskToBoard,
 
 
 @router.get("/boards/{board_id}/tasks", response_model=list[schemas.TaskOut])
-def get_tasks_from_board(board_id: int, db: Session = Depends(database.get_db)):
-    board = db.query(models.Board).filter(models.Board.id == board_id).first()
-    if not board:
-        raise HTTPException(status_code=404, detail="Board not found")
-    return board.tasks
+def get_tasks_from_board(board_id: int, request: Request, db: Session = Depends(database.get_db)):
+    key = board_cache.tasks_key(board_id)
+    cached = board_cache.get(key)
+    if cached is None:
+        seen_generation = board_cache.generation(key)
+        rows = crud.get_board_task_rows(db, board_id)
+        if rows is None:
+            raise HTTPException(status_code=404, detail="Board not found")
+        etag = http_cache.rows_etag("board-tasks", board_id, rows=rows)
+        body = serialization.rows_response(rows, schemas.TaskOut).body
+        cached = board_cache.CachedResponse(http_cache.cache_headers(etag), body)
+        board_cache.put(key, cached, seen_generation)
+    if http_cache.headers_fresh(request, cached.headers):
+        return http_cache.not_modified(cached.headers)
+    return cached.response()
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    """Размер и доля попаданий кэшей"""
+    return {"boards": board_cache.stats(), "tokens": auth.token_cache.stats()}
 
 
 @router.post("/users/{user_id}/avatar", response_model=schemas.UserOut)
@@ -320,29 +497,18 @@ async def upload_avatar(
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Can only update your own avatar")
 
-    if not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail="Only image files are allowed")
-
-    file_ext = os.path.splitext(file.filename)[1]
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    filename = f"user_{user_id}_{timestamp}{file_ext}"
-
-    # Абсолютный путь для сохранения файла
-    file_path = os.path.join(AVATAR_DIR, filename)
-
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Размер и тип проверяются до декодирования; Pillow работает в пуле процессов
+    image_data, _ = await validate_image(file)
+    avatar_url = await avatars.save_avatar(avatar_store, image_data)
+    database.on_rollback(db, lambda: avatars.release_avatar(avatar_store, avatar_url))
 
-    # URL для доступа к аватару (предполагаем, что static/ — статическая папка, монтируется в FastAPI)
-    avatar_url = f"/{AVATAR_DIR}/{filename}"
-
-    db_user = crud.update_user_avatar(db, user_id, avatar_url)
+    db_user, old_avatar_url = await run_in_threadpool(crud.update_user_avatar, db, user_id, avatar_url)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    # Удаляем старый аватар, если он есть
-    if current_user.avatar_url:
-        old_file_path = os.path.join(os.getcwd(), current_user.avatar_url.lstrip('/'))
-        if os.path.exists(old_file_path):
-            os.remove(old_file_path)
+    # Прежний avatar_url — из строки, изменённой в этой транзакции, а не из кэша токенов;
+    # ссылка на него снимается только после коммита
+    database.on_commit(db, lambda: avatars.release_avatar(avatar_store, old_avatar_url))
 
     return db_user
 
@@ -356,27 +522,43 @@ async def delete_avatar(
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Can only delete your own avatar")
 
-    if not current_user.avatar_url:
+    # Обновляем запись в БД, ссылка на файлы снимается после коммита
+    db_user, old_avatar_url = await run_in_threadpool(crud.update_user_avatar, db, user_id, None)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not old_avatar_url:
         raise HTTPException(status_code=400, detail="No avatar to delete")
+    database.on_commit(db, lambda: avatars.release_avatar(avatar_store, old_avatar_url))
+    return db_user
 
-    # Удаляем файл
-    file_path = os.path.join(os.getcwd(), current_user.avatar_url.lstrip('/'))
-    if os.path.exists(file_path):
-        os.remove(file_path)
 
-    # Обновляем запись в БД
-    db_user = crud.update_user_avatar(db, user_id, None)
-    return db_user
+@router.get("/users/export")
+def export_users(export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|json)$")):
+    return export.export_response(crud.users_query(), schemas.UserOut, export_format, "users")
 
 
 @router.get("/users/{user_id}", response_model=schemas.UserOut)
-def get_user_by_id(user_id: int, db: Session = Depends(database.get_db)):
-    user = crud.get_user(db, user_id)
+async def get_user_by_id(user_id: int, request: Request, response: Response,
+                         db: AsyncSession = Depends(database.get_async_db)):
+    user = await async_crud.get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    etag, modified = http_cache.row_validators("user", user)
+    headers = http_cache.cache_headers(etag, modified)
+    if http_cache.is_fresh(request, etag, modified):
+        return http_cache.not_modified(headers)
+    response.headers.update(headers)
     return user
 
 
+@router.get("/users/{user_id}/stats", response_model=schemas.UserStats)
+def get_user_stats(user_id: int, db: Session = Depends(database.get_db)):
+    stats = crud.get_user_stats(db, user_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return stats
+
+
 @router.patch("/users/{user_id}", response_model=schemas.UserOut)
 def update_user(
     user_id: int,
@@ -410,48 +592,59 @@ def delete_user(
 
 @router.get("/users", response_model=list[schemas.UserOut])
 def get_all_users(db: Session = Depends(database.get_db)):
-    users = crud.get_all_users(db)
-    return users
+    return serialization.rows_response(crud.get_user_rows(db), schemas.UserOut)
 
 
-@router.post("/tasks/{task_id}/upload_pdf")
+def release_pdf(db: Session, pdf_path: Optional[str]):
+    key = storage.key_of(pdf_path)
+    if key:
+        database.on_commit(db, lambda: pdf_store.release(key))
+    elif pdf_path:
+        # Файл, сохранённый до хранилища (task_<id>.pdf)
+        database.on_commit(db, lambda: storage.remove_quietly(pdf_path))
+
+
+@router.post("/tasks/{task_id}/upload_pdf", openapi_extra=uploads.file_request_body("file"))
 async def upload_pdf(
     task_id: int,
-    file: UploadFile = File(...),
+    request: Request,
     db: Session = Depends(database.get_db)
 ):
-    # Проверяем Content-Type
-    if file.content_type != "application/pdf":
-        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-
-    task = crud.get_task(db, task_id)
+    task = await run_in_threadpool(crud.get_task, db, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    content = await file.read()
+    # Тело читается потоком во временный файл; больше MAX_FILE_SIZE — 413 сразу
+    upload = await uploads.receive_file(request, pdf_store.tmp_dir, MAX_FILE_SIZE, field="file",
+                                        content_type="application/pdf")
 
-    # Проверка пустоты файла
-    if len(content) == 0:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                            detail="Файл не может быть пустым")
+    # Файл переносится в хранилище по sha256; такой же файл уже мог быть сохранён
+    key = await run_in_threadpool(pdf_store.put_file, upload.tmp_path, ".pdf", upload.sha256)
+    database.on_rollback(db, lambda: pdf_store.release(key))
+    file_location = pdf_store.path(key, ".pdf")
 
-    # Проверка размера
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                            detail="Размер файла превышает 5 МБ")
+    # Обновляем путь к файлу в задаче; прежний путь — из той же транзакции, он освобождается после коммита
+    task, old_pdf_path = await run_in_threadpool(crud.update_task_pdf, db, task_id, file_location)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    release_pdf(db, old_pdf_path)
 
-    # Формируем путь для сохранения
-    file_location = os.path.join(PDF_DIR, f"task_{task_id}.pdf")
+    return {"message": "PDF uploaded successfully", "file_path": file_location, "url": pdf_url(file_location)}
 
-    # Сохраняем файл
-    with open(file_location, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
 
-    # Обновляем путь к файлу в задаче
-    crud.update_task_pdf(db, task_id, file_location)
+def pdf_url(pdf_path: str) -> str:
+    return PDF_URL_PREFIX + os.path.relpath(pdf_path, pdf_store.root).replace(os.sep, "/")
 
-    return {"message": "PDF uploaded successfully", "file_path": file_location}
+
+@router.get("/tasks/{task_id}/pdf")
+def get_pdf(task_id: int, db: Session = Depends(database.get_db)):
+    """Перенаправляет на неизменяемый URL файла: его кэшируют клиенты и прокси, Range отдаёт /static"""
+    task = crud.get_task(db, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not task.pdf_path:
+        raise HTTPException(status_code=404, detail="PDF file not found")
+    return RedirectResponse(pdf_url(task.pdf_path), status_code=307, headers={"Cache-Control": "no-cache"})
 
 
 @router.delete("/tasks/{task_id}/delete_pdf")
@@ -460,14 +653,11 @@ def delete_pdf(task_id: int, db: Session = Depends(database.get_db)):
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    if not task.pdf_path or not os.path.isfile(task.pdf_path):
+    # Убираем путь из базы, ссылка на файл снимается после коммита
+    _, old_pdf_path = crud.remove_task_pdf(db, task_id)
+    if not old_pdf_path:
         raise HTTPException(status_code=404, detail="PDF file not found")
-
-    # Удаляем файл из файловой системы
-    os.remove(task.pdf_path)
-
-    # Убираем путь из базы
-    crud.remove_task_pdf(db, task_id)
+    release_pdf(db, old_pdf_path)
 
     return JSONResponse(content={"message": "PDF deleted successfully"})
 
@@ -477,22 +667,11 @@ def close_task(task_id: int,
                user_id: int,
                db: Session = Depends(database.get_db)
                ) -> schemas.TaskOut:  # Изменили тип возвращаемого значения
-    # Получаем задачу
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if not task:
+    if not crud.get_task(db, task_id):
         raise HTTPException(status_code=404, detail="Task not found")
-
-    # Получаем пользователя
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
+    if not crud.get_user(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
 
-    task.status = "Done"
-    task.updated_at = datetime.now()
-
-    user.closed_tasks_count += 1
-
-    db.commit()
-    db.refresh(task)
-
+    # Статус, счётчики и кэш доски меняются в crud в одной транзакции
+    task = crud.close_task(db, task_id, user_id)
     return schemas.TaskOut.model_validate(task)
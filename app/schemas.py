@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 
 
@@ -24,6 +24,20 @@ class UserOut(BaseModel):
         from_attributes = True
 
 
+class TaskCounters(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+
+
+class UserStats(BaseModel):
+    """Статистика из счётчиков user_task_counters (app/counters.py)"""
+    user_id: int
+    closed_tasks_count: int
+    created: TaskCounters
+    assigned: TaskCounters
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -57,7 +71,7 @@ class TaskOut(BaseModel):
     responsible_id: Optional[int] = None
 
     class Config:
-        fro = True
+        from_attributes = True
 
 
 class AssignResponsibleRequest(BaseModel):
@@ -82,3 +96,14 @@ class BoardUserModify(BaseModel):
 
 class TaskToBoard(BaseModel):
     task_id: int
+
+
+class TaskBulkUpdate(TaskUpdate):
+    id: int
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: str  # created | updated | error
+    error: Optional[str] = None
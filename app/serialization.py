@@ -0,0 +1,47 @@
+"""Быстрый путь сериализации списков: SELECT только колонок схемы -> dict -> orjson.
+
+Обходит from_attributes-валидацию Pydantic и jsonable_encoder: колонки из базы
+уже имеют типы схемы, а ORJSONResponse кодирует dict и datetime сам. Поля,
+которые хранятся не в том типе, что объявлен в схеме, приводятся через CONVERTERS.
+"""
+from datetime import datetime
+from typing import Optional
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+
+from . import schemas
+
+
+def string_datetime(value: Optional[str]):
+    # tasks.updated_at — строка вида str(datetime), в ответе нужен ISO, как у Pydantic
+    return datetime.fromisoformat(value) if value else None
+
+
+CONVERTERS = {
+    schemas.TaskOut: {"updated_at": string_datetime},
+}
+
+
+def rows_query(query: Select, schema: type[BaseModel], *extra_columns) -> Select:
+    """Тот же select (фильтры, сортировка, limit), но только с колонками схемы.
+
+    extra_columns (например, version для ETag) идут после колонок схемы и в
+    ответ не попадают.
+    """
+    model = query.column_descriptions[0]["entity"]
+    return query.with_only_columns(*(getattr(model, name) for name in schema.model_fields), *extra_columns)
+
+
+def to_dicts(rows, schema: type[BaseModel]) -> list[dict]:
+    fields = list(schema.model_fields)
+    items = [dict(zip(fields, row)) for row in rows]
+    for field, convert in CONVERTERS.get(schema, {}).items():
+        for item in items:
+            item[field] = convert(item[field])
+    return items
+
+
+def rows_response(rows, schema: type[BaseModel], headers: Optional[dict] = None) -> ORJSONResponse:
+    return ORJSONResponse(to_dicts(rows, schema), headers=headers)
@@ -0,0 +1,224 @@
+"""Хранилище файлов с адресацией по содержимому и счётчиком ссылок.
+
+Ключ blob — sha256 содержимого, файлы лежат в <root>/ab/cd/<ключ><суффикс>:
+два уровня каталогов по 256 имён держат каталоги маленькими при любом числе
+файлов. У одного blob может быть несколько файлов с разными суффиксами
+(варианты аватара), одинаковое содержимое хранится один раз.
+
+put/acquire добавляют ссылку, release снимает. Файлы без ссылок удаляет gc, не
+release: повторная загрузка того же файла вскоре после удаления не пишет его
+заново, а удаление не стоит на пути запроса.
+
+Счётчики хранятся в отдельной базе SQLite. Перенос файлов на место и удаление в
+gc идут под её блокировкой записи (BEGIN IMMEDIATE), поэтому gc не удалит файл,
+на который параллельно появилась ссылка, в том числе из другого процесса.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+HASH_CHUNK_SIZE = 1024 * 1024
+KEY_LENGTH = 64
+# Каталог временных файлов внутри root
+TMP_DIR = "tmp"
+# Временные файлы старше этого возраста — остатки упавших загрузок, их удаляет gc
+TMP_MAX_AGE = 24 * 3600
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_key(value: str) -> bool:
+    return len(value) == KEY_LENGTH and all(char in "0123456789abcdef" for char in value)
+
+
+def key_of(path: Optional[str]) -> Optional[str]:
+    """Ключ blob по пути или URL его файла; None для файлов не из хранилища"""
+    if not path:
+        return None
+    key = path.replace("\\", "/").rsplit("/", 1)[-1][:KEY_LENGTH]
+    return key if is_key(key) else None
+
+
+def remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class BlobStore:
+    def __init__(self, root: str, index_path: str):
+        self.root = root
+        self.index_path = index_path
+        self.tmp_dir = os.path.join(root, TMP_DIR)
+        self._local = threading.local()
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " key TEXT PRIMARY KEY,"
+                " suffixes TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " refcount INTEGER NOT NULL,"
+                " released_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS blobs_unreferenced ON blobs (released_at) WHERE refcount = 0")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Соединение на поток: открытие и PRAGMA стоят дороже самой операции
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def relative_path(self, key: str, suffix: str = "") -> str:
+        """Путь внутри root через "/" (для URL)"""
+        return f"{key[:2]}/{key[2:4]}/{key}{suffix}"
+
+    def path(self, key: str, suffix: str = "") -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key + suffix)
+
+    def acquire(self, key: str) -> bool:
+        """Добавляет ссылку на уже сохранённый blob; False, если его нет"""
+        with self._transaction() as conn:
+            cursor = conn.execute("UPDATE blobs SET refcount = refcount + 1, released_at = NULL WHERE key = ?",
+                                  (key,))
+            return cursor.rowcount == 1
+
+    def put(self, key: str, files: Dict[str, bytes]):
+        """Сохраняет файлы blob (суффикс -> содержимое) и добавляет ссылку.
+
+        key — hash_bytes исходного содержимого; файлы могут быть производными от
+        него (варианты размеров).
+        """
+        tmp_files = {}
+        try:
+            for suffix, data in files.items():
+                fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix=".tmp")
+                tmp_files[suffix] = tmp_path
+                with os.fdopen(fd, "wb") as out:
+                    out.write(data)
+            self._link(key, tmp_files, sum(len(data) for data in files.values()))
+        finally:
+            for tmp_path in tmp_files.values():
+                remove_quietly(tmp_path)
+
+    def put_file(self, tmp_path: str, suffix: str = "", key: Optional[str] = None) -> str:
+        """Переносит готовый файл из tmp_dir в хранилище, добавляет ссылку и возвращает ключ.
+
+        key можно передать, если хэш уже посчитан при приёме файла.
+        """
+        try:
+            key = key or hash_file(tmp_path)
+            self._link(key, {suffix: tmp_path}, os.path.getsize(tmp_path))
+        finally:
+            remove_quietly(tmp_path)
+        return key
+
+    def _link(self, key: str, tmp_files: Dict[str, str], size: int):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT suffixes FROM blobs WHERE key = ?", (key,)).fetchone()
+            stored = set(row[0].split(",")) if row else set()
+            # Содержимое с тем же ключом уже на месте — новые копии просто удаляются
+            for suffix, tmp_path in tmp_files.items():
+                if suffix not in stored:
+                    target = self.path(key, suffix)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(tmp_path, target)
+            suffixes = ",".join(sorted(stored | set(tmp_files)))
+            if row:
+                conn.execute("UPDATE blobs SET suffixes = ?, refcount = refcount + 1, released_at = NULL WHERE key = ?",
+                             (suffixes, key))
+            else:
+                conn.execute("INSERT INTO blobs (key, suffixes, size, refcount) VALUES (?, ?, ?, 1)",
+                             (key, suffixes, size))
+
+    def release(self, key: str):
+        """Снимает ссылку; файлы без ссылок удалит gc"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE blobs SET refcount = refcount - 1,"
+                " released_at = CASE WHEN refcount = 1 THEN ? ELSE released_at END"
+                " WHERE key = ? AND refcount > 0",
+                (time.time(), key),
+            )
+
+    def refcount(self, key: str) -> int:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT refcount FROM blobs WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def gc(self, min_age: float = 0) -> int:
+        """Удаляет blob без ссылок старше min_age секунд, возвращает их число"""
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT key, suffixes FROM blobs WHERE refcount = 0 AND released_at <= ?",
+                                (now - min_age,)).fetchall()
+            for key, suffixes in rows:
+                for suffix in suffixes.split(","):
+                    remove_quietly(self.path(key, suffix))
+            conn.executemany("DELETE FROM blobs WHERE key = ?", [(key,) for key, _ in rows])
+        for entry in os.scandir(self.tmp_dir):
+            if entry.stat().st_mtime < now - TMP_MAX_AGE:
+                remove_quietly(entry.path)
+        return len(rows)
+
+    def stats(self) -> dict:
+        with self._transaction() as conn:
+            blobs, references, size, unreferenced = conn.execute(
+                "SELECT count(*), coalesce(sum(refcount), 0), coalesce(sum(size), 0),"
+                " coalesce(sum(refcount = 0), 0) FROM blobs"
+            ).fetchone()
+        return {"blobs": blobs, "references": references, "bytes": size, "unreferenced": unreferenced}
+
+
+async def gc_loop(stores: Iterable[BlobStore], interval: float, min_age: float):
+    """Периодический gc для lifespan приложения"""
+    from starlette.concurrency import run_in_threadpool
+
+    while True:
+        await asyncio.sleep(interval)
+        for store in stores:
+            await run_in_threadpool(store.gc, min_age)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Удалить файлы хранилища без ссылок")
+    parser.add_argument("root")
+    parser.add_argument("index")
+    parser.add_argument("--min-age", type=float, default=0, help="секунд с момента снятия последней ссылки")
+    args = parser.parse_args()
+    print(f"removed {BlobStore(args.root, args.index).gc(args.min_age)} blobs")
@@ -0,0 +1,214 @@
+"""Потоковый приём файла из multipart/form-data.
+
+Тело запроса разбирается по мере поступления, данные файла сразу пишутся во
+временный файл в каталоге назначения (запись — в threadpool, не в event loop).
+Размер проверяется на каждом куске: при превышении — 413 без дочитывания тела.
+По ходу записи считается sha256 (ключ для storage.BlobStore), готовый файл
+переносится на место атомарным os.replace, поэтому читатели не видят
+недописанный файл. Память на загрузку не зависит от размера файла.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from starlette import status
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import python_multipart as multipart
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import parse_options_header
+
+# Запас на заголовки частей и boundary при проверке Content-Length
+MULTIPART_OVERHEAD = 64 * 1024
+# Сколько данных копить перед записью в файл: меньше переходов в threadpool
+WRITE_BUFFER_SIZE = 256 * 1024
+
+
+def file_request_body(field: str = "file") -> dict:
+    """openapi_extra для маршрута, который читает request.stream() сам, без File(...)"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"multipart/form-data": {"schema": {
+                "type": "object",
+                "properties": {field: {"type": "string", "format": "binary"}},
+                "required": [field],
+            }}},
+        }
+    }
+
+
+class MalformedUpload(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed multipart body")
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, max_size: int):
+        super().__init__(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                         detail=f"File is larger than {max_size} bytes")
+
+
+@dataclass
+class StreamedUpload:
+    """Файл, принятый во временный путь tmp_path"""
+    tmp_path: str
+    filename: Optional[str]
+    content_type: Optional[str]
+    size: int
+    sha256: str
+
+    async def save_as(self, path: str):
+        await run_in_threadpool(os.replace, self.tmp_path, path)
+
+    async def discard(self):
+        await run_in_threadpool(remove_quietly, self.tmp_path)
+
+
+def remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _FilePart:
+    """Состояние разбора: callbacks парсера синхронные, поэтому только копят данные"""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.header_field = b""
+        self.header_value = b""
+        self.headers: dict[bytes, bytes] = {}
+        self.in_file = False
+        self.found = False
+        # Закрывающий boundary дошёл: тело не обрезано
+        self.ended = False
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.pending: list[bytes] = []
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_end": self.on_end,
+        }
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.header_field.lower()] = self.header_value
+        self.header_field = b""
+        self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("latin-1")
+        # Берём только первую часть с нужным именем
+        self.in_file = name == self.field and not self.found
+        if self.in_file:
+            self.found = True
+            filename = options.get(b"filename")
+            self.filename = filename.decode("utf-8", "replace") if filename is not None else None
+            content_type = self.headers.get(b"content-type")
+            self.content_type = content_type.decode("latin-1") if content_type is not None else None
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.in_file:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self):
+        self.in_file = False
+
+    def on_end(self):
+        self.ended = True
+
+    def take_pending(self) -> bytes:
+        data = b"".join(self.pending)
+        self.pending.clear()
+        return data
+
+
+async def receive_file(request: Request, directory: str, max_size: int, field: str = "file",
+                       content_type: Optional[str] = None) -> StreamedUpload:
+    """Принимает поле field из multipart-тела во временный файл в directory.
+
+    content_type — ожидаемый Content-Type части (400, если не совпал).
+    Битое или обрезанное тело — 400, временный файл удаляется.
+    Пустой или отсутствующий файл — 400/422, больше max_size — 413.
+    """
+    mime_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if mime_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected multipart/form-data")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size + MULTIPART_OVERHEAD:
+        raise UploadTooLarge(max_size)
+
+    part = _FilePart(field)
+    parser = multipart.MultipartParser(boundary, part.callbacks())
+    fd, tmp_path = await run_in_threadpool(tempfile.mkstemp, dir=directory, suffix=".part")
+    out = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    size = 0
+    buffer = bytearray()
+
+    def write(data: bytes):
+        digest.update(data)
+        out.write(data)
+
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except MultipartParseError:
+                raise MalformedUpload()
+            if part.found and content_type is not None and part.content_type != content_type:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail=f"Only {content_type} files are allowed")
+            buffer += part.take_pending()
+            if size + len(buffer) > max_size:
+                raise UploadTooLarge(max_size)
+            if len(buffer) >= WRITE_BUFFER_SIZE:
+                size += len(buffer)
+                await run_in_threadpool(write, bytes(buffer))
+                buffer.clear()
+        parser.finalize()
+        # finalize не проверяет, что тело дочитано до закрывающего boundary
+        if not part.ended:
+            raise MalformedUpload()
+        size += len(buffer)
+        await run_in_threadpool(write, bytes(buffer))
+        await run_in_threadpool(out.close)
+        if not part.found:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Field '{field}' is required")
+        if size == 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Файл не может быть пустым")
+    except BaseException:
+        # Синхронно: await здесь может не выполниться при отмене задачи
+        out.close()
+        remove_quietly(tmp_path)
+        raise
+    return StreamedUpload(tmp_path, part.filename, part.content_type, size, digest.hexdigest())
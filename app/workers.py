@@ -0,0 +1,66 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+from starlette import status
+
+
+class PoolSaturated(HTTPException):
+    """Очередь пула заполнена — запрос отклоняется сразу, а не ждёт"""
+
+    def __init__(self, pool_name: str):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Server is busy ({pool_name}), try again later",
+            headers={"Retry-After": "1"},
+        )
+
+
+class BoundedProcessPool:
+    """Пул процессов для CPU-тяжёлой работы с ограничением глубины очереди.
+
+    Процессы создаются лениво при первом вызове. Если задач в работе и в
+    очереди уже ``max_pending``, новый вызов падает с PoolSaturated (503).
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise PoolSaturated(self.name)
+            self.pending += 1
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _release(self):
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, fn: Callable, *args):
+        executor = self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, partial(fn, *args))
+        finally:
+            self._release()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
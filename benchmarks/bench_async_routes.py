@@ -0,0 +1,118 @@
+"""p99 латентность чтения задач при высокой конкурентности: sync Session против AsyncSession.
+
+Поднимает uvicorn с двумя одинаковыми маршрутами на временной SQLite-базе:
+
+    python -m benchmarks.bench_async_routes --concurrency 200 --requests 4000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+# Короткий таймаут пула: синхронный путь при исчерпании пула отвечает 500, а не висит 30 с
+os.environ.setdefault("DB_POOL_TIMEOUT", "2")
+
+import httpx
+import uvicorn
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import async_crud, crud, database, models, schemas
+
+
+def build_app(url: str) -> FastAPI:
+    engine = database.create_db_engine(url)
+    database.Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    async_session_factory = async_sessionmaker(database.create_async_db_engine(url), expire_on_commit=False)
+
+    with session_factory() as db:
+        user = models.User(username="bench", hashed_password="x")
+        db.add(user)
+        db.commit()
+        db.add_all(models.Task(title=f"t{i}", description="d", priority="Low", status="Open",
+                               creator_id=user.id) for i in range(2000))
+        db.commit()
+
+    def get_db():
+        with session_factory() as db:
+            yield db
+
+    async def get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync/tasks", response_model=list[schemas.TaskOut])
+    def sync_tasks(db: Session = Depends(get_db)):
+        return crud.get_tasks_page(db, limit=20)[0]
+
+    @app.get("/async/tasks", response_model=list[schemas.TaskOut])
+    async def async_tasks(db=Depends(get_async_db)):
+        return (await async_crud.get_tasks_page(db, limit=20))[0]
+
+    return app
+
+
+async def load(base_url: str, path: str, concurrency: int, total: int) -> tuple[list[float], int]:
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                ok = response.status_code == 200
+            except httpx.TransportError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        server = uvicorn.Server(uvicorn.Config(app, port=args.port, log_level="critical",
+                                                timeout_keep_alive=120, backlog=4096))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+
+        base_url = f"http://127.0.0.1:{args.port}"
+        for path in ("/sync/tasks", "/async/tasks"):
+            asyncio.run(load(base_url, path, 10, 100))  # прогрев
+            latencies, errors = asyncio.run(load(base_url, path, args.concurrency, args.requests))
+            latencies.sort()
+            p99 = latencies[int(len(latencies) * 0.99) - 1]
+            print(f"{path:14} p50={statistics.median(latencies) * 1000:7.1f} ms "
+                  f"p99={p99 * 1000:7.1f} ms errors={errors}")
+
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
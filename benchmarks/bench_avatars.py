@@ -0,0 +1,61 @@
+"""Аватаров в секунду: один процесс против пула процессов (все варианты 64/128/400, JPEG + WebP).
+
+    python -m benchmarks.bench_avatars --count 64 --workers 4 --width 2000
+"""
+import argparse
+import asyncio
+import io
+import os
+import time
+
+from PIL import Image
+
+from app.workers import BoundedProcessPool
+from helpers.avatar_validation import process_image, process_image_variants
+
+
+def photo(width: int, image_format: str) -> bytes:
+    # Шум сжимается плохо — ближе к фотографии, чем однотонная заливка
+    height = width * 3 // 4
+    image = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    output = io.BytesIO()
+    image.save(output, image_format, quality=90)
+    return output.getvalue()
+
+
+def sequential(fn, data, count, *args):
+    started = time.perf_counter()
+    for _ in range(count):
+        fn(data, *args)
+    return count / (time.perf_counter() - started)
+
+
+async def pooled(pool, data, count):
+    await pool.run(process_image_variants, data)  # прогрев: запуск процессов
+    started = time.perf_counter()
+    await asyncio.gather(*(pool.run(process_image_variants, data) for _ in range(count)))
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--width", type=int, default=2000)
+    args = parser.parse_args()
+
+    for image_format in ("JPEG", "PNG"):
+        data = photo(args.width, image_format)
+        print(f"{image_format} {args.width}px, {len(data) / 2**20:.1f} MiB")
+        print(f"  process_image (400 JPEG), 1 process   {sequential(process_image, data, args.count, ''):7.1f} avatars/sec")
+        print(f"  all variants, 1 process               {sequential(process_image_variants, data, args.count):7.1f} avatars/sec")
+        pool = BoundedProcessPool("bench", max_workers=args.workers, max_pending=args.count + 1)
+        try:
+            rate = asyncio.run(pooled(pool, data, args.count))
+        finally:
+            pool.shutdown()
+        print(f"  all variants, pool of {args.workers:<2}              {rate:7.1f} avatars/sec")
+
+
+if __name__ == "__main__":
+    main()
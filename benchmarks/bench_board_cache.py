@@ -0,0 +1,63 @@
+"""Чтения доски с кэшем и без: GET /boards/{id} и GET /boards/{id}/tasks.
+
+    python -m benchmarks.bench_board_cache --tasks 200 --requests 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.pool import NullPool
+
+from app import board_cache, cache, database, models
+from app.main import app
+
+
+def run(client, urls, requests):
+    started = time.perf_counter()
+    for i in range(requests):
+        assert client.get(urls[i % len(urls)]).status_code == 200
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=200, help="задач на доске")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = database.create_db_engine(url)
+        database.Base.metadata.create_all(engine)
+        database.SessionLocal.configure(bind=engine)
+        database.AsyncSessionLocal.configure(bind=database.create_async_db_engine(url, poolclass=NullPool))
+        with engine.begin() as conn:
+            conn.execute(insert(models.User), [{"id": 1, "username": "bench", "hashed_password": "x"}])
+            conn.execute(insert(models.Board), [{"id": 1, "title": "bench"}])
+            conn.execute(insert(models.Task), [
+                {"title": f"task {i}", "description": "d", "priority": "Low", "status": "Open",
+                 "creator_id": 1, "board_id": 1}
+                for i in range(args.tasks)
+            ])
+
+        urls = ["/boards/1", "/boards/1/tasks"]
+        with TestClient(app) as client:
+            local = board_cache.backend
+            board_cache.backend = cache.NullBackend()
+            uncached = run(client, urls, args.requests)
+            board_cache.backend = local
+            cached = run(client, urls, args.requests)
+
+        print(f"без кэша   {uncached:8.0f} req/sec")
+        print(f"с кэшем    {cached:8.0f} req/sec  x{cached / uncached:.1f}")
+        print(f"статистика {board_cache.stats()}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Лента изменений: память на простаивающего SSE-подписчика и время раздачи события.
+
+Подписчики — настоящие запросы GET /tasks/events к ASGI-приложению без сети:
+замеряется стоимость приложения, а не сокетов сервера.
+
+    python -m benchmarks.bench_events --subscribers 10000 --boards 1000 --events 20
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from app import events
+from app.main import app
+
+
+def request_scope(query: str) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/tasks/events", "raw_path": b"/tasks/events",
+        "query_string": query.encode(), "root_path": "", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+
+class Client:
+    """Клиент, который только считает полученные события"""
+
+    def __init__(self):
+        self.events = 0
+        self.done = asyncio.Event()
+        self.expected = 0
+        self.disconnected = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        body = message.get("body", b"")
+        self.events += body.count(b"\nevent: ")
+        if self.expected and self.events >= self.expected:
+            self.done.set()
+
+
+async def fan_out(clients, board_ids, count):
+    for client in clients:
+        client.expected = client.events + count
+        client.done.clear()
+    started = time.perf_counter()
+    for i in range(count):
+        events.broker.publish(board_ids, {"type": "task.updated", "task_id": i, "task": {"title": "x" * 100}})
+    await asyncio.gather(*(client.done.wait() for client in clients))
+    return time.perf_counter() - started
+
+
+async def main(args):
+    events.broker.start()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    clients, tasks = [], []
+    for i in range(args.subscribers):
+        client = Client()
+        query = f"board_id={i % args.boards}" if args.boards else ""
+        clients.append(client)
+        tasks.append(asyncio.ensure_future(app(request_scope(query), client.receive, client.send)))
+    await asyncio.sleep(0.5)
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{events.broker.stats()['subscribers']} idle subscribers: "
+          f"{memory / 2**20:.1f} MiB, {memory / args.subscribers / 1024:.1f} KiB each")
+
+    one_board = [client for i, client in enumerate(clients) if not args.boards or i % args.boards == 0]
+    elapsed = await fan_out(one_board, frozenset({0}), args.events)
+    print(f"board event -> {len(one_board):5} subscribers: {elapsed / args.events * 1000:8.2f} ms/event")
+
+    all_boards = frozenset(range(args.boards)) if args.boards else frozenset()
+    elapsed = await fan_out(clients, all_boards, args.events)
+    print(f"event -> {len(clients):5} subscribers:       {elapsed / args.events * 1000:8.2f} ms/event "
+          f"({len(clients) * args.events / elapsed:.0f} deliveries/sec)")
+
+    for client in clients:
+        client.disconnected.set()
+    await asyncio.gather(*tasks)
+    events.broker.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--boards", type=int, default=1000, help="0 — все подписаны на все задачи")
+    parser.add_argument("--events", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
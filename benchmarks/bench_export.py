@@ -0,0 +1,78 @@
+"""Пиковая память на выгрузку всех задач: список целиком против потокового экспорта.
+
+Меряется только серверная часть (без HTTP-клиента, который буферизует тело):
+"list" повторяет путь GET /tasks_by_user_id — ORM-список, список схем и одно
+JSON-тело; "export" прокручивает генератор app.export.export_rows.
+
+    python -m benchmarks.bench_export --tasks 100000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.pool import NullPool
+
+from app import config, crud, database, export, models, schemas
+
+
+def measure(name, run):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:14} peak={peak / 2**20:8.1f} MiB  body={size / 2**20:7.1f} MiB  {elapsed:6.2f}s")
+
+
+def full_list(user):
+    with database.SessionLocal() as db:
+        tasks = crud.get_tasks(db, user)
+        adapter = TypeAdapter(list[schemas.TaskOut])
+        body = adapter.dump_json(adapter.validate_python(tasks, from_attributes=True))
+    return len(body)
+
+
+def streamed(fmt):
+    async def consume():
+        size = 0
+        async for chunk in export.export_rows(crud.tasks_query(), schemas.TaskOut, fmt, config.EXPORT_CHUNK_SIZE):
+            size += len(chunk)
+        return size
+    return asyncio.run(consume())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = database.create_db_engine(url)
+        database.Base.metadata.create_all(engine)
+        database.SessionLocal.configure(bind=engine)
+        database.AsyncSessionLocal.configure(bind=database.create_async_db_engine(url, poolclass=NullPool))
+
+        user = models.User(id=1, username="bench", hashed_password="x")
+        with engine.begin() as conn:
+            conn.execute(insert(models.User), [{"id": 1, "username": "bench", "hashed_password": "x"}])
+            conn.execute(insert(models.Task), [
+                {"title": f"task {i}", "description": "exported " * 10, "priority": "Low",
+                 "status": "Open", "creator_id": 1}
+                for i in range(args.tasks)
+            ])
+
+        measure("list", lambda: full_list(user))
+        measure("export ndjson", lambda: streamed("ndjson"))
+        measure("export json", lambda: streamed("json"))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
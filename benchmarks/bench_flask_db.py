@@ -0,0 +1,67 @@
+"""Запросов в секунду к Flask-серверу (helpers/server.py): соединение на запрос против пула.
+
+    python -m benchmarks.bench_flask_db --threads 8 --requests 4000
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from helpers import db
+
+
+def run(app, token, path, method, body, threads, requests):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def worker(count):
+        client = app.test_client()
+        for _ in range(count):
+            response = client.open(path, method=method, json=body, headers=headers)
+            assert response.status_code < 400, response.get_data(as_text=True)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(worker, [requests // threads] * threads))
+    return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=4000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # users.db и user_photos сервер создаёт относительно рабочего каталога
+        os.chdir(tmp)
+        from helpers import server
+
+        server.init_db()
+        client = server.app.test_client()
+        client.post('/api/auth/register', json={'username': 'bench', 'password': 'secret'})
+        credentials = {'username': 'bench', 'password': 'secret'}
+        token = client.post('/api/auth/login', json=credentials).get_json()['access_token']
+
+        cases = [
+            ('GET /api/users/me', '/api/users/me', 'GET', None),
+            ('POST /api/auth/login', '/api/auth/login', 'POST', credentials),
+            ('POST /api/tasks', '/api/tasks', 'POST', {'title': 'bench', 'priority': 2}),
+        ]
+        pools = {
+            # Как до пула: новое соединение без PRAGMA на каждый запрос
+            'connect per request': db.ConnectionPool(db.DATABASE, size=0, pragmas={}, cached_statements=128),
+            'pool': db.ConnectionPool(db.DATABASE),
+        }
+        for name, path, method, body in cases:
+            for label, pool in pools.items():
+                db.pool = pool
+                rate = run(server.app, token, path, method, body, args.threads, args.requests)
+                print(f'{name:22} {label:20} {rate:8.0f} req/sec')
+        for pool in pools.values():
+            pool.close()
+        os.chdir('/')
+
+
+if __name__ == '__main__':
+    main()
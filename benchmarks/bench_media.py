@@ -0,0 +1,144 @@
+"""Пропускная способность раздачи файлов: StaticFiles (как было) против media.MediaFiles.
+
+Сервер (uvicorn) запускается отдельным процессом, оба варианта смонтированы на
+одном каталоге: /old — StaticFiles, /new — MediaFiles. Клиенты качают параллельно
+аватары (маленькие файлы), PDF целиком и PDF по Range-запросам, затем
+перепроверяют аватары по If-None-Match. Кэш клиента не моделируется: с immutable
+браузер и прокси повторно за файлом не приходят вовсе.
+
+    python -m benchmarks.bench_media --concurrency 32 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_pdf_upload import free_port
+
+
+def serve(port: int, directory: str):
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.staticfiles import StaticFiles
+
+    from app import media
+
+    app = Starlette(routes=[
+        Mount("/old", StaticFiles(directory=directory)),
+        Mount("/new", media.MediaFiles(directory=directory)),
+    ])
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def prepare(directory: str, avatars: int, pdfs: int, pdf_size: int) -> dict:
+    from app import storage
+
+    store = storage.BlobStore(os.path.join(directory, "files"), os.path.join(directory, "files.db"))
+    paths = {"avatar": [], "pdf": []}
+    for kind, count, size, suffix in (("avatar", avatars, 20_000, "_400.jpg"), ("pdf", pdfs, pdf_size, ".pdf")):
+        for _ in range(count):
+            data = os.urandom(size)
+            key = storage.hash_bytes(data)
+            store.put(key, {suffix: data})
+            paths[kind].append("files/" + store.relative_path(key, suffix))
+    return paths
+
+
+async def run(base_url: str, urls: list, concurrency: int, headers: dict) -> tuple:
+    queue = list(urls)
+    transferred = 0
+    statuses = set()
+
+    async def worker(client):
+        nonlocal transferred
+        while queue:
+            response = await client.get(queue.pop(), headers=headers)
+            statuses.add(response.status_code)
+            transferred += len(response.content)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return len(urls) / elapsed, transferred / elapsed / 2**20, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--pdf-mb", type=float, default=2)
+    parser.add_argument("--serve", nargs=2, metavar=("PORT", "DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(int(args.serve[0]), args.serve[1])
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = prepare(tmp, avatars=200, pdfs=20, pdf_size=int(args.pdf_mb * 2**20))
+        port = free_port()
+        server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_media", "--serve", str(port), tmp])
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(f"{base_url}/new/{paths['avatar'][0]}")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+
+            pdf_requests = max(args.requests // 10, args.concurrency)
+            scenarios = [
+                ("avatars", paths["avatar"], args.requests, {}),
+                ("pdf full", paths["pdf"], pdf_requests, {}),
+                ("pdf range 64 KiB", paths["pdf"], args.requests, {"Range": "bytes=1048576-1114111"}),
+            ]
+            print(f"{'scenario':<22}{'old req/s':>10}{'new req/s':>11}{'old MiB/s':>11}{'new MiB/s':>11}")
+            for name, files, count, headers in scenarios:
+                urls = [random.choice(files) for _ in range(count)]
+                old = asyncio.run(run(base_url, ["/old/" + url for url in urls], args.concurrency, headers))
+                new = asyncio.run(run(base_url, ["/new/" + url for url in urls], args.concurrency, headers))
+                print(f"{name:<22}{old[0]:10.0f}{new[0]:11.0f}{old[1]:11.1f}{new[1]:11.1f}  {old[2]} {new[2]}")
+
+            # Перепроверка: у StaticFiles ETag из mtime и размера, у MediaFiles — имя файла
+            urls = [random.choice(paths["avatar"]) for _ in range(args.requests)]
+            etags = {}
+            for prefix in ("/old/", "/new/"):
+                for url in set(urls):
+                    etags[prefix + url] = httpx.get(base_url + prefix + url).headers["etag"]
+            results = []
+            for prefix in ("/old/", "/new/"):
+                results.append(asyncio.run(run_conditional(base_url, [prefix + url for url in urls], etags,
+                                                           args.concurrency)))
+            print(f"{'avatars 304':<22}{results[0]:10.0f}{results[1]:11.0f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+async def run_conditional(base_url: str, urls: list, etags: dict, concurrency: int) -> float:
+    queue = list(urls)
+
+    async def worker(client):
+        while queue:
+            url = queue.pop()
+            response = await client.get(url, headers={"If-None-Match": etags[url]})
+            assert response.status_code == 304
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        return len(urls) / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
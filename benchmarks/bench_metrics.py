@@ -0,0 +1,137 @@
+"""Накладные расходы метрик: запросы к ASGI-приложению без сети, с MetricsMiddleware и без.
+
+Без сети и сервера — худший для метрик случай: в реальном запросе к его
+стоимости добавляются сокеты и разбор HTTP, а прибавка от метрик та же.
+
+    python -m benchmarks.bench_metrics --batch 100 --rounds 40
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+# Приложение без метрик; с ними — то же приложение, обёрнутое вручную
+os.environ["METRICS_ENABLED"] = "0"
+
+from sqlalchemy import text
+
+from app import database, metrics, models
+from app.main import app
+
+ROUTES = {
+    "async GET /tasks": "/tasks",
+    "async GET /users/{id}": "/users/1",
+    "sync GET /users/{id}/stats": "/users/1/stats",
+    "sync GET /cache/stats, no SQL": "/cache/stats",
+}
+
+
+def request_scope(path: str) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def run(asgi_app, path: str, count: int) -> float:
+    """Среднее время последовательного запроса, мкс"""
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    started = time.perf_counter()
+    for _ in range(count):
+        await asgi_app(request_scope(path), receive, send)
+    elapsed = time.perf_counter() - started
+    assert set(statuses) == {200}, set(statuses)
+    return elapsed / count * 1e6
+
+
+async def compare(path: str, batch: int, rounds: int) -> tuple[float, float]:
+    """Время без метрик и прибавка от них, мкс: медианы по раундам.
+
+    В раунде по пачке с метриками и без, порядок чередуется; прибавка считается
+    внутри раунда, так что медленный дрейф машины в неё не попадает.
+    """
+    instrumented = metrics.MetricsMiddleware(app)
+    plain, added = [], []
+    await run(app, path, batch)  # прогрев
+    for i in range(rounds):
+        timings = {}
+        for variant in ((False, True) if i % 2 else (True, False)):
+            if variant:
+                metrics.instrument_sqlalchemy()
+                timings[variant] = await run(instrumented, path, batch)
+                metrics.uninstrument_sqlalchemy()
+            else:
+                timings[variant] = await run(app, path, batch)
+        plain.append(timings[False])
+        added.append(timings[True] - timings[False])
+    return statistics.median(plain), statistics.median(added)
+
+
+def statement_overhead(engine, count: int = 20000) -> float:
+    """Прибавка слушателей SQLAlchemy на один SQL-запрос, мкс"""
+    added = []
+    with engine.connect() as conn:
+        statement = text("SELECT id FROM users WHERE id = :id")
+
+        def timed():
+            started = time.perf_counter()
+            for _ in range(count // 20):
+                conn.execute(statement, {"id": 1}).fetchall()
+            return (time.perf_counter() - started) / (count // 20) * 1e6
+
+        timed()
+        for i in range(20):
+            metrics.instrument_sqlalchemy()
+            with_listeners = timed()
+            metrics.uninstrument_sqlalchemy()
+            added.append(with_listeners - timed())
+    return statistics.median(added)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = database.create_db_engine(url)
+        database.Base.metadata.create_all(engine)
+        database.SessionLocal.configure(bind=engine)
+        async_engine = database.create_async_db_engine(url)
+        database.AsyncSessionLocal.configure(bind=async_engine)
+        with database.SessionLocal() as db:
+            user = models.User(username="bench", hashed_password="x")
+            db.add(user)
+            db.flush()
+            db.add_all(models.Task(title=f"t{i}", description="d", priority="Low", status="Open",
+                                   creator_id=user.id) for i in range(200))
+            db.commit()
+
+        async def scenario():
+            for name, path in ROUTES.items():
+                plain, added = await compare(path, args.batch, args.rounds)
+                print(f"{name:30} {plain:7.1f} us/request  metrics {added:+6.1f} us ({added / plain:+.1%})")
+            # Иначе потоки aiosqlite не дают процессу завершиться
+            await async_engine.dispose()
+
+        asyncio.run(scenario())
+        print(f"SQL listeners: {statement_overhead(engine):+.1f} us/statement")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
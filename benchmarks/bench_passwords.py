@@ -0,0 +1,47 @@
+"""Сколько логинов (bcrypt verify) в секунду выдерживает одно ядро.
+
+    python -m benchmarks.bench_passwords --rounds 12 --workers 4 --logins 200
+"""
+import argparse
+import asyncio
+import time
+
+from passlib.context import CryptContext
+
+from app import auth
+from app.workers import BoundedProcessPool
+
+
+async def run_logins(pool: BoundedProcessPool, hashed: str, logins: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(pool.run(auth.verify_password, "password", hashed) for _ in range(logins)))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--logins", type=int, default=100)
+    args = parser.parse_args()
+
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.rounds).hash("password")
+
+    started = time.perf_counter()
+    for _ in range(args.logins // args.workers):
+        auth.verify_password("password", hashed)
+    inline = (args.logins // args.workers) / (time.perf_counter() - started)
+    print(f"inline:  {inline:8.1f} logins/s on one core")
+
+    pool = BoundedProcessPool("bench", max_workers=args.workers, max_pending=args.logins)
+    # Прогрев: запуск процессов не должен попадать в замер
+    asyncio.run(run_logins(pool, hashed, args.workers))
+    elapsed = asyncio.run(run_logins(pool, hashed, args.logins))
+    pool.shutdown()
+    total = args.logins / elapsed
+    print(f"pool:    {total:8.1f} logins/s with {args.workers} workers, "
+          f"{total / args.workers:8.1f} logins/s per core")
+
+
+if __name__ == "__main__":
+    main()
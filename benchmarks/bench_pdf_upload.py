@@ -0,0 +1,120 @@
+"""Пиковый RSS сервера при загрузке PDF: допустимые файлы и тело много больше лимита.
+
+Сервер (uvicorn) запускается отдельным процессом, пик берётся из VmHWM в /proc.
+
+    python -m benchmarks.bench_pdf_upload --uploads 20 --size-mb 4 --oversize-mb 200
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BOUNDARY = "benchboundary"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(port: int, pdf_dir: str):
+    import uvicorn
+
+    from app import database, routes, storage
+    from app.main import app
+
+    database.Base.metadata.create_all(database.engine)
+    routes.pdf_store = storage.BlobStore(os.path.join(pdf_dir, "pdfs"), os.path.join(pdf_dir, "pdfs.db"))
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def multipart_body(size: int, chunk: int = 64 * 1024):
+    """Тело multipart генератором, чтобы клиент тоже не держал файл в памяти"""
+    yield (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"doc.pdf\"\r\n"
+           f"Content-Type: application/pdf\r\n\r\n").encode()
+    block = b"x" * chunk
+    for _ in range(size // chunk):
+        yield block
+    yield b"x" * (size % chunk)
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def upload(client, task_id: int, size: int):
+    return client.post(f"/tasks/{task_id}/upload_pdf", content=multipart_body(size),
+                       headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--size-mb", type=float, default=4)
+    parser.add_argument("--oversize-mb", type=float, default=200)
+    parser.add_argument("--serve", nargs=2, metavar=("PORT", "PDF_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(int(args.serve[0]), args.serve[1])
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}", BCRYPT_ROUNDS="4")
+        server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_pdf_upload", "--serve", str(port), tmp],
+                                  env=env)
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+                for _ in range(100):
+                    try:
+                        client.get("/docs")
+                        break
+                    except httpx.TransportError:
+                        time.sleep(0.1)
+                credentials = {"username": "bench", "password": "password"}
+                client.post("/users/register", json=credentials)
+                token = client.post("/login", json=credentials).json()["access_token"]
+                task = {"title": "t", "description": "d", "priority": "Low"}
+                task_id = client.post("/tasks", json=task, headers={"Authorization": f"Bearer {token}"}).json()["id"]
+
+                upload(client, task_id, 1024)
+                baseline = peak_rss_mb(server.pid)
+
+                started = time.perf_counter()
+                for _ in range(args.uploads):
+                    response = upload(client, task_id, int(args.size_mb * 2**20))
+                    assert response.status_code == 200, response.text
+                elapsed = time.perf_counter() - started
+                after_uploads = peak_rss_mb(server.pid)
+
+                started = time.perf_counter()
+                try:
+                    status = upload(client, task_id, int(args.oversize_mb * 2**20)).status_code
+                except httpx.TransportError:
+                    status = "connection closed"
+                rejected_in = time.perf_counter() - started
+                after_oversize = peak_rss_mb(server.pid)
+
+            print(f"peak RSS after warm-up            {baseline:7.1f} MiB")
+            print(f"after {args.uploads} x {args.size_mb} MiB uploads       {after_uploads:7.1f} MiB "
+                  f"({args.uploads * args.size_mb / elapsed:.0f} MiB/s)")
+            print(f"after {args.oversize_mb} MiB oversized body  {after_oversize:7.1f} MiB "
+                  f"(status {status} in {rejected_in:.2f}s)")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
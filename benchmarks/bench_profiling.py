@@ -0,0 +1,106 @@
+"""Цена профилирования: установленный, но не сработавший middleware и профилируемый запрос.
+
+Запросы к ASGI-приложению без сети. PROFILING_ENABLED=0 (по умолчанию) —
+middleware не установлен, это и есть строка «without».
+
+    python -m benchmarks.bench_profiling --batch 50 --rounds 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ["METRICS_ENABLED"] = "0"
+
+from app import database, models, profiling
+from app.main import app
+
+ROUTES = {
+    "async GET /tasks": "/tasks",
+    "sync GET /users/{id}/stats": "/users/1/stats",
+}
+
+
+def request_scope(path: str, headers: list) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench"), *headers], "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    if message["type"] == "http.response.start":
+        assert message["status"] == 200, message
+
+
+async def run(asgi_app, path: str, count: int, headers: list = ()) -> float:
+    """Среднее время последовательного запроса, мкс"""
+    started = time.perf_counter()
+    for _ in range(count):
+        await asgi_app(request_scope(path, list(headers)), receive, send)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+async def compare(path: str, profiler: profiling.Profiler, batch: int, rounds: int) -> dict:
+    installed = profiling.ProfilingMiddleware(app, profiler)
+    variants = {
+        "without": (app, []),
+        "installed, idle": (installed, []),
+        "sample": (installed, [(b"x-profile", b"bench"), (b"x-profile-mode", b"sample")]),
+        "cprofile": (installed, [(b"x-profile", b"bench"), (b"x-profile-mode", b"cprofile")]),
+    }
+    timings = {name: [] for name in variants}
+    await run(app, path, batch)  # прогрев
+    for i in range(rounds):
+        for name, (asgi_app, headers) in (variants.items() if i % 2 else reversed(variants.items())):
+            timings[name].append(await run(asgi_app, path, batch, headers))
+    return {name: statistics.median(values) for name, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = database.create_db_engine(url)
+        database.Base.metadata.create_all(engine)
+        database.SessionLocal.configure(bind=engine)
+        async_engine = database.create_async_db_engine(url)
+        database.AsyncSessionLocal.configure(bind=async_engine)
+        with database.SessionLocal() as db:
+            user = models.User(username="bench", hashed_password="x")
+            db.add(user)
+            db.flush()
+            db.add_all(models.Task(title=f"t{i}", description="d", priority="Low", status="Open",
+                                   creator_id=user.id) for i in range(200))
+            db.commit()
+        profiler = profiling.Profiler(os.path.join(tmp, "profiles"), token="bench", max_files=50)
+
+        async def scenario():
+            for name, path in ROUTES.items():
+                timings = await compare(path, profiler, args.batch, args.rounds)
+                base = timings["without"]
+                print(name)
+                for variant, value in timings.items():
+                    print(f"  {variant:16} {value:8.1f} us/request ({value / base - 1:+.1%})")
+            await async_engine.dispose()
+
+        asyncio.run(scenario())
+        captures = profiler.captures()
+        print(f"{len(captures)} captures kept, {sum(capture['size'] for capture in captures) / 1024:.0f} KiB")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Проверка отзыва токена: SELECT на каждую проверку против bloom-фильтра, прогрев и чистка.
+
+    python -m benchmarks.bench_revocation --revoked 100000 --lookups 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+
+from helpers import db, revocation
+
+
+def lookups_per_second(check, keys):
+    started = time.perf_counter()
+    for key in keys:
+        check(key)
+    return len(keys) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--revoked', type=int, default=100_000)
+    parser.add_argument('--lookups', type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.ConnectionPool(os.path.join(tmp, 'users.db'))
+        now = int(time.time())
+        revoked = [uuid.uuid4().hex for _ in range(args.revoked)]
+        with pool.connection() as conn:
+            revocation.migrate(conn)
+            # Половина отзывов уже истекла — их удалит prune
+            conn.executemany('INSERT INTO revoked_tokens (jti, expires_at) VALUES (?, ?)',
+                             [(jti, now + 3600 if i % 2 else now - 1) for i, jti in enumerate(revoked)])
+        live = [uuid.uuid4().hex for _ in range(args.lookups)]
+
+        revocations = revocation.RevocationList(sync_interval=3600)
+        with pool.connection() as conn:
+            started = time.perf_counter()
+            revocations.warm_up(conn)
+            print(f'warm-up {len(revoked) // 2} tokens      {(time.perf_counter() - started) * 1000:8.0f} ms')
+
+            def select(jti):
+                return conn.execute('SELECT 1 FROM revoked_tokens WHERE jti = ?', (jti,)).fetchone() is not None
+
+            def bloom(jti):
+                return revocations.is_revoked(conn, jti)
+
+            print(f'live token, SELECT        {lookups_per_second(select, live):10.0f} lookups/sec')
+            print(f'live token, bloom filter  {lookups_per_second(bloom, live):10.0f} lookups/sec')
+            stats = revocations.stats
+            print(f'  DB lookups {stats["db_lookups"]} of {stats["lookups"]} '
+                  f'({stats["false_positives"] / stats["lookups"]:.2%} false positives)')
+            sample = revoked[1::2][:args.lookups]
+            print(f'revoked token, bloom      {lookups_per_second(bloom, sample):10.0f} lookups/sec')
+
+            started = time.perf_counter()
+            deleted = revocations.prune(conn)
+            conn.commit()
+            print(f'prune {deleted} expired + rebuild {(time.perf_counter() - started) * 1000:8.0f} ms')
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Строк в секунду на ответ из 10k задач: ORM + Pydantic + jsonable_encoder против быстрого пути.
+
+    python -m benchmarks.bench_serialization --rows 10000 --repeat 5
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+from app import crud, database, models, schemas, serialization
+
+
+def pydantic_path(db):
+    # То, что делает FastAPI для response_model=list[TaskOut] с ORM-объектами
+    tasks = db.scalars(crud.tasks_query()).all()
+    adapter = TypeAdapter(list[schemas.TaskOut])
+    content = adapter.dump_python(adapter.validate_python(tasks, from_attributes=True), mode="json")
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_path(db):
+    return serialization.rows_response(crud.get_task_rows(db), schemas.TaskOut).body
+
+
+def best_of(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        with database.SessionLocal() as db:
+            started = time.perf_counter()
+            body = run(db)
+            timings.append(time.perf_counter() - started)
+    return min(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        database.Base.metadata.create_all(engine)
+        database.SessionLocal.configure(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(models.User), [{"id": 1, "username": "bench", "hashed_password": "x"}])
+            conn.execute(insert(models.Task), [
+                {"title": f"task {i}", "description": "serialized", "priority": "Low", "status": "Open",
+                 "creator_id": 1, "responsible_id": 1 if i % 2 else None,
+                 "updated_at": str(datetime.now()) if i % 3 else None}
+                for i in range(args.rows)
+            ])
+
+        slow, slow_body = best_of(pydantic_path, args.repeat)
+        fast, fast_body = best_of(fast_path, args.repeat)
+        assert len(slow_body) == len(fast_body)
+        print(f"ORM + pydantic + jsonable_encoder {args.rows / slow:10.0f} rows/sec ({slow * 1000:.1f} ms)")
+        print(f"columns + dict + orjson           {args.rows / fast:10.0f} rows/sec ({fast * 1000:.1f} ms)")
+        print(f"speedup                           {slow / fast:10.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
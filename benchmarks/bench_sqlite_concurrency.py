@@ -0,0 +1,85 @@
+"""Конкурентные чтения/записи задач: SQLite по умолчанию против WAL + PRAGMA.
+
+    python -m benchmarks.bench_sqlite_concurrency --writers 4 --readers 8 --seconds 5
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import config, crud, database, models
+
+
+def run(engine, writers: int, readers: int, seconds: float) -> dict:
+    database.Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    with session_factory() as db:
+        user = models.User(username="bench", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    counters = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def writer():
+        while time.perf_counter() < deadline:
+            with session_factory() as db:
+                try:
+                    db.add(models.Task(title="t", description="d", priority="Low",
+                                       status="Open", creator_id=user_id))
+                    db.commit()
+                    key = "writes"
+                except OperationalError:
+                    db.rollback()
+                    key = "errors"
+            with lock:
+                counters[key] += 1
+
+    def reader():
+        while time.perf_counter() < deadline:
+            with session_factory() as db:
+                try:
+                    crud.get_tasks_page(db, limit=50, status="Open")
+                    key = "reads"
+                except OperationalError:
+                    key = "errors"
+            with lock:
+                counters[key] += 1
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return {key: value / seconds for key, value in counters.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    variants = {
+        "default": lambda url: database.create_sqlite_engine(url, pool="queue", pragmas={}),
+        "tuned": lambda url: database.create_sqlite_engine(url, pool=config.SQLITE_POOL),
+    }
+    for name, make_engine in variants.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            result = run(make_engine(url), args.writers, args.readers, args.seconds)
+        print(f"{name:8} writes/s={result['writes']:8.1f} reads/s={result['reads']:8.1f} "
+              f"errors/s={result['errors']:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""SQL-запросы и коммиты на один HTTP-запрос для типичного сценария работы с задачами.
+
+    python -m benchmarks.bench_statements_per_request
+"""
+import os
+import tempfile
+
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import database
+from app.main import app
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        database.Base.metadata.create_all(engine)
+        # database.get_db как есть, но на временной базе
+        database.SessionLocal.configure(bind=engine)
+        counters = {"statements": 0, "commits": 0}
+        event.listen(engine, "before_cursor_execute", lambda *args: counters.__setitem__(
+            "statements", counters["statements"] + 1))
+        event.listen(engine, "commit", lambda *args: counters.__setitem__("commits", counters["commits"] + 1))
+
+        with TestClient(app) as client:
+            credentials = {"username": "bench", "password": "password"}
+            headers = {}
+
+            def measure(name, method, url, **kwargs):
+                counters.update(statements=0, commits=0)
+                response = client.request(method, url, headers=headers, **kwargs)
+                assert response.status_code < 400, (name, response.status_code, response.text)
+                print(f"{name:22} statements={counters['statements']:3} commits={counters['commits']:2}")
+                return response
+
+            measure("register", "POST", "/users/register", json=credentials)
+            token = measure("login", "POST", "/login", json=credentials).json()["access_token"]
+            headers["Authorization"] = f"Bearer {token}"
+            task = {"title": "t", "description": "d", "priority": "Low"}
+            task_id = measure("create task", "POST", "/tasks", json=task).json()["id"]
+            measure("update task", "PATCH", f"/tasks/{task_id}", json={"status": "In Progress"})
+            user_id = client.get("/users").json()[0]["id"]
+            measure("assign responsible", "PUT", f"/tasks/{task_id}/assign", json={"user_id": user_id})
+            board_id = measure("create board", "POST", "/boards", json={"title": "b"}).json()["id"]
+            measure("add task to board", "POST", f"/boards/{board_id}/tasks/add", json={"task_id": task_id})
+            measure("update board", "PATCH", f"/boards/{board_id}", json={"title": "b2"})
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Пропускная способность импорта задач: по одной против /tasks/bulk (создание и обновление).
+
+    python -m benchmarks.bench_tasks_bulk --tasks 5000 --chunk 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from fastapi.testclient import TestClient
+
+from app import database
+from app.main import app
+
+
+def task(i):
+    return {"title": f"task {i}", "description": "imported", "priority": "Low"}
+
+
+def report(method, count, single, bulk):
+    print(f"{method:5} one by one  {count / single:10.0f} tasks/sec ({single:.2f}s)")
+    print(f"{method:5} bulk        {count / bulk:10.0f} tasks/sec ({bulk:.2f}s)  x{single / bulk:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--chunk", type=int, default=1000, help="элементов в одном запросе /tasks/bulk")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        database.Base.metadata.create_all(engine)
+        database.SessionLocal.configure(bind=engine)
+
+        with TestClient(app) as client:
+            credentials = {"username": "bench", "password": "password"}
+            client.post("/users/register", json=credentials)
+            token = client.post("/login", json=credentials).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            started = time.perf_counter()
+            for i in range(args.tasks):
+                assert client.post("/tasks", json=task(i), headers=headers).status_code == 200
+            single = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for offset in range(0, args.tasks, args.chunk):
+                items = [task(i) for i in range(offset, min(offset + args.chunk, args.tasks))]
+                response = client.post("/tasks/bulk", json=items, headers=headers)
+                assert response.status_code == 200 and all(r["status"] == "created" for r in response.json())
+            bulk = time.perf_counter() - started
+            report("POST", args.tasks, single, bulk)
+
+            ids = list(range(1, args.tasks + 1))
+            started = time.perf_counter()
+            for task_id in ids:
+                response = client.patch(f"/tasks/{task_id}", json={"status": "Done"}, headers=headers)
+                assert response.status_code == 200
+            single = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for offset in range(0, args.tasks, args.chunk):
+                items = [{"id": task_id, "status": "In Progress"} for task_id in ids[offset:offset + args.chunk]]
+                response = client.patch("/tasks/bulk", json=items, headers=headers)
+                assert response.status_code == 200 and all(r["status"] == "updated" for r in response.json())
+            bulk = time.perf_counter() - started
+            report("PATCH", args.tasks, single, bulk)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Статистика пользователя: строки user_task_counters против COUNT(*) по tasks.
+
+    python -m benchmarks.bench_user_stats --tasks 200000 --users 100 --repeat 200
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import insert
+
+from app import counters, crud, database, models, schemas
+
+
+def count_path(db, user_id):
+    # То, что пришлось бы делать без счётчиков: два GROUP BY по tasks
+    values = {}
+    connection = db.connection()
+    for key, value in counters.expected_counters(connection, [user_id]).items():
+        values[key[1]] = value
+    return counters.user_stats(0, values)
+
+
+def counters_path(db, user_id):
+    return counters.user_stats(0, counters.get_user_counters(db, user_id))
+
+
+def per_second(run, users, repeat):
+    with database.SessionLocal() as db:
+        started = time.perf_counter()
+        for i in range(repeat):
+            result = run(db, users[i % len(users)])
+        return repeat / (time.perf_counter() - started), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        database.Base.metadata.create_all(engine)
+        database.SessionLocal.configure(bind=engine)
+        users = list(range(1, args.users + 1))
+        with engine.begin() as conn:
+            conn.execute(insert(models.User), [{"id": i, "username": f"user{i}", "hashed_password": "x"} for i in users])
+            conn.execute(insert(models.Task), [
+                {"title": f"task {i}", "priority": random.choice(["Low", "Medium", "High"]),
+                 "status": random.choice(["Open", "In Progress", "Done"]),
+                 "creator_id": random.choice(users), "responsible_id": random.choice(users + [None])}
+                for i in range(args.tasks)
+            ])
+        counters.reconcile(engine)
+
+        slow, slow_stats = per_second(count_path, users, args.repeat)
+        fast, fast_stats = per_second(counters_path, users, args.repeat)
+        assert slow_stats == fast_stats
+        print(f"GROUP BY over tasks   {slow:10.0f} stats/sec")
+        print(f"user_task_counters    {fast:10.0f} stats/sec ({fast / slow:.0f}x)")
+
+        # Цена записи: создание задачи со счётчиками и без
+        task = schemas.TaskCreate(title="bench", description="counted", priority="Low", status="Open",
+                                  responsible_id=users[-1])
+        timings = {}
+        apply = counters.apply
+        for name, patch in (("with counters", apply), ("without counters", lambda db, deltas: None)):
+            counters.apply = patch
+            with database.SessionLocal() as db:
+                authors = db.query(models.User).all()
+                started = time.perf_counter()
+                for i in range(args.repeat):
+                    crud.create_task(db, task, authors[i % len(authors)])
+                    db.commit()
+                timings[name] = args.repeat / (time.perf_counter() - started)
+        counters.apply = apply
+        for name, rate in timings.items():
+            print(f"create_task {name:17} {rate:8.0f} tasks/sec")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
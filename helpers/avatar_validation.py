@@ -1,15 +1,22 @@
 from fastapi import Depends, HTTPException, Query
 
 from fastapi import UploadFile, File, status
-from PIL import Image
+from PIL import Image, ImageOps
 import io
 import os
-from typing import Tuple
+from typing import Dict, Iterable, Tuple
 
 # Конфигурация
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 ALLOWED_CONTENT_TYPES = ["image/jpeg", "image/png", "image/webp"]
 AVATAR_SIZE = (400, 400)  # Размер для ресайза
+AVATAR_SIZES = (400, 128, 64)  # Стороны вариантов, от большего к меньшему
+AVATAR_FORMATS = {"jpg": ("JPEG", {"quality": 85, "optimize": True}),
+                  "webp": ("WEBP", {"quality": 80, "method": 4})}
+
+
+class ImageProcessingError(Exception):
+    """Изображение не удалось декодировать или перекодировать"""
 
 
 async def validate_image(file: UploadFile) -> Tuple[bytes, str]:
@@ -63,4 +70,30 @@ def process_image(image_data: bytes, content_type: str) -> bytes:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="Error processing image"
-        )
\ No newline at end of file
+        )
+
+def process_image_variants(image_data: bytes, sizes: Iterable[int] = AVATAR_SIZES) -> Dict[str, bytes]:
+    """Все варианты аватара за одно декодирование: {"400.jpg": ..., "400.webp": ..., "64.jpg": ...}.
+
+    Функция верхнего уровня без HTTP-зависимостей — выполняется в пуле процессов.
+    Каждый следующий размер уменьшается из предыдущего, а не из оригинала.
+    """
+    sizes = sorted(sizes, reverse=True)
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        # JPEG декодируется сразу в уменьшенном масштабе (1/2, 1/4, 1/8)
+        image.draft("RGB", (sizes[0], sizes[0]))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        variants = {}
+        for size in sizes:
+            image.thumbnail((size, size), Image.LANCZOS)
+            for ext, (image_format, options) in AVATAR_FORMATS.items():
+                output = io.BytesIO()
+                image.save(output, format=image_format, **options)
+                variants[f"{size}.{ext}"] = output.getvalue()
+        return variants
+    except Exception as e:
+        raise ImageProcessingError(str(e)) from None
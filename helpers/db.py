@@ -0,0 +1,110 @@
+"""Соединения с users.db для Flask-сервера (helpers/server.py).
+
+Запрос берёт соединение из пула при первом get_db() и держит его в flask.g до
+конца запроса: token_required и обработчик работают через одно соединение.
+Возврат в пул — в teardown_appcontext, то есть и при исключении и раннем
+return; незакоммиченная транзакция при этом откатывается.
+
+Свободные соединения лежат стеком: поток получает последнее возвращённое, с
+самым тёплым кэшем страниц и подготовленных запросов. Отдельное соединение на
+поток (threading.local) не подходит — dev-сервер werkzeug создаёт поток на
+каждый запрос. В каждый момент соединением пользуется один поток.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from flask import g
+
+from app.config import env_int
+
+DATABASE = os.getenv('USERS_DB', 'users.db')
+# Сколько свободных соединений держать; лишние закрываются при возврате
+POOL_SIZE = env_int('USERS_DB_POOL_SIZE', 16)
+# Кэш подготовленных запросов на соединение (у sqlite3 по умолчанию 128)
+CACHED_STATEMENTS = env_int('USERS_DB_CACHED_STATEMENTS', 256)
+
+PRAGMAS = {
+    'journal_mode': os.getenv('USERS_DB_JOURNAL_MODE', 'WAL'),
+    'synchronous': 'NORMAL',
+    'busy_timeout': env_int('USERS_DB_BUSY_TIMEOUT_MS', 5000),
+    'cache_size': -env_int('USERS_DB_CACHE_SIZE_KB', 16 * 1024),
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+
+class ConnectionPool:
+    def __init__(self, database, size=POOL_SIZE, pragmas=PRAGMAS, cached_statements=CACHED_STATEMENTS):
+        self.database = database
+        self.size = size
+        self.pragmas = pragmas
+        self.cached_statements = cached_statements
+        self._idle = []
+        self._lock = threading.Lock()
+        self.connects = 0
+
+    def _connect(self):
+        # check_same_thread=False: соединение переходит между потоками, но не используется параллельно
+        conn = sqlite3.connect(self.database, timeout=self.pragmas.get('busy_timeout', 5000) / 1000,
+                               check_same_thread=False, cached_statements=self.cached_statements)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name}={value}')
+        self.connects += 1
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Соединение вне запроса: commit при успехе, иначе откат"""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+pool = ConnectionPool(DATABASE)
+
+
+def get_db():
+    """Соединение текущего запроса"""
+    if 'db' not in g:
+        g.db = pool.acquire()
+    return g.db
+
+
+def close_db(exception=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        pool.release(conn)
+
+
+def init_app(app):
+    app.teardown_appcontext(close_db)
@@ -0,0 +1,185 @@
+"""Отозванные JWT Flask-сервера: bloom-фильтр в памяти перед таблицей revoked_tokens.
+
+Отзыв пишет (jti, expires_at) в revoked_tokens и добавляет jti в фильтр.
+Проверка сначала смотрит в фильтр: «нет» там точное, и такой токен (почти
+любой живой) проверяется без запроса к БД. «Может быть» проверяется запросом
+по уникальному индексу jti.
+
+Фильтр у каждого процесса свой. Отзывы из других процессов он подхватывает не
+реже раза в SYNC_INTERVAL секунд — выборкой строк с id больше последнего
+загруженного; на это время отзыв в другом процессе может быть ещё не виден.
+
+Строки с истёкшим exp не нужны — такой токен отклоняет jwt.decode. Их удаляет
+фоновый поток раз в PRUNE_INTERVAL секунд по индексу expires_at, после чего
+фильтр пересобирается (удалить ключ из bloom-фильтра нельзя).
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+from app.config import env_int
+
+logger = logging.getLogger(__name__)
+
+# На сколько отозванных токенов рассчитан фильтр; при переполнении он пересобирается вдвое больше
+CAPACITY = env_int('REVOCATION_CAPACITY', 100_000)
+# Доля ложных «может быть» при заполнении до CAPACITY
+ERROR_RATE = float(os.getenv('REVOCATION_ERROR_RATE', '0.01'))
+SYNC_INTERVAL = env_int('REVOCATION_SYNC_INTERVAL', 1)
+PRUNE_INTERVAL = env_int('REVOCATION_PRUNE_INTERVAL', 600)
+# Срок для строк без expires_at (созданных до этой колонки): время жизни refresh-токена
+LEGACY_TTL = 30 * 24 * 3600
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _hashes(self, key):
+        # Двойное хэширование: k позиций из двух 64-битных половин одного blake2b
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def add(self, key):
+        first, second = self._hashes(key)
+        for i in range(self.hashes):
+            position = (first + i * second) % self.size
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        first, second = self._hashes(key)
+        bits, size = self.bits, self.size
+        # Для отсутствующего ключа обычно хватает одной-двух проверок
+        for i in range(self.hashes):
+            position = (first + i * second) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+def migrate(conn):
+    """Колонка expires_at с индексом для таблицы из старых версий init_db"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            jti TEXT UNIQUE NOT NULL,
+            revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at INTEGER
+        )
+    ''')
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(revoked_tokens)')]
+    if 'expires_at' not in columns:
+        conn.execute('ALTER TABLE revoked_tokens ADD COLUMN expires_at INTEGER')
+    conn.execute('''
+        UPDATE revoked_tokens SET expires_at = CAST(strftime('%s', revoked_at) AS INTEGER) + ?
+        WHERE expires_at IS NULL
+    ''', (LEGACY_TTL,))
+    conn.execute('CREATE INDEX IF NOT EXISTS revoked_tokens_expires_at ON revoked_tokens (expires_at)')
+
+
+class RevocationList:
+    def __init__(self, capacity=CAPACITY, error_rate=ERROR_RATE, sync_interval=SYNC_INTERVAL,
+                 prune_interval=PRUNE_INTERVAL):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.prune_interval = prune_interval
+        self.filter = None
+        self.last_id = 0
+        self.synced_at = 0.0
+        self.started = False
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self.stats = {'lookups': 0, 'filtered': 0, 'db_lookups': 0, 'false_positives': 0}
+
+    def _load(self, conn, since_id=0):
+        return conn.execute('SELECT id, jti FROM revoked_tokens WHERE id > ? AND expires_at > ? ORDER BY id',
+                            (since_id, int(time.time()))).fetchall()
+
+    def warm_up(self, conn):
+        """Собирает фильтр из всех действующих отзывов"""
+        with self._lock:
+            rows = self._load(conn)
+            capacity = self.capacity
+            while len(rows) > capacity * 3 // 4:
+                capacity *= 2
+            bloom = BloomFilter(capacity, self.error_rate)
+            for _, jti in rows:
+                bloom.add(jti)
+            # Строки с истёкшим exp тоже учитываются: id > last_id не вернёт их повторно
+            self.last_id = max(self.last_id, rows[-1][0] if rows else 0,
+                               conn.execute('SELECT coalesce(max(id), 0) FROM revoked_tokens').fetchone()[0])
+            self.filter = bloom
+            self.capacity = capacity
+            self.synced_at = time.monotonic()
+
+    def sync(self, conn):
+        """Добавляет в фильтр отзывы, сделанные другими процессами"""
+        with self._lock:
+            for row_id, jti in self._load(conn, self.last_id):
+                self.filter.add(jti)
+                self.last_id = max(self.last_id, row_id)
+            self.synced_at = time.monotonic()
+            overflow = self.filter.count > self.capacity
+        if overflow:
+            self.warm_up(conn)
+
+    def revoke(self, conn, jti, expires_at):
+        """Отзывает токен до expires_at (exp токена, unix time); коммит — на вызывающем"""
+        conn.execute('INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)', (jti, int(expires_at)))
+        with self._lock:
+            if self.filter is not None:
+                self.filter.add(jti)
+
+    def is_revoked(self, conn, jti):
+        if self.filter is None:
+            self.warm_up(conn)
+        elif time.monotonic() - self.synced_at >= self.sync_interval:
+            self.sync(conn)
+        self.stats['lookups'] += 1
+        if jti not in self.filter:
+            self.stats['filtered'] += 1
+            return False
+        self.stats['db_lookups'] += 1
+        found = conn.execute('SELECT 1 FROM revoked_tokens WHERE jti = ?', (jti,)).fetchone() is not None
+        if not found:
+            self.stats['false_positives'] += 1
+        return found
+
+    def prune(self, conn):
+        """Удаляет отзывы с истёкшим exp и пересобирает фильтр; коммит — на вызывающем"""
+        deleted = conn.execute('DELETE FROM revoked_tokens WHERE expires_at <= ?', (int(time.time()),)).rowcount
+        if deleted:
+            self.warm_up(conn)
+        return deleted
+
+    def start(self, pool):
+        """Один раз на процесс: схема, прогрев фильтра и поток чистки"""
+        if self.started:
+            return
+        with self._start_lock:
+            if self.started:
+                return
+            with pool.connection() as conn:
+                migrate(conn)
+                self.warm_up(conn)
+            threading.Thread(target=self._prune_loop, args=(pool,), name='revocation-prune', daemon=True).start()
+            self.started = True
+
+    def _prune_loop(self, pool):
+        while True:
+            time.sleep(self.prune_interval)
+            try:
+                with pool.connection() as conn:
+                    self.prune(conn)
+            except Exception:
+                # Следующий проход повторит чистку; поток не должен умирать из-за занятой БД
+                logger.exception('Revoked tokens prune failed')
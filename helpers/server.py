@@ -3,18 +3,32 @@ import sqlite3
 import hashlib
 import os
 import uuid
-from werkzeug.utils import secure_filename
+from datetime import datetime, timedelta
+from functools import wraps
+
+import jwt
 from flask_restx import Api, Resource, fields
 
+from app.storage import BlobStore, key_of
+from helpers import db, revocation
+
 app = Flask(__name__)
+db.init_app(app)
 
 # Конфигурация
-UPLOAD_FOLDER = 'user_photos'
+# Абсолютный путь: send_from_directory считает относительные пути от папки модуля,
+# а сохранение — от рабочего каталога
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'user_photos')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 MAX_FILE_SIZE = 2 * 1024 * 1024  # 2MB
 
-# Создаем папку для фото, если ее нет
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Фото хранятся по хэшу содержимого (<ab>/<cd>/<sha256>.<ext>), одинаковые — один раз.
+# Файлы без ссылок удаляет python -m app.storage helpers/user_photos helpers/user_photos.index.db
+photo_store = BlobStore(UPLOAD_FOLDER, UPLOAD_FOLDER + '.index.db')
+
+# Отозванные токены: bloom-фильтр перед таблицей revoked_tokens.
+# Прогрев — при старте, под WSGI-сервером — при первом запросе процесса
+revocations = revocation.RevocationList()
 
 
 # Декоратор для проверки JWT
@@ -31,6 +45,9 @@ def token_required(f):
 
         try:
             data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
+            if is_revoked(data, token):
+                return jsonify({'message': 'Token has been revoked!'}), 401
+
             current_user = get_user_by_id(data['user_id'])
 
             if not current_user:
@@ -47,9 +64,23 @@ def token_required(f):
 
     return decorated
 
+
+# Идентификатор токена для отзыва: jti, у токенов без него — сам токен
+def token_id(payload, token):
+    return payload.get('jti', token)
+
+
+def is_revoked(payload, token):
+    revocations.start(db.pool)
+    return revocations.is_revoked(db.get_db(), token_id(payload, token))
+
 # Инициализация базы данных
 def init_db():
-    conn = sqlite3.connect('users.db')
+    with db.pool.connection() as conn:
+        init_schema(conn)
+
+
+def init_schema(conn):
     cursor = conn.cursor()
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -62,8 +93,6 @@ def init_db():
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    conn.commit()
-    conn.close()
 
 
 # Проверка расширения файла
@@ -72,6 +101,34 @@ def allowed_file(filename):
         filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+# Сохранение фото в хранилище, возвращает путь для photo_filename
+def save_photo(data, filename):
+    key = hashlib.sha256(data).hexdigest()
+    ext = '.' + filename.rsplit('.', 1)[1].lower()
+    photo_store.put(key, {ext: data})
+    return photo_store.relative_path(key, ext)
+
+
+# URL фото: файлы хранилища отдаются по неизменяемому URL без запроса к БД
+def photo_url(user_id, photo_filename):
+    if not photo_filename:
+        return None
+    if key_of(photo_filename):
+        return f"/api/photos/{photo_filename}"
+    return f"/api/users/{user_id}/photo"
+
+
+# Снятие ссылки на фото (файлы старого формата <uuid>.<ext> удаляются сразу)
+def release_photo(photo_filename):
+    if not photo_filename:
+        return
+    key = key_of(photo_filename)
+    if key:
+        photo_store.release(key)
+    elif os.path.exists(os.path.join(UPLOAD_FOLDER, photo_filename)):
+        os.remove(os.path.join(UPLOAD_FOLDER, photo_filename))
+
+
 # Хеширование пароля
 def hash_password(password):
     return hashlib.sha256(password.encode('utf-8')).hexdigest()
@@ -94,21 +151,19 @@ def create_user():
     # Обработка фото
     photo_filename = None
     if file and file.filename != '':
-        if file.content_length > MAX_FILE_SIZE:
-            return jsonify({'error': 'File size exceeds 2MB limit'}), 400
-
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type'}), 400
 
-        # Генерируем уникальное имя файла
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        photo_filename = f"{uuid.uuid4()}.{ext}"
-        file.save(os.path.join(UPLOAD_FOLDER, photo_filename))
+        data = file.read(MAX_FILE_SIZE + 1)
+        if len(data) > MAX_FILE_SIZE:
+            return jsonify({'error': 'File size exceeds 2MB limit'}), 400
+
+        photo_filename = save_photo(data, file.filename)
 
     password_hash = hash_password(password)
 
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.get_db()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO users (username, password_hash, email, photo_filename)
@@ -116,21 +171,20 @@ def create_user():
         ''', (username, password_hash, email, photo_filename))
         conn.commit()
         user_id = cursor.lastrowid
-        conn.close()
 
         return jsonify({
             'id': user_id,
             'username': username,
             'email': email,
-            'photo_url': f"/api/users/{user_id}/photo" if photo_filename else None,
+            'photo_url': photo_url(user_id, photo_filename),
             'message': 'User created successfully'
         }), 201
     except sqlite3.IntegrityError:
+        release_photo(photo_filename)
         return jsonify({'error': 'Username already exists'}), 409
     except Exception as e:
-        # Удаляем сохраненное фото если возникла ошибка
-        if photo_filename and os.path.exists(os.path.join(UPLOAD_FOLDER, photo_filename)):
-            os.remove(os.path.join(UPLOAD_FOLDER, photo_filename))
+        # Снимаем ссылку на сохраненное фото если возникла ошибка
+        release_photo(photo_filename)
         return jsonify({'error': str(e)}), 500
 
 
@@ -139,11 +193,10 @@ def create_user():
 @token_required
 def get_users():
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.get_db()
         cursor = conn.cursor()
         cursor.execute('SELECT id, username, email, photo_filename, created_at, updated_at FROM users')
         users = cursor.fetchall()
-        conn.close()
 
         users_list = []
         for user in users:
@@ -151,7 +204,7 @@ def get_users():
                 'id': user[0],
                 'username': user[1],
                 'email': user[2],
-                'photo_url': f"/api/users/{user[0]}/photo" if user[3] else None,
+                'photo_url': photo_url(user[0], user[3]),
                 'created_at': user[4],
                 'updated_at': user[5]
             })
@@ -166,11 +219,10 @@ def get_users():
 @token_required
 def get_user_photo(user_id):
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.get_db()
         cursor = conn.cursor()
         cursor.execute('SELECT photo_filename FROM users WHERE id = ?', (user_id,))
         result = cursor.fetchone()
-        conn.close()
 
         if not result or not result[0]:
             return jsonify({'error': 'Photo not found'}), 404
@@ -181,15 +233,28 @@ def get_user_photo(user_id):
         return jsonify({'error': str(e)}), 500
 
 
+# Метод для получения фото по адресу в хранилище (photo_url из ответов)
+@app.route('/api/photos/<path:photo_path>', methods=['GET'])
+@token_required
+def get_photo(current_user, photo_path):
+    # Содержимое по адресу с хэшем не меняется: кэш на год без перепроверки
+    if not key_of(photo_path):
+        return jsonify({'error': 'Photo not found'}), 404
+    response = send_from_directory(UPLOAD_FOLDER, photo_path, max_age=31536000)
+    response.cache_control.immutable = True
+    return response
+
+
 # Метод для обновления пользователя
 @app.route('/api/users/<int:user_id>', methods=['PUT'])
 @token_required
 def update_user(user_id):
+    new_photo = None
     try:
         data = request.form.to_dict()
         file = request.files.get('photo')
 
-        conn = sqlite3.connect('users.db')
+        conn = db.get_db()
         cursor = conn.cursor()
 
         # Получаем текущие данные пользователя
@@ -197,7 +262,6 @@ def update_user(user_id):
         user = cursor.fetchone()
 
         if not user:
-            conn.close()
             return jsonify({'error': 'User not found'}), 404
 
         current_username = user[0]
@@ -216,20 +280,15 @@ def update_user(user_id):
         # Обработка фото
         photo_filename = current_photo
         if file and file.filename != '':
-            if file.content_length > MAX_FILE_SIZE:
-                return jsonify({'error': 'File size exceeds 2MB limit'}), 400
-
             if not allowed_file(file.filename):
                 return jsonify({'error': 'Invalid file type'}), 400
 
-            # Удаляем старое фото
-            if current_photo and os.path.exists(os.path.join(UPLOAD_FOLDER, current_photo)):
-                os.remove(os.path.join(UPLOAD_FOLDER, current_photo))
+            data = file.read(MAX_FILE_SIZE + 1)
+            if len(data) > MAX_FILE_SIZE:
+                return jsonify({'error': 'File size exceeds 2MB limit'}), 400
 
-            # Сохраняем новое фото
-            ext = file.filename.rsplit('.', 1)[1].lower()
-            photo_filename = f"{uuid.uuid4()}.{ext}"
-            file.save(os.path.join(UPLOAD_FOLDER, photo_filename))
+            # Сохраняем новое фото, ссылка на старое снимается после записи в БД
+            photo_filename = new_photo = save_photo(data, file.filename)
 
         # Обновляем запись в БД
         if password_hash:
@@ -246,18 +305,22 @@ def update_user(user_id):
             ''', (username, email, photo_filename, user_id))
 
         conn.commit()
-        conn.close()
+
+        if new_photo:
+            release_photo(current_photo)
 
         return jsonify({
             'id': user_id,
             'username': username,
             'email': email,
-            'photo_url': f"/api/users/{user_id}/photo" if photo_filename else None,
+            'photo_url': photo_url(user_id, photo_filename),
             'message': 'User updated successfully'
         })
     except sqlite3.IntegrityError:
+        release_photo(new_photo)
         return jsonify({'error': 'Username already exists'}), 409
     except Exception as e:
+        release_photo(new_photo)
         return jsonify({'error': str(e)}), 500
 
 
@@ -266,7 +329,7 @@ def update_user(user_id):
 @token_required
 def delete_user(user_id):
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.get_db()
         cursor = conn.cursor()
 
         # Получаем фото пользователя для удаления
@@ -274,17 +337,14 @@ def delete_user(user_id):
         result = cursor.fetchone()
 
         if not result:
-            conn.close()
             return jsonify({'error': 'User not found'}), 404
 
         # Удаляем запись из БД
         cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
         conn.commit()
-        conn.close()
 
-        # Удаляем фото если оно есть
-        if result[0] and os.path.exists(os.path.join(UPLOAD_FOLDER, result[0])):
-            os.remove(os.path.join(UPLOAD_FOLDER, result[0]))
+        # Снимаем ссылку на фото если оно есть
+        release_photo(result[0])
 
         return jsonify({'message': 'User deleted successfully'})
     except Exception as e:
@@ -302,7 +362,7 @@ def create_task():
         return jsonify({'error': 'Title and creator ID are required'}), 400
 
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.get_db()
         cursor = conn.cursor()
 
         # Проверяем существование пользователя-создателя
@@ -342,7 +402,6 @@ def create_task():
         ''', (task_id,))
 
         task = cursor.fetchone()
-        conn.close()
 
         if not task:
             return jsonify({'error': 'Task not found after creation'}), 500
@@ -379,7 +438,7 @@ def create_task():
 @token_required
 def get_tasks():
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.get_db()
         cursor = conn.cursor()
 
         # Получаем параметры фильтрации из запроса
@@ -412,7 +471,6 @@ def get_tasks():
 
         cursor.execute(query, params)
         tasks = cursor.fetchall()
-        conn.close()
 
         tasks_list = []
         for task in tasks:
@@ -446,7 +504,7 @@ def update_task(task_id):
     data = request.get_json()
 
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.get_db()
         cursor = conn.cursor()
 
         # Проверяем существование задачи
@@ -507,7 +565,6 @@ def update_task(task_id):
         ''', (task_id,))
 
         task = cursor.fetchone()
-        conn.close()
 
         task_data = {
             'id': task[0],
@@ -537,27 +594,22 @@ def update_task(task_id):
 @token_required
 def delete_task(task_id):
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.get_db()
         cursor = conn.cursor()
 
         cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
         conn.commit()
 
         if cursor.rowcount == 0:
-            conn.close()
             return jsonify({'error': 'Task not found'}), 404
 
-        conn.close()
         return jsonify({'message': 'Task deleted successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-from datetime import datetime, timedelta
-import jwt
-from functools import wraps
-
 app = Flask(__name__)
+db.init_app(app)
 
 # Конфигурация
 app.config['SECRET_KEY'] = 'your-secret-key-here'  # В продакшене используйте сложный ключ
@@ -574,11 +626,10 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # Вспомогательные функции
 def get_user_by_id(user_id):
-    conn = sqlite3.connect('users.db')
+    conn = db.get_db()
     cursor = conn.cursor()
     cursor.execute('SELECT id, username, email FROM users WHERE id = ?', (user_id,))
     user = cursor.fetchone()
-    conn.close()
 
     if user:
         return {
@@ -600,7 +651,11 @@ def hash_password(password):
 
 # Инициализация базы данных
 def init_db():
-    conn = sqlite3.connect('users.db')
+    with db.pool.connection() as conn:
+        init_schema(conn)
+
+
+def init_schema(conn):
     cursor = conn.cursor()
 
     # Таблица пользователей
@@ -634,16 +689,7 @@ def init_db():
     ''')
 
     # Таблица для хранения недействительных токенов (для логаута)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS revoked_tokens (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            jti TEXT UNIQUE NOT NULL,
-            revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    conn.commit()
-    conn.close()
+    revocation.migrate(conn)
 
 
 # Методы аутентификации
@@ -661,7 +707,7 @@ def register():
     password_hash = hash_password(password)
 
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.get_db()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO users (username, password_hash, email)
@@ -669,7 +715,6 @@ def register():
         ''', (username, password_hash, email))
         conn.commit()
         user_id = cursor.lastrowid
-        conn.close()
 
         return jsonify({
             'message': 'User created successfully',
@@ -691,11 +736,10 @@ def login():
     username = auth['username']
     password = auth['password']
 
-    conn = sqlite3.connect('users.db')
+    conn = db.get_db()
     cursor = conn.cursor()
     cursor.execute('SELECT id, password_hash FROM users WHERE username = ?', (username,))
     user = cursor.fetchone()
-    conn.close()
 
     if not user:
         return jsonify({'error': 'User not found'}), 404
@@ -709,13 +753,15 @@ def login():
     access_token = jwt.encode({
         'user_id': user_id,
         'exp': datetime.now() + app.config['JWT_ACCESS_TOKEN_EXPIRES'],
-        'type': 'access'
+        'type': 'access',
+        'jti': uuid.uuid4().hex
     }, app.config['SECRET_KEY'])
 
     refresh_token = jwt.encode({
         'user_id': user_id,
         'exp': datetime.now() + app.config['JWT_REFRESH_TOKEN_EXPIRES'],
-        'type': 'refresh'
+        'type': 'refresh',
+        'jti': uuid.uuid4().hex
     }, app.config['SECRET_KEY'])
 
     return jsonify({
@@ -733,13 +779,20 @@ def logout(current_user):
     try:
         # Добавляем токен в черный список
         decoded_token = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
-        jti = decoded_token['jti'] if 'jti' in decoded_token else token
+        conn = db.get_db()
+        revocations.revoke(conn, token_id(decoded_token, token), decoded_token['exp'])
+
+        # Вместе с access-токеном отзываем refresh-токен, если он передан
+        refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+        if refresh_token:
+            try:
+                decoded_refresh = jwt.decode(refresh_token, app.config['SECRET_KEY'], algorithms=["HS256"])
+            except jwt.InvalidTokenError:
+                decoded_refresh = None
+            if decoded_refresh and decoded_refresh['user_id'] == current_user['id']:
+                revocations.revoke(conn, token_id(decoded_refresh, refresh_token), decoded_refresh['exp'])
 
-        conn = sqlite3.connect('users.db')
-        cursor = conn.cursor()
-        cursor.execute('INSERT INTO revoked_tokens (jti) VALUES (?)', (jti,))
         conn.commit()
-        conn.close()
 
         return jsonify({'message': 'Successfully logged out'})
     except Exception as e:
@@ -754,27 +807,23 @@ def refresh():
         return jsonify({'error': 'Refresh token is required'}), 400
 
     try:
-        # Проверяем, что токен не в черном списке
-        conn = sqlite3.connect('users.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT 1 FROM revoked_tokens WHERE jti = ?', (refresh_token,))
-        if cursor.fetchone():
-            conn.close()
-            return jsonify({'error': 'Token has been revoked'}), 401
-        conn.close()
-
         data = jwt.decode(refresh_token, app.config['SECRET_KEY'], algorithms=["HS256"])
 
         if data['type'] != 'refresh':
             return jsonify({'error': 'Invalid token type'}), 401
 
+        # Проверяем, что токен не в черном списке
+        if is_revoked(data, refresh_token):
+            return jsonify({'error': 'Token has been revoked'}), 401
+
         user_id = data['user_id']
 
         # Создаем новый access токен
         new_access_token = jwt.encode({
             'user_id': user_id,
             'exp': datetime.now() + app.config['JWT_ACCESS_TOKEN_EXPIRES'],
-            'type': 'access'
+            'type': 'access',
+            'jti': uuid.uuid4().hex
         }, app.config['SECRET_KEY'])
 
         return jsonify({
@@ -805,7 +854,7 @@ def create_task(current_user):
         return jsonify({'error': 'Title is required'}), 400
 
     try:
-        conn = sqlite3.connect('users.db')
+        conn = db.get_db()
         cursor = conn.cursor()
 
         # Проверяем существование ответственного (если указан)
@@ -840,7 +889,6 @@ def create_task(current_user):
         ''', (task_id,))
 
         task = cursor.fetchone()
-        conn.close()
 
         if not task:
             return jsonify({'error': 'Task not found after creation'}), 500
@@ -928,4 +976,5 @@ class TaskList(Resource):
 
 if __name__ == '__main__':
     init_db()
+    revocations.start(db.pool)
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,141 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app import models, routes, storage
+from helpers.avatar_validation import process_image_variants
+
+
+def image_bytes(size=(800, 600), image_format="PNG"):
+    output = io.BytesIO()
+    Image.new("RGBA" if image_format == "PNG" else "RGB", size, (200, 30, 30)).save(output, image_format)
+    return output.getvalue()
+
+
+@pytest.fixture
+def avatar_store(tmp_path, monkeypatch):
+    store = storage.BlobStore(str(tmp_path / "avatars"), str(tmp_path / "avatars.db"))
+    monkeypatch.setattr(routes, "avatar_store", store)
+    return store
+
+
+def stored_files(store):
+    return sorted(name for _, _, names in os.walk(store.root) for name in names)
+
+
+def test_variants_in_one_pass():
+    variants = process_image_variants(image_bytes((1600, 1200), "JPEG"))
+    assert sorted(variants) == ["128.jpg", "128.webp", "400.jpg", "400.webp", "64.jpg", "64.webp"]
+    assert Image.open(io.BytesIO(variants["400.webp"])).size == (400, 300)
+    assert Image.open(io.BytesIO(variants["64.jpg"])).format == "JPEG"
+
+
+def test_upload_replaces_variants(client, db_session, as_user, avatar_store):
+    user = models.User(username="avatar_owner", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    as_user(user)
+
+    response = client.post(f"/users/{user.id}/avatar", files={"file": ("a.png", image_bytes(), "image/png")})
+    assert response.status_code == 200
+    avatar_url = response.json()["avatar_url"]
+    key = storage.hash_bytes(image_bytes())
+    assert avatar_url == f"/static/avatars/{key[:2]}/{key[2:4]}/{key}_400.jpg"
+    assert len(stored_files(avatar_store)) == 6
+
+    db_session.refresh(user)
+    as_user(user)
+    response = client.post(f"/users/{user.id}/avatar", files={"file": ("b.png", image_bytes((640, 480)), "image/png")})
+    assert response.status_code == 200
+    assert response.json()["avatar_url"].rsplit("/", 1)[1] in stored_files(avatar_store)
+    # Старые варианты остаются до gc
+    assert avatar_store.refcount(key) == 0
+    assert avatar_store.gc() == 1
+    assert len(stored_files(avatar_store)) == 6
+
+    db_session.refresh(user)
+    as_user(user)
+    assert client.delete(f"/users/{user.id}/avatar").status_code == 200
+    avatar_store.gc()
+    assert stored_files(avatar_store) == []
+
+
+def test_same_image_is_processed_once(client, db_session, as_user, avatar_store, monkeypatch):
+    users = [models.User(username=f"avatar_twin_{i}", hashed_password="x") for i in range(2)]
+    db_session.add_all(users)
+    db_session.commit()
+    urls = []
+    for user in users:
+        as_user(user)
+        response = client.post(f"/users/{user.id}/avatar", files={"file": ("a.png", image_bytes(), "image/png")})
+        urls.append(response.json()["avatar_url"])
+        # Второй раз варианты не пересчитываются
+        monkeypatch.setattr("app.avatars.make_variants", None)
+
+    assert urls[0] == urls[1]
+    assert len(stored_files(avatar_store)) == 6
+    assert avatar_store.refcount(storage.key_of(urls[0])) == 2
+
+
+def test_invalid_avatars_are_rejected(client, db_session, as_user, avatar_store):
+    user = models.User(username="avatar_invalid", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    as_user(user)
+
+    url = f"/users/{user.id}/avatar"
+    assert client.post(url, files={"file": ("a.gif", b"GIF89a", "image/gif")}).status_code == 415
+    assert client.post(url, files={"file": ("a.png", b"not an image", "image/png")}).status_code == 422
+    assert stored_files(avatar_store) == []
+
+
+def test_previous_avatar_comes_from_the_row_not_the_token(client, db_session, as_user, avatar_store):
+    owner = models.User(username="avatar_stale", hashed_password="x")
+    other = models.User(username="avatar_sharer", hashed_password="x")
+    db_session.add_all([owner, other])
+    db_session.commit()
+    shared, second, third = image_bytes(), image_bytes((640, 480)), image_bytes((320, 240))
+    for user in (owner, other):
+        as_user(user)
+        client.post(f"/users/{user.id}/avatar", files={"file": ("a.png", shared, "image/png")})
+    db_session.refresh(owner)
+    stale = models.User(id=owner.id, username=owner.username, avatar_url=owner.avatar_url)
+
+    as_user(stale)
+    client.post(f"/users/{owner.id}/avatar", files={"file": ("b.png", second, "image/png")})
+    # Снимок токена всё ещё указывает на общий аватар, но освобождается второй
+    client.post(f"/users/{owner.id}/avatar", files={"file": ("c.png", third, "image/png")})
+    assert avatar_store.refcount(storage.hash_bytes(shared)) == 1
+    assert avatar_store.refcount(storage.hash_bytes(second)) == 0
+    assert avatar_store.refcount(storage.hash_bytes(third)) == 1
+
+    assert client.delete(f"/users/{owner.id}/avatar").status_code == 200
+    assert client.delete(f"/users/{owner.id}/avatar").status_code == 400
+    assert avatar_store.refcount(storage.hash_bytes(shared)) == 1
+    assert avatar_store.refcount(storage.hash_bytes(third)) == 0
+
+
+@pytest.mark.parametrize("names, url", [
+    # Исходный маршрут: URL — абсолютный путь к каталогу аватаров
+    (["user_{id}_20250101120000.png"], "/{root}/user_{id}_20250101120000.png"),
+    (["user_{id}_20250101120000123456_64.jpg", "user_{id}_20250101120000123456_400.jpg"],
+     "/static/avatars/user_{id}_20250101120000123456_400.jpg"),
+])
+def test_legacy_avatar_is_removed_on_replace(client, db_session, as_user, avatar_store, names, url):
+    user = models.User(username="avatar_legacy", hashed_password="x")
+    db_session.add(user)
+    db_session.flush()
+    os.makedirs(avatar_store.root, exist_ok=True)
+    kept = os.path.join(avatar_store.root, "user_999_20250101120000.png")
+    for name in names + [os.path.basename(kept)]:
+        open(os.path.join(avatar_store.root, name.format(id=user.id)), "wb").close()
+    user.avatar_url = url.format(id=user.id, root=avatar_store.root.lstrip("/"))
+    db_session.commit()
+    as_user(user)
+
+    response = client.post(f"/users/{user.id}/avatar", files={"file": ("a.png", image_bytes(), "image/png")})
+    assert response.status_code == 200
+    assert os.path.exists(kept)
+    assert not any(os.path.exists(os.path.join(avatar_store.root, name.format(id=user.id))) for name in names)
@@ -0,0 +1,136 @@
+import fnmatch
+
+import pytest
+
+from app import board_cache, cache, crud, models
+
+
+def create_board(db_session, title="cached"):
+    owner = models.User(username=f"{title}_owner", hashed_password="x")
+    board = models.Board(title=title)
+    db_session.add_all([owner, board])
+    db_session.flush()
+    task = models.Task(title=f"{title} task", description="d", priority="Low", status="Open",
+                       creator_id=owner.id, board_id=board.id)
+    spare = models.Task(title=f"{title} spare", description="d", priority="Low", status="Open", creator_id=owner.id)
+    db_session.add_all([task, spare])
+    db_session.commit()
+    return board, task, spare, owner
+
+
+def test_board_reads_are_served_from_cache(client, db_session, query_counter):
+    board, _, _, _ = create_board(db_session)
+
+    first = client.get(f"/boards/{board.id}/tasks")
+    with query_counter() as statements:
+        second = client.get(f"/boards/{board.id}/tasks")
+        client.get(f"/boards/{board.id}")
+        client.get(f"/boards/{board.id}")
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    # Только первое чтение самой доски идёт в базу (через асинхронный движок)
+    assert statements == []
+    assert board_cache.stats()["hits"] == 2
+
+
+def test_writes_invalidate_board_entries(client, db_session, as_user):
+    board, task, spare, owner = create_board(db_session)
+    other, _, _, _ = create_board(db_session, "other")
+    as_user(owner)
+    tasks_url = f"/boards/{board.id}/tasks"
+
+    def titles(url):
+        return [item["title"] for item in client.get(url).json()]
+
+    assert titles(tasks_url) == ["cached task"]
+    client.patch(f"/tasks/{task.id}", json={"title": "renamed"})
+    assert titles(tasks_url) == ["renamed"]
+
+    client.post(f"/boards/{board.id}/tasks/add", json={"task_id": spare.id})
+    assert titles(tasks_url) == ["renamed", "cached spare"]
+
+    assert titles(f"/boards/{other.id}/tasks") == ["other task"]
+    client.post(f"/boards/{board.id}/tasks/remove", json={"task_id": spare.id})
+    assert titles(tasks_url) == ["renamed"]
+
+    client.patch("/tasks/bulk", json=[{"id": task.id, "title": "bulk"}])
+    assert titles(tasks_url) == ["bulk"]
+
+    assert client.get(f"/boards/{board.id}").json()["title"] == "cached"
+    client.patch(f"/boards/{board.id}", json={"title": "new title"})
+    assert client.get(f"/boards/{board.id}").json()["title"] == "new title"
+
+    assert client.get(f"/boards/{other.id}").status_code == 200
+    as_user(models.User(id=owner.id, username=owner.username, role="admin"))
+    assert client.delete(f"/boards/{other.id}").status_code == 200
+    assert client.get(f"/boards/{other.id}").status_code == 404
+    assert client.get(f"/boards/{other.id}/tasks").status_code == 404
+
+
+def test_rolled_back_write_keeps_cache(client, db_session):
+    board, _, _, _ = create_board(db_session)
+    client.get(f"/boards/{board.id}")
+
+    crud.update_board(db_session, board.id, {"title": "never committed"})
+    db_session.rollback()
+    assert board_cache.get(board_cache.board_key(board.id)) is not None
+
+
+def test_stale_read_is_not_cached():
+    key = board_cache.board_key(12345)
+    seen = board_cache.generation(key)
+    board_cache.invalidate(key)
+    board_cache.put(key, board_cache.CachedResponse({"ETag": '"x"'}, b"{}"), seen)
+    assert board_cache.get(key) is None
+
+
+def test_null_backend_and_unknown_backend():
+    backend = cache.create_backend("none", maxsize=1, ttl=1, redis_url="", prefix="")
+    backend.set("k", b"v")
+    assert backend.get("k") is None
+    with pytest.raises(ValueError):
+        cache.create_backend("memcached", maxsize=1, ttl=1, redis_url="", prefix="")
+
+
+class FakeRedis:
+    """Нужное RedisBackend подмножество redis.Redis"""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, px=None):
+        self.data[key] = value
+        self.expiry[key] = px
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        return [key for key in list(self.data) if fnmatch.fnmatchcase(key, match)]
+
+
+def test_redis_backend(client, db_session, monkeypatch):
+    fake = FakeRedis()
+    fake.set("other:key", b"kept")
+    monkeypatch.setattr(board_cache, "backend", cache.RedisBackend("", ttl=2.5, prefix="board-cache:", client=fake))
+    board, task, _, _ = create_board(db_session)
+    url = f"/boards/{board.id}/tasks"
+
+    first = client.get(url)
+    assert client.get(url).content == first.content
+    key = "board-cache:" + board_cache.tasks_key(board.id)
+    assert fake.expiry[key] == 2500
+    assert board_cache.stats()["hits"] == 1
+
+    crud.update_task(db_session, task.id, {"title": "changed"})
+    db_session.commit()
+    assert key not in fake.data
+    assert client.get(url).json()[0]["title"] == "changed"
+
+    board_cache.clear()
+    assert fake.data == {"other:key": b"kept"}
@@ -0,0 +1,97 @@
+"""Число SQL-запросов на операции с досками не должно зависеть от размера доски"""
+
+from app import crud, models
+
+
+def collection_loads(statements):
+    # Ленивая загрузка board.tasks / board.users выглядит как "WHERE ? = tasks.board_id"
+    return [sql for sql in statements if "? = tasks.board_id" in sql or "? = board_users.board_id" in sql]
+
+
+def create_board(db_session, title, size):
+    owner = models.User(username=f"{title}_owner", hashed_password="x")
+    board = models.Board(title=title)
+    db_session.add_all([owner, board])
+    db_session.flush()
+    for i in range(size):
+        member = models.User(username=f"{title}_member_{i}", hashed_password="x")
+        db_session.add(member)
+        db_session.flush()
+        db_session.add(models.BoardUser(board_id=board.id, user_id=member.id))
+        db_session.add(models.Task(title=f"{title} {i}", description="d", priority="Low",
+                                   status="Open", creator_id=owner.id, board_id=board.id))
+    task = models.Task(title=f"{title} new", description="d", priority="Low", status="Open", creator_id=owner.id)
+    user = models.User(username=f"{title}_new_member", hashed_password="x")
+    db_session.add_all([task, user])
+    db_session.commit()
+    return board.id, task.id, user.id, owner
+
+
+def test_add_and_remove_task_query_count_is_constant(client, db_session, query_counter, as_user):
+    counts = []
+    for title, size in (("small", 1), ("large", 50)):
+        board_id, task_id, _, owner = create_board(db_session, title, size)
+        as_user(owner)
+        with query_counter() as add_statements:
+            response = client.post(f"/boards/{board_id}/tasks/add", json={"task_id": task_id})
+            assert response.status_code == 200
+        with query_counter() as remove_statements:
+            response = client.post(f"/boards/{board_id}/tasks/remove", json={"task_id": task_id})
+            assert response.status_code == 200
+        assert collection_loads(add_statements + remove_statements) == []
+        counts.append((len(add_statements), len(remove_statements)))
+
+    assert counts[0] == counts[1]
+    assert counts[0][0] <= 6
+
+
+def test_board_tasks_are_loaded_in_two_queries(client, db_session, query_counter):
+    board_id, _, _, _ = create_board(db_session, "listing", 30)
+
+    with query_counter() as statements:
+        response = client.get(f"/boards/{board_id}/tasks")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 30
+    assert len(statements) == 2
+
+
+def test_board_membership_does_not_load_collection(db_session, query_counter):
+    counts = []
+    for title, size in (("members_small", 1), ("members_large", 50)):
+        board_id, _, user_id, _ = create_board(db_session, title, size)
+        db_session.expire_all()
+        with query_counter() as statements:
+            assert crud.add_user_to_board(db_session, board_id, user_id) is not None
+            assert crud.is_user_in_board(db_session, board_id, user_id)
+        assert collection_loads(statements) == []
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
+
+
+def test_add_and_remove_board_user(client, db_session, query_counter, as_user):
+    counts = []
+    for title, size in (("people_small", 1), ("people_large", 50)):
+        board_id, _, user_id, owner = create_board(db_session, title, size)
+        member = db_session.get(models.Board, board_id).users[0]
+        url = f"/boards/{board_id}/users"
+
+        # Не участник доски и не администратор
+        as_user(owner)
+        assert client.post(f"{url}/add", json={"user_id": user_id}).status_code == 403
+
+        as_user(member)
+        with query_counter() as statements:
+            assert client.post(f"{url}/add", json={"user_id": user_id}).status_code == 200
+        assert collection_loads(statements) == []
+        counts.append(len(statements))
+        assert client.post(f"{url}/add", json={"user_id": user_id}).status_code == 400
+        assert client.post(f"{url}/remove", json={"user_id": user_id}).status_code == 403
+
+        as_user(models.User(id=owner.id, username=owner.username, role="admin"))
+        assert client.post(f"{url}/remove", json={"user_id": user_id}).status_code == 200
+        assert client.post(f"{url}/remove", json={"user_id": user_id}).status_code == 400
+        assert not crud.is_user_in_board(db_session, board_id, user_id)
+
+    assert counts[0] == counts[1]
@@ -0,0 +1,61 @@
+from app import counters, crud, models
+
+
+def create_user(db_session, username, role="user"):
+    user = models.User(username=username, hashed_password="x", role=role)
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def task(title, priority="Low", **fields):
+    return {"title": title, "description": "d", "priority": priority, **fields}
+
+
+def test_counters_follow_task_mutations(client, db_session, db_engine, as_user):
+    owner = create_user(db_session, "counter_owner", role="admin")
+    helper = create_user(db_session, "counter_helper")
+    as_user(owner)
+
+    first = client.post("/tasks", json=task("a", "High")).json()
+    bulk = client.post("/tasks/bulk", json=[task("b"), task("c", responsible_id=helper.id)]).json()
+    client.patch(f"/tasks/{first['id']}", json={"priority": "Low"})
+    client.patch("/tasks/bulk", json=[{"id": bulk[0]["id"], "status": "In progress"}])
+    client.put(f"/tasks/{first['id']}/assign", json={"user_id": helper.id})
+    assert client.put(f"/tasks/{bulk[1]['id']}/close", params={"user_id": helper.id}).status_code == 200
+
+    stats = client.get(f"/users/{owner.id}/stats").json()
+    assert stats["created"] == {"total": 3, "by_status": {"Open": 1, "In progress": 1, "Done": 1},
+                                "by_priority": {"Low": 3}}
+    assert stats["assigned"]["total"] == 0
+    helper_stats = client.get(f"/users/{helper.id}/stats").json()
+    assert helper_stats["closed_tasks_count"] == 1
+    assert helper_stats["assigned"] == {"total": 2, "by_status": {"Open": 1, "Done": 1}, "by_priority": {"Low": 2}}
+
+    board = client.post("/boards", json={"title": "counted"}).json()
+    client.post(f"/boards/{board['id']}/tasks/add", json={"task_id": first["id"]})
+    crud.delete_task(db_session, bulk[0]["id"])
+    db_session.commit()
+    assert client.delete(f"/boards/{board['id']}").status_code == 200
+
+    assert counters.reconcile(db_engine, batch_size=1, fix=False) == []
+    assert client.get(f"/users/{owner.id}/stats").json()["created"]["total"] == 1
+    assert client.get("/users/999999/stats").status_code == 404
+
+
+def test_reconcile_reports_and_fixes_drift(db_session, db_engine):
+    user = create_user(db_session, "drifted")
+    db_session.add_all([models.Task(title="t", priority="Low", status="Open", creator_id=user.id) for _ in range(3)])
+    db_session.add(models.UserTaskCounter(user_id=user.id, name="created.status.Gone", value=2))
+    db_session.commit()
+
+    drift = counters.reconcile(db_engine, fix=True)
+    assert sorted(drift) == sorted([
+        counters.Drift(user.id, "created", 0, 3),
+        counters.Drift(user.id, "created.priority.Low", 0, 3),
+        counters.Drift(user.id, "created.status.Gone", 2, 0),
+        counters.Drift(user.id, "created.status.Open", 0, 3),
+    ])
+    assert counters.reconcile(db_engine, fix=False) == []
+    assert counters.get_user_counters(db_session, user.id) == {
+        "created": 3, "created.priority.Low": 3, "created.status.Open": 3}
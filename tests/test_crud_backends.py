@@ -0,0 +1,40 @@
+"""CRUD на выбранном бэкенде: pytest --db-backend=sqlite|postgres"""
+from app import crud, models, schemas
+
+
+def test_user_task_board_lifecycle(db_session):
+    user = crud.create_user(db_session, schemas.UserCreate(username="backend_user", password="x"),
+                            hashed_password="hashed")
+    task = crud.create_task(db_session, schemas.TaskCreate(title="T", description="D", priority="High"), user)
+    board = crud.create_board(db_session, schemas.BoardBase(title="Backend board"))
+
+    assert crud.add_user_to_board(db_session, board.id, user.id) is not None
+    assert crud.add_task_to_board(db_session, board.id, task.id) is not None
+    assert crud.get_board_by_name(db_session, "Backend board").id == board.id
+
+    updated = crud.update_task(db_session, task.id, {"status": "In Progress"})
+    assert updated.status == "In Progress"
+    assert crud.assign_responsible(db_session, task.id, user.id).responsible_id == user.id
+
+    tasks, next_cursor = crud.get_tasks_page(db_session, limit=10, board_id=board.id, status="In Progress")
+    assert [t.id for t in tasks] == [task.id]
+    assert next_cursor is None
+
+    crud.delete_task(db_session, task.id)
+    assert crud.get_task(db_session, task.id) is None
+    assert crud.delete_user(db_session, user.id) is True
+    assert db_session.query(models.User).count() == 0
+
+
+def test_unknown_responsible_is_stored_as_before(client, db_session, as_user):
+    # Без PRAGMA foreign_keys: ссылка на несуществующего пользователя не даёт 500
+    user = models.User(username="fk_user", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    as_user(user)
+
+    response = client.post("/tasks", json={"title": "T", "description": "D", "priority": "Low",
+                                           "responsible_id": 999})
+    assert response.status_code == 200
+    task_id = response.json()["id"]
+    assert client.patch(f"/tasks/{task_id}", json={"responsible_id": 998}).status_code == 200
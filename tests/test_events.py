@@ -0,0 +1,109 @@
+import asyncio
+
+import orjson
+
+from app import events, models
+
+
+def create_user(db_session, username):
+    user = models.User(username=username, hashed_password="x", role="admin")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def task(title):
+    return {"title": title, "description": "d", "priority": "Low"}
+
+
+def test_crud_mutations_reach_websocket_subscribers(client, db_session, as_user):
+    owner = create_user(db_session, "feed_owner")
+    as_user(owner)
+    board = client.post("/boards", json={"title": "feed"}).json()
+    other = client.post("/boards", json={"title": "feed other"}).json()
+
+    with client.websocket_connect(f"/tasks/events/ws?board_id={board['id']}") as board_feed, \
+            client.websocket_connect("/tasks/events/ws") as all_feed:
+        created = client.post("/tasks", json=task("a")).json()
+        client.post(f"/boards/{board['id']}/tasks/add", json={"task_id": created["id"]})
+        client.patch(f"/tasks/{created['id']}", json={"title": "b"})
+        client.put(f"/tasks/{created['id']}/assign", json={"user_id": owner.id})
+        client.put(f"/tasks/{created['id']}/close", params={"user_id": owner.id})
+        client.post(f"/boards/{other['id']}/tasks/add", json={"task_id": created["id"]})
+        client.post(f"/boards/{other['id']}/tasks/remove", json={"task_id": created["id"]})
+
+        kinds = ["task.created", "task.board_added", "task.updated", "task.assigned", "task.closed",
+                 "task.board_added", "task.board_removed"]
+        received = [all_feed.receive_json() for _ in kinds]
+        assert [message["type"] for message in received] == kinds
+        assert received[2]["task"]["title"] == "b"
+        assert received[4]["task"]["status"] == "Done"
+        assert received[5]["previous_board_id"] == board["id"]
+
+        # Подписчик доски не получил создание задачи вне доски и удаление из другой доски
+        on_board = [board_feed.receive_json() for _ in range(5)]
+        assert [message["type"] for message in on_board] == kinds[1:6]
+
+    # Переподключение с id последнего полученного события: пропущенное приходит из буфера
+    with client.websocket_connect(f"/tasks/events/ws?last_event_id={received[3]['id']}") as resumed:
+        assert [resumed.receive_json()["id"] for _ in range(3)] == [message["id"] for message in received[4:]]
+    with client.websocket_connect("/tasks/events/ws?last_event_id=unknown-1") as stale:
+        assert stale.receive_json()["type"] == "reset"
+
+
+def test_slow_subscriber_is_dropped_and_resumes():
+    async def scenario():
+        broker = events.Broker(buffer_size=100, queue_size=3, heartbeat_interval=0)
+        broker.start()
+        subscription, reset = broker.subscribe()
+        for i in range(5):
+            broker.publish(frozenset(), {"type": "task.updated", "task_id": i})
+        await asyncio.sleep(0)
+        assert subscription.overflowed and await subscription.get() is None
+        broker.unsubscribe(subscription)
+
+        resumed, reset = broker.subscribe(last_event_id=broker.event_id(2))
+        assert not reset
+        assert [event.seq for event in await resumed.get()] == [3, 4, 5]
+        too_far, reset = broker.subscribe(last_event_id=broker.event_id(0))
+        assert reset and not too_far.queue
+        assert broker.stats()["dropped_slow"] == 1
+        broker.stop()
+
+    asyncio.run(scenario())
+
+
+def test_event_stream_response():
+    async def scenario():
+        broker = events.Broker(heartbeat_interval=0)
+        broker.start()
+        subscription, _ = broker.subscribe(boards=[7])
+        disconnect = asyncio.Event()
+        sent = []
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        stream = asyncio.ensure_future(events.EventStreamResponse(subscription)({"type": "http"}, receive, send))
+        broker.publish(frozenset({7}), {"type": "task.created", "task_id": 1})
+        broker.publish(frozenset({8}), {"type": "task.created", "task_id": 2})
+        await asyncio.sleep(0.01)
+        disconnect.set()
+        await stream
+
+        headers = dict(sent[0]["headers"])
+        assert headers[b"content-type"] == b"text/event-stream; charset=utf-8"
+        assert b"content-length" not in headers
+        body = b"".join(message.get("body", b"") for message in sent[1:])
+        assert body.startswith(b"retry: 1000\n\n")
+        assert body.count(b"event: task.created") == 1
+        data = body.split(b"data: ", 1)[1].split(b"\n", 1)[0]
+        assert orjson.loads(data) == {"type": "task.created", "task_id": 1}
+        assert broker.stats()["subscribers"] == 0
+        broker.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+import json
+
+from app import config, models
+
+
+def create_tasks(db_session, count):
+    user = models.User(username="exporter", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    db_session.add_all(models.Task(title=f"Task {i}", description="d", priority="Low" if i % 2 else "High",
+                                   status="Open", creator_id=user.id) for i in range(count))
+    db_session.commit()
+    return user
+
+
+def test_tasks_ndjson_export(client, db_session, monkeypatch):
+    monkeypatch.setattr(config, "EXPORT_CHUNK_SIZE", 3)
+    create_tasks(db_session, 10)
+
+    with client.stream("GET", "/tasks/export") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+
+    assert [task["title"] for task in lines] == [f"Task {i}" for i in range(10)]
+
+
+def test_tasks_json_array_export_with_filter(client, db_session, monkeypatch):
+    monkeypatch.setattr(config, "EXPORT_CHUNK_SIZE", 2)
+    create_tasks(db_session, 7)
+
+    response = client.get("/tasks/export", params={"format": "json", "priority": "High"})
+    assert response.status_code == 200
+    assert [task["title"] for task in response.json()] == ["Task 0", "Task 2", "Task 4", "Task 6"]
+
+    assert client.get("/tasks/export", params={"format": "json", "status": "Done"}).json() == []
+
+
+def test_users_export(client, db_session):
+    create_tasks(db_session, 0)
+
+    response = client.get("/users/export", params={"format": "json"})
+    assert [user["username"] for user in response.json()] == ["exporter"]
+    assert client.get("/users/export", params={"format": "xml"}).status_code == 422
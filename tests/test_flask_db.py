@@ -0,0 +1,49 @@
+import pytest
+
+from helpers import db
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    pool = db.ConnectionPool(str(tmp_path / "users.db"), size=2)
+    monkeypatch.setattr(db, "pool", pool)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def flask_client(pool, tmp_path, monkeypatch):
+    # Второе определение app создаёт user_photos в рабочем каталоге
+    monkeypatch.chdir(tmp_path)
+    from helpers import server
+
+    server.init_db()
+    return server.app.test_client()
+
+
+def test_release_rolls_back_and_reuses(pool):
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE items (name TEXT)")
+    conn = pool.acquire()
+    conn.execute("INSERT INTO items VALUES ('lost')")
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert conn.execute("SELECT count(*) FROM items").fetchone() == (0,)
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert pool.connects == 1
+
+
+def test_request_uses_one_connection(pool, flask_client):
+    assert flask_client.post("/api/auth/register", json={"username": "ann", "password": "pw"}).status_code == 201
+    # Ошибка вставки не оставляет открытую транзакцию и не теряет соединение
+    assert flask_client.post("/api/auth/register", json={"username": "ann", "password": "pw"}).status_code == 409
+    token = flask_client.post("/api/auth/login", json={"username": "ann", "password": "pw"}).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for _ in range(3):
+        assert flask_client.get("/api/users/me", headers=headers).get_json()["username"] == "ann"
+    assert flask_client.post("/api/tasks", json={"title": "t", "assignee_id": 999}, headers=headers).status_code == 404
+    assert flask_client.post("/api/tasks", json={"title": "t"}, headers=headers).status_code == 201
+    # token_required и обработчик — одно соединение, и оно возвращается в пул после каждого запроса
+    assert pool.connects == 1
+    assert len(pool._idle) == 1
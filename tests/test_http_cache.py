@@ -0,0 +1,94 @@
+from app import models
+
+
+def create_board(db_session, title="cached", tasks=2):
+    owner = models.User(username=f"{title}_owner", hashed_password="x")
+    board = models.Board(title=title)
+    db_session.add_all([owner, board])
+    db_session.flush()
+    db_session.add_all(models.Task(title=f"{title} {i}", description="d", priority="Low", status="Open",
+                                   creator_id=owner.id, board_id=board.id) for i in range(tasks))
+    db_session.commit()
+    return board, owner
+
+
+def test_board_etag_and_304(client, db_session):
+    board, _ = create_board(db_session)
+
+    response = client.get(f"/boards/{board.id}")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+    assert "Last-Modified" in response.headers
+
+    response = client.get(f"/boards/{board.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    last_modified = client.get(f"/boards/{board.id}").headers["Last-Modified"]
+    assert client.get(f"/boards/{board.id}", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    assert client.patch(f"/boards/{board.id}", json={"title": "renamed"}).status_code == 200
+    response = client.get(f"/boards/{board.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["title"] == "renamed"
+
+
+def test_update_bumps_version(client, db_session, as_user):
+    board, owner = create_board(db_session, "versions")
+    task_id = board.tasks[0].id
+    as_user(owner)
+
+    assert client.patch(f"/tasks/{task_id}", json={"status": "Done"}).status_code == 200
+    assert client.patch("/tasks/bulk", json=[{"id": task_id, "status": "Closed"}]).status_code == 200
+
+    db_session.expire_all()
+    task = db_session.get(models.Task, task_id)
+    assert task.version == 3
+    assert task.updated_at is not None
+
+
+def test_board_tasks_etag_follows_task_changes(client, db_session, as_user):
+    board, owner = create_board(db_session, "listing")
+    url = f"/boards/{board.id}/tasks"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+
+    as_user(owner)
+    client.patch(f"/tasks/{board.tasks[0].id}", json={"title": "changed"})
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()[0]["title"] == "changed"
+
+
+def test_tasks_page_and_user_etags(client, db_session):
+    _, owner = create_board(db_session, "pages", tasks=3)
+
+    response = client.get("/tasks", params={"limit": 2})
+    assert client.get("/tasks", params={"limit": 2},
+                      headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+    assert client.get("/tasks", params={"limit": 3}).headers["ETag"] != response.headers["ETag"]
+
+    etag = client.get(f"/users/{owner.id}").headers["ETag"]
+    assert client.get(f"/users/{owner.id}", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_lists_revalidate_when_a_task_leaves_them(client, db_session, as_user):
+    board, owner = create_board(db_session, "leaving")
+    response = client.get("/tasks", params={"status": "Open"})
+    assert len(response.json()) == 2
+    assert "Last-Modified" not in response.headers
+    assert "Last-Modified" not in client.get(f"/boards/{board.id}/tasks").headers
+
+    as_user(owner)
+    assert client.patch(f"/tasks/{board.tasks[0].id}", json={"status": "Done"}).status_code == 200
+    response = client.get("/tasks", params={"status": "Open"}, headers={
+        "If-None-Match": response.headers["ETag"],
+        "If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT",
+    })
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    response = client.get("/tasks", params={"status": "Open"},
+                          headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+    assert response.status_code == 200
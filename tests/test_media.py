@@ -0,0 +1,106 @@
+import asyncio
+import os
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app import media, models, routes, storage
+
+CONTENT = b"%PDF-1.4 " + bytes(range(256)) * 40
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    store = storage.BlobStore(str(tmp_path / "pdfs"), str(tmp_path / "pdfs.db"))
+    key = storage.hash_bytes(CONTENT)
+    store.put(key, {".pdf": CONTENT})
+    (tmp_path / "pdfs" / "task_1.pdf").write_bytes(CONTENT)
+    return tmp_path, store.relative_path(key, ".pdf")
+
+
+def media_client(directory, **kwargs):
+    app = Starlette(routes=[Mount("/static", media.MediaFiles(directory=str(directory), **kwargs))])
+    return TestClient(app)
+
+
+def test_hashed_files_are_immutable(static_dir):
+    directory, path = static_dir
+    client = media_client(directory)
+
+    response = client.get(f"/static/pdfs/{path}")
+    assert response.content == CONTENT
+    assert response.headers["cache-control"] == media.IMMUTABLE
+    assert response.headers["etag"] == f'"{os.path.basename(path)}"'
+    assert response.headers["content-type"] == "application/pdf"
+
+    response = client.get(f"/static/pdfs/{path}", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == media.IMMUTABLE
+
+    # Старые имена могут быть перезаписаны — только с перепроверкой
+    assert client.get("/static/pdfs/task_1.pdf").headers["cache-control"] == "no-cache"
+    assert client.get("/static/pdfs/tmp/x.part").status_code == 404
+
+
+def test_range_requests(static_dir):
+    directory, path = static_dir
+    client = media_client(directory)
+
+    response = client.get(f"/static/pdfs/{path}", headers={"Range": "bytes=9-18"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[9:19]
+    assert response.headers["content-range"] == f"bytes 9-18/{len(CONTENT)}"
+
+    response = client.get(f"/static/pdfs/{path}", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+
+
+def test_accel_redirect(static_dir):
+    directory, path = static_dir
+    response = media_client(directory, accel_redirect="/_media/").get(f"/static/pdfs/{path}")
+    assert response.headers["x-accel-redirect"] == f"/_media/pdfs/{path}"
+    assert response.headers["cache-control"] == media.IMMUTABLE
+    assert response.content == b""
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ([], (200, 0, None)),
+    ([(b"range", b"bytes=100-199")], (206, 100, 100)),
+])
+def test_zerocopy_extension(static_dir, headers, expected):
+    directory, path = static_dir
+    response = media.MediaFileResponse(os.path.join(directory, "pdfs", path))
+    scope = {"type": "http", "method": "GET", "headers": headers, "extensions": {media.ZEROCOPY: {}}}
+    messages = []
+
+    async def send(message):
+        if message["type"] == media.ZEROCOPY:
+            message = {**message, "data": message["file"].read()}
+        messages.append(message)
+
+    asyncio.run(response(scope, None, send))
+    start, body = messages
+    assert (start["status"], body["offset"], body.get("count")) == expected
+    assert body["data"] == CONTENT
+
+
+def test_task_pdf_redirects_to_immutable_url(client, db_session, monkeypatch, tmp_path):
+    store = storage.BlobStore(str(tmp_path / "pdfs"), str(tmp_path / "pdfs.db"))
+    monkeypatch.setattr(routes, "pdf_store", store)
+    user = models.User(username="pdf_reader", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    task = models.Task(title="t", description="d", priority="Low", status="Open", creator_id=user.id)
+    db_session.add(task)
+    db_session.commit()
+
+    assert client.get(f"/tasks/{task.id}/pdf").status_code == 404
+    uploaded = client.post(f"/tasks/{task.id}/upload_pdf", files={"file": ("doc.pdf", CONTENT, "application/pdf")})
+    key = storage.hash_bytes(CONTENT)
+    assert uploaded.json()["url"] == f"/static/pdfs/{key[:2]}/{key[2:4]}/{key}.pdf"
+
+    response = client.get(f"/tasks/{task.id}/pdf", follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == uploaded.json()["url"]
@@ -0,0 +1,64 @@
+from app import metrics, models
+
+
+def sample(text, line_prefix):
+    """Значение ряда из выдачи /metrics по началу строки (имя и метки)"""
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_metrics_endpoint_reports_routes_and_sql(client, db_session):
+    user = models.User(username="metrics_user", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+
+    before = client.get("/metrics").text
+    count = 'http_request_duration_seconds_count{method="GET",route="/users/{user_id}",status="200"}'
+    statements = 'http_request_db_statements_sum{method="GET",route="/users/{user_id}"}'
+    for _ in range(3):
+        assert client.get(f"/users/{user.id}").status_code == 200
+    client.get("/no/such/route/123")
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    text = response.text
+    # Маршрут — шаблон пути, а не сам путь; незнакомые пути не плодят ряды
+    assert sample(text, count) - (sample(before, count) or 0) == 3
+    assert sample(text, statements) - (sample(before, statements) or 0) >= 3
+    assert f"/users/{user.id}\"" not in text
+    assert 'route="<unmatched>",status="404"' in text
+    assert sample(text, 'db_statement_duration_seconds_count{operation="select"}') >= 3
+    assert sample(text, "http_requests_in_flight") == 1  # сам запрос /metrics
+    assert "# TYPE password_hash_duration_seconds histogram" in text
+    assert sample(text, "events_subscribers") == 0
+
+
+def test_histogram_render():
+    registry = metrics.Registry()
+    histogram = metrics.Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0), registry=registry)
+    gauge = metrics.Gauge("queue", 'Queue "depth"', registry=registry, thread_safe=False)
+    registry.on_scrape(lambda: gauge.set(7))
+    for value in (0.05, 0.5, 5.0):
+        histogram.labels('/a"b').observe(value)
+    with histogram.labels("/c").time():
+        pass
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a\\"b",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a\\"b"} 5.55',
+        'latency_seconds_count{route="/a\\"b"} 3',
+        'latency_seconds_bucket{route="/c",le="0.1"} 1',
+        'latency_seconds_bucket{route="/c",le="1.0"} 1',
+        'latency_seconds_bucket{route="/c",le="+Inf"} 1',
+        f'latency_seconds_sum{{route="/c"}} {histogram.labels("/c").sum!r}',
+        'latency_seconds_count{route="/c"} 1',
+        "# HELP queue Queue \\\"depth\\\"",
+        "# TYPE queue gauge",
+        "queue 7",
+    ]
@@ -0,0 +1,88 @@
+import io
+import os
+import sqlite3
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine
+
+from app import database, migrations, models
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+
+
+def upgrade(engine):
+    config = Config(ALEMBIC_INI)
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_initial_revision_matches_models(file_engine):
+    upgrade(file_engine)
+
+    with file_engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        assert compare_metadata(context, database.Base.metadata) == []
+
+
+def test_initial_revision_upgrades_pre_alembic_database(file_engine):
+    with file_engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE boards (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL)")
+        connection.exec_driver_sql("INSERT INTO boards (title) VALUES ('Team'), ('Team')")
+
+    upgrade(file_engine)
+
+    with file_engine.connect() as connection:
+        titles = connection.exec_driver_sql("SELECT title FROM boards ORDER BY id").scalars().all()
+    assert titles == ["Team", "Team (2)"]
+
+
+def test_offline_sql_builds_the_same_schema(file_engine, tmp_path):
+    # alembic upgrade head --sql: ревизии не должны обращаться к соединению
+    buffer = io.StringIO()
+    command.upgrade(Config(ALEMBIC_INI, output_buffer=buffer), "head", sql=True)
+    script = buffer.getvalue()
+    assert "UPDATE boards SET title=" in script
+
+    with sqlite3.connect(tmp_path / "migrations.db") as connection:
+        connection.executescript(script)
+    with file_engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        assert compare_metadata(context, database.Base.metadata) == []
+
+
+def test_backfill_resumes_after_failure(file_engine):
+    database.Base.metadata.create_all(file_engine)
+    tasks = models.Task.__table__
+    with file_engine.begin() as connection:
+        connection.execute(tasks.insert(), [{"title": f"t{i}", "status": None} for i in range(25)])
+
+    calls = []
+
+    def fail_on_third_batch(connection, ids):
+        calls.append(ids)
+        if len(calls) == 3:
+            raise RuntimeError("interrupted")
+        connection.execute(tasks.update().where(tasks.c.id.in_(ids)).values(status="Open"))
+
+    with pytest.raises(RuntimeError):
+        migrations.backfill_in_batches(file_engine, "task_status", tasks, apply=fail_on_third_batch, batch_size=10)
+
+    processed = migrations.backfill_in_batches(
+        file_engine, "task_status", tasks, values={"status": "Open"}, batch_size=10)
+
+    assert processed == 5
+    with file_engine.connect() as connection:
+        statuses = connection.execute(tasks.select().with_only_columns(tasks.c.status)).scalars().all()
+    assert statuses == ["Open"] * 25
@@ -0,0 +1,18 @@
+from app import auth
+
+
+def test_register_fails_fast_when_password_pool_is_saturated(client, monkeypatch):
+    monkeypatch.setattr(auth.password_pool, "max_pending", 0)
+
+    response = client.post("/users/register", json={"username": "busy", "password": "testpass1"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_login_through_password_pool(client):
+    credentials = {"username": "pool_user", "password": "testpass1"}
+    assert client.post("/users/register", json=credentials).status_code == 200
+
+    assert client.post("/login", json=credentials).status_code == 200
+    assert client.post("/login", json={**credentials, "password": "wrong"}).status_code == 401
@@ -0,0 +1,81 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import auth, profiling
+
+
+def busy_sync_handler(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+def build_app(tmp_path, **options):
+    app = FastAPI()
+
+    @app.get("/slow/{item_id}")
+    def slow(item_id: int):
+        busy_sync_handler(0.05)
+        return {"id": item_id}
+
+    @app.get("/fast")
+    async def fast():
+        return {"total": sum(range(1000))}
+
+    profiler = profiling.install(app, profiling.Profiler(str(tmp_path), token="secret", **options))
+    app.dependency_overrides[auth.get_current_user] = lambda: auth.UserSnapshot(id=1, username="a", role="admin")
+    return app, profiler
+
+
+def test_header_activated_sampling_and_admin_download(tmp_path):
+    app, profiler = build_app(tmp_path, max_files=2)
+    with TestClient(app) as client:
+        # Без заголовка и с чужим значением — не профилируется
+        assert "X-Profile-Id" not in client.get("/slow/1").headers
+        assert "X-Profile-Id" not in client.get("/slow/1", headers={"X-Profile": "wrong"}).headers
+        assert profiler.captures() == []
+
+        ids = [client.get(f"/slow/{i}", headers={"X-Profile": "secret"}).headers["X-Profile-Id"] for i in range(3)]
+        captures = client.get("/admin/profiles").json()
+        # Кольцевой буфер: остались два последних
+        assert [capture["id"] for capture in captures] == ids[:0:-1]
+        assert captures[0]["route"] == "slow_item_id"
+        assert captures[0]["status"] == 200 and captures[0]["mode"] == "sample"
+        assert captures[0]["duration_ms"] >= 50
+
+        response = client.get(f"/admin/profiles/{ids[-1]}")
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert any("busy_sync_handler (tests/test_profiling.py" in line for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+        assert client.get(f"/admin/profiles/{ids[0]}").status_code == 404
+        assert client.get("/admin/profiles/..%2F..%2Fetc%2Fpasswd").status_code == 404
+
+        app.dependency_overrides[auth.get_current_user] = lambda: auth.UserSnapshot(id=2, username="u", role="user")
+        assert client.get("/admin/profiles").status_code == 403
+
+
+def test_cprofile_mode_by_header(tmp_path):
+    app, profiler = build_app(tmp_path)
+    with TestClient(app) as client:
+        response = client.get("/fast", headers={"X-Profile": "secret", "X-Profile-Mode": "cprofile"})
+        assert response.json() == {"total": 499500}
+        profile_id = response.headers["X-Profile-Id"]
+        [capture] = profiler.captures()
+        assert capture["mode"] == "cprofile" and capture["route"] == "fast"
+        collapsed = client.get(f"/admin/profiles/{profile_id}").text
+    # Полные пути от корня, значения — собственное время в микросекундах
+    stacks = dict(line.rsplit(" ", 1) for line in collapsed.splitlines())
+    [under_fast] = [stack for stack in stacks if stack.endswith("<built-in method builtins.sum>")]
+    assert ";fast (tests/test_profiling.py:" in under_fast
+    assert all(value.isdigit() for value in stacks.values())
+
+
+def test_sample_rate_without_header(tmp_path):
+    app, profiler = build_app(tmp_path, sample_rate=1.0, mode="cprofile")
+    with TestClient(app) as client:
+        client.get("/fast")
+    assert len(profiler.captures()) == 1
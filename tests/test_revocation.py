@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from helpers import db, revocation
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    pool = db.ConnectionPool(str(tmp_path / "users.db"), size=2)
+    monkeypatch.setattr(db, "pool", pool)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def server(pool, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from helpers import server
+
+    monkeypatch.setattr(server, "revocations", revocation.RevocationList(capacity=1000, sync_interval=0))
+    server.init_db()
+    return server
+
+
+def login(client, username="ann"):
+    client.post("/api/auth/register", json={"username": username, "password": "pw"})
+    return client.post("/api/auth/login", json={"username": username, "password": "pw"}).get_json()
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = revocation.BloomFilter(10_000, 0.01)
+    for i in range(10_000):
+        bloom.add(f"revoked-{i}")
+    assert all(f"revoked-{i}" in bloom for i in range(10_000))
+    false_positives = sum(f"live-{i}" in bloom for i in range(10_000))
+    assert false_positives < 200
+
+
+def test_logout_revokes_access_and_refresh_tokens(server):
+    client = server.app.test_client()
+    tokens = login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+    assert server.revocations.stats["db_lookups"] == 0
+
+    response = client.post("/api/auth/logout", json={"refresh_token": tokens["refresh_token"]}, headers=headers)
+    assert response.status_code == 200
+    assert client.get("/api/users/me", headers=headers).get_json() == {"message": "Token has been revoked!"}
+    response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
+
+    other = login(client, "bob")
+    assert client.post("/api/auth/refresh", json={"refresh_token": other["refresh_token"]}).status_code == 200
+
+
+def test_sees_revocations_from_other_processes_and_prunes(server, pool):
+    client = server.app.test_client()
+    tokens = login(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+
+    # Отзыв другим процессом: строка в таблице без записи в наш фильтр
+    jti = server.jwt.decode(tokens["access_token"], options={"verify_signature": False})["jti"]
+    with pool.connection() as conn:
+        revocation.RevocationList().revoke(conn, jti, time.time() + 60)
+        conn.execute("INSERT INTO revoked_tokens (jti, expires_at) VALUES ('expired', ?)", (int(time.time()) - 1,))
+    assert client.get("/api/users/me", headers=headers).status_code == 401
+
+    with pool.connection() as conn:
+        assert server.revocations.prune(conn) == 1
+        assert conn.execute("SELECT jti FROM revoked_tokens").fetchall() == [(jti,)]
+    assert "expired" not in server.revocations.filter
+    assert jti in server.revocations.filter
+
+
+def test_migrate_adds_expiry_to_legacy_rows(pool):
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE revoked_tokens (id INTEGER PRIMARY KEY AUTOINCREMENT, jti TEXT UNIQUE NOT NULL,"
+                     " revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("INSERT INTO revoked_tokens (jti) VALUES ('legacy')")
+        revocation.migrate(conn)
+        expires_at = conn.execute("SELECT expires_at FROM revoked_tokens").fetchone()[0]
+    assert expires_at == pytest.approx(time.time() + revocation.LEGACY_TTL, abs=5)
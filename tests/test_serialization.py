@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from app import models, schemas
+
+
+def test_fast_path_matches_pydantic(client, db_session):
+    user = models.User(username="serializer", hashed_password="x", avatar_url="/static/a.png")
+    db_session.add(user)
+    db_session.commit()
+    tasks = [
+        models.Task(title="plain", description="d", priority="Low", status="Open", creator_id=user.id),
+        models.Task(title="closed", description="d", priority="Low", status="Closed", creator_id=user.id,
+                    responsible_id=user.id, updated_at=str(datetime(2024, 5, 1, 12, 30, 15, 250))),
+    ]
+    db_session.add_all(tasks)
+    db_session.commit()
+
+    expected = [schemas.TaskOut.model_validate(task).model_dump(mode="json") for task in tasks]
+    response = client.get("/tasks")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == expected
+    assert response.json()[1]["updated_at"] == "2024-05-01T12:30:15.000250"
+
+    assert client.get("/users").json() == [schemas.UserOut.model_validate(user).model_dump(mode="json")]
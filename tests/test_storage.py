@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from app import storage
+
+
+@pytest.fixture
+def store(tmp_path):
+    return storage.BlobStore(str(tmp_path / "blobs"), str(tmp_path / "index" / "blobs.db"))
+
+
+def test_identical_content_is_stored_once(store):
+    key = storage.hash_bytes(b"content")
+    store.put(key, {".txt": b"content"})
+    assert not store.acquire("0" * 64)
+    assert store.acquire(key)
+
+    path = store.path(key, ".txt")
+    assert path == os.path.join(store.root, key[:2], key[2:4], key + ".txt")
+    assert open(path, "rb").read() == b"content"
+    assert store.refcount(key) == 2
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_put_file_moves_and_deduplicates(store):
+    keys = []
+    for _ in range(2):
+        tmp_path = os.path.join(store.tmp_dir, "upload.part")
+        with open(tmp_path, "wb") as out:
+            out.write(b"%PDF-1.4")
+        keys.append(store.put_file(tmp_path, ".pdf"))
+    assert keys[0] == keys[1] == storage.hash_bytes(b"%PDF-1.4")
+    assert store.refcount(keys[0]) == 2
+    assert os.listdir(store.tmp_dir) == []
+    assert storage.key_of(store.path(keys[0], ".pdf")) == keys[0]
+    assert storage.key_of("/static/pdfs/task_1.pdf") is None
+
+
+def test_gc_removes_only_unreferenced_blobs(store):
+    kept, dropped = storage.hash_bytes(b"kept"), storage.hash_bytes(b"dropped")
+    store.put(kept, {"_a": b"kept", "_b": b"kept"})
+    store.put(dropped, {"_a": b"dropped", "_b": b"dropped"})
+    store.release(dropped)
+    store.release(dropped)  # лишний release не уводит счётчик в минус
+
+    assert store.gc(min_age=3600) == 0
+    # Ссылка, появившаяся до gc, спасает blob
+    assert store.acquire(dropped)
+    store.release(dropped)
+    assert store.stats() == {"blobs": 2, "references": 1, "bytes": 22, "unreferenced": 1}
+
+    assert store.gc() == 1
+    assert not os.path.exists(store.path(dropped, "_a"))
+    assert os.path.exists(store.path(kept, "_b"))
+    assert not store.acquire(dropped)
@@ -0,0 +1,79 @@
+from app import config, models
+
+
+def create_user(db_session, username):
+    user = models.User(username=username, hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def test_bulk_create_reports_each_item(client, db_session, as_user):
+    owner = create_user(db_session, "bulk_owner")
+    as_user(owner)
+
+    items = [
+        {"title": "a", "description": "d", "priority": "Low"},
+        {"title": "b"},
+        {"title": "c", "description": "d", "priority": "High", "responsible_id": 999_999},
+        {"title": "d", "description": "d", "priority": "High", "responsible_id": owner.id},
+    ]
+    response = client.post("/tasks/bulk", json=items)
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status"] for result in results] == ["created", "error", "error", "created"]
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert "description" in results[1]["error"]
+    assert results[2]["error"] == "Responsible user not found"
+
+    tasks = db_session.query(models.Task).order_by(models.Task.id).all()
+    assert [task.id for task in tasks] == [results[0]["id"], results[3]["id"]]
+    assert [task.title for task in tasks] == ["a", "d"]
+    assert all(task.creator_id == owner.id and task.status == "Open" for task in tasks)
+
+
+def test_bulk_create_uses_batches(client, db_session, as_user, query_counter, monkeypatch):
+    monkeypatch.setattr(config, "BULK_BATCH_SIZE", 10)
+    as_user(create_user(db_session, "batch_owner"))
+
+    items = [{"title": f"t{i}", "description": "d", "priority": "Low"} for i in range(25)]
+    with query_counter() as statements:
+        response = client.post("/tasks/bulk", json=items)
+    assert response.status_code == 200
+    assert [result["index"] for result in response.json()] == list(range(25))
+    assert len([sql for sql in statements if sql.startswith("INSERT INTO tasks")]) <= 3
+    assert db_session.query(models.Task).count() == 25
+
+
+def test_bulk_update_checks_ownership(client, db_session, as_user):
+    owner = create_user(db_session, "update_owner")
+    stranger = create_user(db_session, "update_stranger")
+    own = models.Task(title="own", description="d", priority="Low", status="Open", creator_id=owner.id)
+    foreign = models.Task(title="foreign", description="d", priority="Low", status="Open", creator_id=stranger.id)
+    db_session.add_all([own, foreign])
+    db_session.commit()
+    as_user(owner)
+
+    response = client.patch("/tasks/bulk", json=[
+        {"id": own.id, "status": "Done"},
+        {"id": foreign.id, "status": "Done"},
+        {"id": 999_999, "status": "Done"},
+        {"id": own.id, "title": "renamed", "responsible_id": stranger.id},
+        {"status": "Done"},
+    ])
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status"] for result in results] == ["updated", "error", "error", "updated", "error"]
+    assert results[1]["error"] == "Not authorized to update this task"
+    assert results[2]["error"] == "Task not found"
+
+    db_session.expire_all()
+    assert (own.title, own.status, own.responsible_id) == ("renamed", "Done", stranger.id)
+    assert foreign.status == "Open"
+
+
+def test_bulk_size_is_limited(client, db_session, as_user, monkeypatch):
+    monkeypatch.setattr(config, "BULK_MAX_ITEMS", 2)
+    as_user(create_user(db_session, "limit_owner"))
+    response = client.post("/tasks/bulk", json=[{}, {}, {}])
+    assert response.status_code == 413
@@ -0,0 +1,58 @@
+from app import models
+
+
+def create_tasks(db_session, count, **fields):
+    user = models.User(username=f"owner_{count}_{len(fields)}", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    for i in range(count):
+        db_session.add(models.Task(title=f"Task {i}", description="d", priority="Low",
+                                   status="Open", creator_id=user.id, **fields))
+    db_session.commit()
+    return user
+
+
+def test_tasks_first_page_is_bounded(client, db_session):
+    create_tasks(db_session, 5)
+
+    response = client.get("/tasks", params={"limit": 2})
+    assert response.status_code == 200
+    assert [task["title"] for task in response.json()] == ["Task 0", "Task 1"]
+    assert response.headers["X-Next-Cursor"] == str(response.json()[-1]["id"])
+    assert 'rel="next"' in response.headers["Link"]
+
+
+def test_tasks_walk_all_pages_with_cursor(client, db_session):
+    create_tasks(db_session, 5)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = client.get("/tasks", params=params)
+        seen += [task["id"] for task in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert len(seen) == 5
+    assert seen == sorted(seen)
+
+
+def test_tasks_filters(client, db_session):
+    create_tasks(db_session, 3)
+    owner = create_tasks(db_session, 2, responsible_id=1)
+
+    response = client.get("/tasks", params={"creator_id": owner.id, "responsible_id": 1})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert all(task["creator_id"] == owner.id for task in response.json())
+
+    response = client.get("/tasks", params={"status": "Done"})
+    assert response.json() == []
+
+
+def test_tasks_page_size_is_limited(client):
+    response = client.get("/tasks", params={"limit": 100000})
+    assert response.status_code == 422
@@ -0,0 +1,45 @@
+import pytest
+
+from app import auth
+
+
+@pytest.fixture(autouse=True)
+def clean_token_cache():
+    auth.token_cache.clear()
+    yield
+    auth.token_cache.clear()
+
+
+def register_and_login(client, username="cache_user", password="testpass1"):
+    client.post("/users/register", json={"username": username, "password": password})
+    token = client.post("/login", json={"username": username, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_second_request_is_served_from_cache(client):
+    headers = register_and_login(client)
+
+    assert client.get("/tasks_by_user_id", headers=headers).status_code == 200
+    assert client.get("/tasks_by_user_id", headers=headers).status_code == 200
+
+    assert auth.token_cache.misses == 1
+    assert auth.token_cache.hits == 1
+
+
+def test_update_user_invalidates_cached_snapshot(client):
+    headers = register_and_login(client)
+    user_id = client.get("/users").json()[0]["id"]
+    client.get("/tasks_by_user_id", headers=headers)
+
+    response = client.patch(f"/users/{user_id}", headers=headers,
+                            json={"username": "renamed_user", "password": "testpass1"})
+    assert response.status_code == 200
+
+    # Токен выписан на старое имя: после инвалидации он больше не действует
+    assert client.get("/tasks_by_user_id", headers=headers).status_code == 401
+
+
+def test_expired_token_is_not_cached():
+    snapshot = auth.UserSnapshot(id=1, username="expired")
+    auth.token_cache.put("token", snapshot, expires_at=0)
+    assert auth.token_cache.get("token") is None
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from app import models, routes, storage
+
+
+@pytest.fixture
+def pdf_store(tmp_path, monkeypatch):
+    store = storage.BlobStore(str(tmp_path / "pdfs"), str(tmp_path / "pdfs.db"))
+    monkeypatch.setattr(routes, "pdf_store", store)
+    return store
+
+
+def stored_files(store):
+    return sorted(name for _, _, names in os.walk(store.root) for name in names)
+
+
+@pytest.fixture
+def task_id(db_session, pdf_store, monkeypatch):
+    monkeypatch.setattr(routes, "MAX_FILE_SIZE", 1024)
+    user = models.User(username="uploader", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    task = models.Task(title="t", description="d", priority="Low", status="Open", creator_id=user.id)
+    db_session.add(task)
+    db_session.commit()
+    return task.id
+
+
+def test_pdf_is_streamed_into_storage(client, db_session, task_id, pdf_store):
+    content = b"%PDF-1.4 " + b"x" * 900
+    response = client.post(f"/tasks/{task_id}/upload_pdf",
+                           data={"comment": "ignored"},
+                           files={"file": ("doc.pdf", content, "application/pdf")})
+    assert response.status_code == 200
+    key = storage.hash_bytes(content)
+    path = pdf_store.path(key, ".pdf")
+    assert response.json()["file_path"] == path
+    assert open(path, "rb").read() == content
+    assert stored_files(pdf_store) == [key + ".pdf"]
+    db_session.expire_all()
+    assert db_session.get(models.Task, task_id).pdf_path == path
+
+    # Повторная загрузка того же файла не создаёт копию и не теряет ссылку
+    response = client.post(f"/tasks/{task_id}/upload_pdf", files={"file": ("doc.pdf", content, "application/pdf")})
+    assert response.status_code == 200
+    assert pdf_store.refcount(key) == 1
+
+    assert client.delete(f"/tasks/{task_id}/delete_pdf").status_code == 200
+    assert pdf_store.refcount(key) == 0
+    assert client.delete(f"/tasks/{task_id}/delete_pdf").status_code == 404
+    pdf_store.gc()
+    assert stored_files(pdf_store) == []
+
+
+def test_oversized_pdf_is_rejected_without_leftovers(client, task_id, pdf_store):
+    response = client.post(f"/tasks/{task_id}/upload_pdf",
+                           files={"file": ("big.pdf", b"x" * 5000, "application/pdf")})
+    assert response.status_code == 413
+    assert stored_files(pdf_store) == []
+
+
+def test_oversized_body_is_rejected_by_content_length(client, task_id):
+    response = client.post(f"/tasks/{task_id}/upload_pdf", content=b"x" * 200_000,
+                           headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize("files, expected", [
+    ({"file": ("doc.txt", b"text", "text/plain")}, 400),
+    ({"file": ("empty.pdf", b"", "application/pdf")}, 400),
+    ({"other": ("doc.pdf", b"%PDF", "application/pdf")}, 422),
+])
+def test_invalid_uploads(client, task_id, pdf_store, files, expected):
+    assert client.post(f"/tasks/{task_id}/upload_pdf", files=files).status_code == expected
+    assert stored_files(pdf_store) == []
+
+
+def test_upload_to_missing_task(client, task_id):
+    response = client.post("/tasks/999/upload_pdf", files={"file": ("doc.pdf", b"%PDF", "application/pdf")})
+    assert response.status_code == 404
+
+
+def multipart_body(content: bytes, closing: bytes = b"--b--\r\n") -> bytes:
+    return (b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"doc.pdf\"\r\n"
+            b"Content-Type: application/pdf\r\n\r\n" + content + b"\r\n" + closing)
+
+
+@pytest.mark.parametrize("body", [
+    multipart_body(b"%PDF-1.4 truncated", closing=b""),
+    multipart_body(b"%PDF-1.4 ")[:-20],
+    b"--b\r\nbroken header line without colon\r\n\r\n",
+])
+def test_malformed_or_truncated_body_is_rejected(client, db_session, task_id, pdf_store, body):
+    response = client.post(f"/tasks/{task_id}/upload_pdf", content=body,
+                           headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 400
+    assert stored_files(pdf_store) == []
+    db_session.expire_all()
+    assert db_session.get(models.Task, task_id).pdf_path is None
+
+
+def test_complete_body_without_client_helper(client, task_id):
+    response = client.post(f"/tasks/{task_id}/upload_pdf", content=multipart_body(b"%PDF-1.4 ok"),
+                           headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 200